@@ -0,0 +1,147 @@
+# admission/admission.py
+import math
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from admission.limiter import ConcurrencyLimiter, AsyncConcurrencyLimiter, QUEUE_FULL, QUEUE_TIMEOUT
+from admission.token_bucket import TokenBuckets, AsyncTokenBuckets, MemoryTokenBuckets
+from admission.token_bucket import BUCKET_KEY_PATTERN, BULK_BUCKET_KEY_PATTERN
+from metrics.registry import registry
+from redis_client.redis_client import RedisClient
+from redis_client.async_redis_client import AsyncRedisClient
+from storage.backend import MEMORY
+from config.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ASYNC_ADMISSION_MAX_CONCURRENT,
+    ASYNC_ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_MS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    VOTE_RATE_PER_SECOND,
+    VOTE_BURST,
+    BULK_VOTE_MAX_OPS,
+    BULK_VOTE_RATE_PER_SECOND,
+    BULK_VOTE_BURST,
+    STORAGE_BACKEND,
+)
+
+# A full-size bulk request must fit in a full bucket, buckets never go into debt
+BULK_BURST = max(BULK_VOTE_BURST, BULK_VOTE_MAX_OPS)
+
+ADMITTED = "admitted"
+RATE_LIMITED = "rate_limited"
+OUTCOMES = (ADMITTED, QUEUE_FULL, QUEUE_TIMEOUT, RATE_LIMITED)
+
+def rejection(reason: str, wait_ms: int = 0) -> tuple[int, int, dict]:
+    """(status, Retry-After seconds, response dict) for a refused request."""
+    if reason == RATE_LIMITED:
+        return 429, max(1, math.ceil(wait_ms / 1000)), {"success": False, "message": "Too many votes, slow down."}
+    return 503, ADMISSION_RETRY_AFTER_SECONDS, {"success": False, "message": "Server busy, retry later."}
+
+class AdmissionControl:
+    """
+    Load shedding in front of the vote endpoints. A request first needs a
+    slot from the process-wide ConcurrencyLimiter (waiting a bounded time
+    for one), then a token from its user's bucket; bulk requests take one
+    token per operation from a separate bulk bucket instead. Refused requests cost no
+    storage work past the bucket check and get a 503 (busy) or 429 (user
+    over their rate) with Retry-After, so the requests that are admitted keep
+    their latency when the offered load exceeds capacity.
+    """
+
+    def __init__(self):
+        self.enabled = ADMISSION_ENABLED
+        self.limiter = self._create_limiter()
+        self.buckets = None
+        if VOTE_RATE_PER_SECOND > 0:
+            self.buckets = self._create_buckets(VOTE_RATE_PER_SECOND, VOTE_BURST)
+        self.bulk_buckets = None
+        if BULK_VOTE_RATE_PER_SECOND > 0:
+            self.bulk_buckets = self._create_buckets(BULK_VOTE_RATE_PER_SECOND, BULK_BURST, BULK_BUCKET_KEY_PATTERN)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(OUTCOMES, 0)
+        registry.add_admission("votes", self.stats)
+
+    def _create_limiter(self):
+        return ConcurrencyLimiter(ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS)
+
+    def _create_buckets(self, rate: float, burst: int, key_pattern: str = BUCKET_KEY_PATTERN):
+        if STORAGE_BACKEND == MEMORY:
+            return MemoryTokenBuckets(rate, burst)
+        return TokenBuckets(RedisClient(), rate, burst, key_pattern)
+
+    def _buckets_for(self, bulk_ops: int | None) -> tuple:
+        """(buckets to charge, tokens to take)"""
+        if bulk_ops is None:
+            return self.buckets, 1
+        # Oversized requests are refused by the controller, free of charge
+        return self.bulk_buckets, bulk_ops if bulk_ops <= BULK_VOTE_MAX_OPS else 0
+
+    @contextmanager
+    def admit(self, user_id: str, bulk_ops: int = None):
+        """
+        Yields None for an admitted request, which holds its slot until the
+        block ends, or the rejection() to answer with. A single vote takes a
+        token from the user's vote bucket; a bulk request passes `bulk_ops`,
+        its operation count, and takes that many from the bulk bucket.
+        """
+        if not self.enabled:
+            yield None
+            return
+        reason = self.limiter.acquire()
+        if reason:
+            self._count(reason)
+            yield rejection(reason)
+            return
+        try:
+            buckets, cost = self._buckets_for(bulk_ops)
+            wait_ms = buckets.take(user_id, cost) if buckets and cost else 0
+            self._count(RATE_LIMITED if wait_ms else ADMITTED)
+            yield rejection(RATE_LIMITED, wait_ms) if wait_ms else None
+        finally:
+            self.limiter.release()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        shed = sum(counts.values()) - counts[ADMITTED]
+        total = shed + counts[ADMITTED]
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+            "requests": counts,
+            "shed": shed,
+            "shed_rate": round(shed / total, 4) if total else 0.0,
+        }
+
+class AsyncAdmissionControl(AdmissionControl):
+    """AdmissionControl for the async app; buckets always live in Redis."""
+
+    def _create_limiter(self):
+        return AsyncConcurrencyLimiter(ASYNC_ADMISSION_MAX_CONCURRENT, ASYNC_ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS)
+
+    def _create_buckets(self, rate: float, burst: int, key_pattern: str = BUCKET_KEY_PATTERN):
+        return AsyncTokenBuckets(AsyncRedisClient(), rate, burst, key_pattern)
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, bulk_ops: int = None):
+        if not self.enabled:
+            yield None
+            return
+        reason = await self.limiter.acquire()
+        if reason:
+            self._count(reason)
+            yield rejection(reason)
+            return
+        try:
+            buckets, cost = self._buckets_for(bulk_ops)
+            wait_ms = await buckets.take(user_id, cost) if buckets and cost else 0
+            self._count(RATE_LIMITED if wait_ms else ADMITTED)
+            yield rejection(RATE_LIMITED, wait_ms) if wait_ms else None
+        finally:
+            self.limiter.release()
@@ -0,0 +1,82 @@
+# admission/limiter.py
+import asyncio
+import threading
+
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at once. When every slot is taken up to
+    `max_queue` callers wait for one, each for at most `queue_timeout_ms`;
+    callers beyond that are refused at once instead of queueing, so waiting
+    time stays bounded however far the offered load overshoots. Per process.
+    """
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout_ms: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self._slots = threading.Semaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+
+    def acquire(self) -> str | None:
+        """None once a slot is held (release() it), else QUEUE_FULL or QUEUE_TIMEOUT."""
+        if self._slots.acquire(blocking=False):
+            self._enter()
+            return None
+        if not self._join_queue():
+            return QUEUE_FULL
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            self._leave_queue()
+        if not acquired:
+            return QUEUE_TIMEOUT
+        self._enter()
+        return None
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _join_queue(self) -> bool:
+        with self._lock:
+            if self.queued >= self.max_queue:
+                return False
+            self.queued += 1
+            return True
+
+    def _leave_queue(self):
+        with self._lock:
+            self.queued -= 1
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+class AsyncConcurrencyLimiter(ConcurrencyLimiter):
+    """ConcurrencyLimiter for coroutines on one event loop."""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout_ms: int):
+        super().__init__(limit, max_queue, queue_timeout_ms)
+        self._slots = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> str | None:
+        if not self._slots.locked():
+            await self._slots.acquire()  # a free slot: returns without suspending
+            self._enter()
+            return None
+        if not self._join_queue():
+            return QUEUE_FULL
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            return QUEUE_TIMEOUT
+        finally:
+            self._leave_queue()
+        self._enter()
+        return None
@@ -0,0 +1,89 @@
+# admission/token_bucket.py
+import math
+import threading
+import time
+
+# Takes ARGV[3] tokens from a bucket refilled continuously at ARGV[1] tokens
+# per second up to ARGV[2]. A take never leaves the bucket in debt, so the
+# cost must not exceed the burst. Time comes from the server, so workers with
+# skewed clocks share one view of every bucket; an idle bucket expires once
+# full.
+# KEYS: bucket hash | ARGV: rate, burst, cost
+# Returns 0 when the tokens were taken, else milliseconds until they can be.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait_ms = math.ceil((cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1)
+return wait_ms
+"""
+
+BUCKET_KEY_PATTERN = "ratelimit:vote:{user_id}"
+# Bulk ingestion has its own budget, see BULK_VOTE_RATE_PER_SECOND
+BULK_BUCKET_KEY_PATTERN = "ratelimit:bulk:{user_id}"
+
+class TokenBuckets:
+    """Per-user token buckets in Redis: one script call per take."""
+
+    def __init__(self, redis, rate: float, burst: int, key_pattern: str = BUCKET_KEY_PATTERN):
+        self.rate = rate
+        self.burst = burst
+        self.key_pattern = key_pattern
+        self._take_script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, user_id: str, cost: int = 1) -> int:
+        """0 when the user may go ahead with `cost` votes, else milliseconds until they may."""
+        return int(self._take_script(keys=[self.key_pattern.format(user_id=user_id)],
+                                     args=[self.rate, self.burst, cost]))
+
+class AsyncTokenBuckets(TokenBuckets):
+    async def take(self, user_id: str, cost: int = 1) -> int:
+        return int(await self._take_script(keys=[self.key_pattern.format(user_id=user_id)],
+                                           args=[self.rate, self.burst, cost]))
+
+# Full buckets are dropped once this many are held
+MEMORY_BUCKETS_SWEEP_SIZE = 100000
+
+class MemoryTokenBuckets:
+    """TokenBuckets held in this process, for the memory storage backend."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # user_id -> (tokens, at)
+        self._lock = threading.Lock()
+
+    def take(self, user_id: str, cost: int = 1) -> int:
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(self._buckets.get(user_id), now)
+            if tokens < cost:
+                self._buckets[user_id] = (tokens, now)
+                return math.ceil((cost - tokens) / self.rate * 1000)
+            if user_id not in self._buckets and len(self._buckets) >= MEMORY_BUCKETS_SWEEP_SIZE:
+                self._sweep(now)
+            self._buckets[user_id] = (tokens - cost, now)
+            return 0
+
+    def _tokens(self, bucket, now: float) -> float:
+        if bucket is None:
+            return self.burst
+        tokens, at = bucket
+        return min(self.burst, tokens + (now - at) * self.rate)
+
+    def _sweep(self, now: float):
+        self._buckets = {user_id: bucket for user_id, bucket in self._buckets.items()
+                         if self._tokens(bucket, now) < self.burst}
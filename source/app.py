@@ -1,13 +1,36 @@
 # app.py
+# Development: python app.py
+# Production:  gunicorn -c gunicorn.conf.py "app:create_app()"
 from flask import Flask
 from routes.userRoutes import user_routes
 from routes.songRoutes import song_routes
+from routes.json_provider import FastJSONProvider
+from metrics.http import instrument_flask
+from redis_client.redis_client import warm_up_pool
+from redis_client.replicas import enable_read_routing
+from storage.backend import REDIS
+from config.config import METRICS_ENABLED, REDIS_POOL_WARMUP, REDIS_REPLICA_URLS, STORAGE_BACKEND
 
-app = Flask(__name__)
+def create_app() -> Flask:
+    """
+    Build the app in the calling process. Controllers and Redis clients are
+    created lazily, so under a prefork server each worker builds its own pool
+    and threads; this only opens a few pooled connections up front.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
-# Register blueprints
-app.register_blueprint(user_routes, url_prefix='/user')
-app.register_blueprint(song_routes, url_prefix='/song')
+    # Register blueprints
+    app.register_blueprint(user_routes, url_prefix='/user')
+    app.register_blueprint(song_routes, url_prefix='/song')
+
+    if METRICS_ENABLED:
+        instrument_flask(app)
+    if REDIS_REPLICA_URLS and STORAGE_BACKEND == REDIS:
+        enable_read_routing(app)
+    if REDIS_POOL_WARMUP and STORAGE_BACKEND == REDIS:
+        warm_up_pool()
+    return app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
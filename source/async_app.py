@@ -0,0 +1,31 @@
+# async_app.py
+# Async serving mode: same /user and /song API as app.py on redis.asyncio.
+# Run with: hypercorn "async_app:create_app()" --bind 0.0.0.0:5000 --workers 4
+from quart import Quart
+from routes.asyncUserRoutes import async_user_routes
+from routes.asyncSongRoutes import async_song_routes
+from routes.json_provider import FastJSONProvider
+from metrics.http import instrument_quart
+from redis_client.async_redis_client import warm_up_async_pool
+from redis_client.replicas import enable_async_read_routing
+from config.config import METRICS_ENABLED, REDIS_POOL_WARMUP, REDIS_REPLICA_URLS
+
+def create_app() -> Quart:
+    app = Quart(__name__)
+    app.json = FastJSONProvider(app)
+
+    # Register blueprints
+    app.register_blueprint(async_user_routes, url_prefix='/user')
+    app.register_blueprint(async_song_routes, url_prefix='/song')
+
+    if METRICS_ENABLED:
+        instrument_quart(app)
+    if REDIS_REPLICA_URLS:
+        enable_async_read_routing(app)
+    if REDIS_POOL_WARMUP:
+        # The pool is bound to the serving loop, so warm it up from there
+        app.before_serving(warm_up_async_pool)
+    return app
+
+if __name__ == '__main__':
+    create_app().run(host='0.0.0.0', port=5000)
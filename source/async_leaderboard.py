@@ -0,0 +1,212 @@
+# async_leaderboard.py
+import uuid
+from redis_client.async_redis_client import (
+    AsyncRedisClient,
+    retry_redis_call_async,
+    async_shard_clients,
+    async_read_client,
+)
+from cache.metadata_cache import aget_songs_metadata
+from config.config import BULK_VOTE_BATCH_SIZE, LEADERBOARD_SHARD_URLS
+from leaderboard import Leaderboard, format_top_songs, rank_songs
+from leaderboard_shards import apply_score_deltas_async
+
+class AsyncLeaderboard(Leaderboard):
+    """
+    Leaderboard on redis.asyncio. Keys, scripts, the vote buffer and the
+    metadata cache are shared with the sync class; only the I/O differs.
+    The vote buffer keeps the sync shard clients, it flushes from its own thread.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.redis = AsyncRedisClient()
+        self.async_shard_clients = [self.redis, *async_shard_clients(LEADERBOARD_SHARD_URLS)]
+        self._register_scripts()
+
+    async def vote_song(self, user_id: str, song_id: str) -> int:
+        status = int(await self._queue_vote(self.redis, user_id, song_id))
+        if status == self.VOTE_OK:
+            await self._after_score_change(song_id, 1)
+        return status
+
+    async def unvote_song(self, user_id: str, song_id: str) -> int:
+        status = int(await self._queue_unvote(self.redis, user_id, song_id))
+        if status == self.UNVOTE_OK:
+            await self._after_score_change(song_id, -1)
+        return status
+
+    async def _after_score_change(self, song_id: str, delta: int):
+        if self.vote_buffer:
+            self.vote_buffer.add(song_id, delta)
+        elif not self.shards.is_local(song_id):
+            await self._apply_remote({song_id: delta})
+
+    async def _apply_remote(self, deltas: dict):
+        calls = self._remote_calls(deltas)
+        if calls:
+            await retry_redis_call_async(apply_score_deltas_async, self.async_shard_clients,
+                                         self._score_deltas_script, calls, self.VERSION_KEY,
+                                         str(uuid.uuid4()), set())
+
+    async def bulk_vote(self, operations: list) -> list[int]:
+        statuses = []
+        for start in range(0, len(operations), BULK_VOTE_BATCH_SIZE):
+            batch = operations[start:start + BULK_VOTE_BATCH_SIZE]
+            pipe = self.redis.pipeline(transaction=False)
+            for action, user_id, song_id in batch:
+                if action == "vote":
+                    # Script calls queue through a coroutine, plain commands
+                    # return the (awaitable) pipeline: await covers both
+                    await self._queue_vote(pipe, user_id, song_id)
+                else:
+                    await self._queue_unvote(pipe, user_id, song_id)
+            batch_statuses = [int(status) for status in await pipe.execute()]
+            self._buffer_deltas(batch, batch_statuses)
+            if not self.vote_buffer and self.shards.remote:
+                await self._apply_remote(self._batch_deltas(batch, batch_statuses))
+            statuses.extend(batch_statuses)
+        return statuses
+
+    def _reader(self, window: str = None):
+        return self.redis if window == "week" else async_read_client()
+
+    def _instance_reader(self, instance: int):
+        return self._reader() if instance == 0 else self.async_shard_clients[instance]
+
+    async def get_version(self) -> int:
+        return int(await retry_redis_call_async(self._reader().get, self.VERSION_KEY) or 0)
+
+    async def get_user_votes(self, user_id: str) -> list:
+        reader = self._reader()
+        ordinals = list(await reader.smembers(self.USER_VOTES_KEY_PATTERN.format(user_id=user_id)))
+        if not ordinals:
+            return []
+        return [song_id for song_id in await reader.hmget(self.SONG_ORDINALS_KEY, ordinals) if song_id is not None]
+
+    async def get_top_songs(self, top_n: int = 10, window: str = None) -> list:
+        if window:
+            pipe = self._reader(window).pipeline(transaction=False)
+            if window == "week":
+                await self._queue_window_refresh(pipe, window)
+            self._queue_window_top(pipe, window, top_n)
+            top_songs = (await pipe.execute())[-1]
+            metadata = await self.get_songs_metadata([song_id for song_id, _ in top_songs])
+            return format_top_songs(top_songs, metadata)
+
+        if self.shards.count > 1:
+            top_songs = await self._sharded_top(top_n)
+        else:
+            top_songs = await retry_redis_call_async(
+                self._reader().zrevrange,
+                self.LEADERBOARD_KEY,
+                0,
+                top_n - 1,
+                withscores=True
+            )
+        metadata = await self.get_songs_metadata([song_id for song_id, _ in top_songs])
+        return format_top_songs(top_songs, metadata)
+
+    async def get_songs_metadata(self, song_ids: list) -> dict:
+        return await aget_songs_metadata(self.redis, self.metadata_cache, song_ids)
+
+    async def _sharded_top(self, top_n: int) -> list:
+        lists = []
+        for instance, keys in self.shards.by_instance().items():
+            pipe = self._instance_reader(instance).pipeline(transaction=False)
+            for key in keys:
+                pipe.zrevrange(key, 0, top_n - 1, withscores=True)
+            lists.extend(await pipe.execute())
+        return self.shards.merge_top(lists, top_n)
+
+    def _shard_client(self, song_id: str):
+        return self.async_shard_clients[self.shards.instance_of(self.shards.shard_of(song_id))]
+
+    async def _sharded_scores(self, song_ids: list) -> dict:
+        by_instance = {}
+        for song_id in song_ids:
+            by_instance.setdefault(self.shards.instance_of(self.shards.shard_of(song_id)), []).append(song_id)
+        scores = {}
+        for instance, ids in by_instance.items():
+            pipe = self.async_shard_clients[instance].pipeline(transaction=False)
+            for song_id in ids:
+                pipe.zscore(self.shards.key_for(song_id), song_id)
+            scores.update(zip(ids, await pipe.execute()))
+        return scores
+
+    async def _sharded_ranks(self, song_ids: list) -> list:
+        scores = await self._sharded_scores(song_ids)
+        ranked = [song_id for song_id in dict.fromkeys(song_ids) if scores[song_id] is not None]
+        ahead = dict.fromkeys(ranked, 0)
+        for instance, keys in self.shards.by_instance().items():
+            pipe = self.async_shard_clients[instance].pipeline(transaction=False)
+            for key in keys:
+                for song_id in ranked:
+                    await self._rank_ahead_script(keys=[key], args=[scores[song_id], song_id], client=pipe)
+            counts = iter(await pipe.execute())
+            for _ in keys:
+                for song_id in ranked:
+                    ahead[song_id] += next(counts)
+        return [self._rank_entry(song_id, ahead.get(song_id), scores[song_id]) for song_id in song_ids]
+
+    async def _sharded_rank(self, song_id: str) -> int:
+        return (await self._sharded_ranks([song_id]))[0]["rank"]
+
+    async def get_song_ranks(self, song_ids: list, window: str = None) -> list:
+        if not song_ids:
+            return []
+        if self.shards.count > 1 and not window:
+            return await self._sharded_ranks(song_ids)
+        key = self.window_key(window)
+        pipe = self._reader(window).pipeline(transaction=False)
+        if window == "week":
+            await self._queue_window_refresh(pipe, window)
+        for song_id in song_ids:
+            pipe.zrevrank(key, song_id)
+            pipe.zscore(key, song_id)
+        replies = (await pipe.execute())[-2 * len(song_ids):]
+        return [self._rank_entry(song_id, rank, score, window)
+                for song_id, rank, score in zip(song_ids, replies[::2], replies[1::2])]
+
+    async def get_songs_around(self, song_id: str, k: int) -> tuple[int, list]:
+        score = await retry_redis_call_async(self._shard_client(song_id).zscore, self.shards.key_for(song_id), song_id)
+        if score is None:
+            return None
+        ahead, replies = 0, []
+        for instance, keys in self.shards.by_instance().items():
+            pipe = self.async_shard_clients[instance].pipeline(transaction=False)
+            for key in keys:
+                await self._rank_ahead_script(keys=[key], args=[score, song_id], client=pipe)
+                await self._neighbours_script(keys=[key], args=[score, song_id, k], client=pipe)
+            results = await pipe.execute()
+            ahead += sum(results[::2])
+            replies.extend(results[1::2])
+        first_rank, members = self._around_members(ahead + 1, song_id, score, k, replies)
+        metadata = await self.get_songs_metadata([member for member, _ in members])
+        return ahead + 1, rank_songs(first_rank, members, metadata)
+
+    async def remove_songs(self, song_ids: list):
+        groups = self.shards.group_songs(song_ids)
+        groups.setdefault(0, {})
+        for instance in sorted(groups, reverse=True):
+            pipe = self.async_shard_clients[instance].pipeline(transaction=False)
+            self._queue_remove_songs(pipe, instance, groups[instance], song_ids)
+            await pipe.execute()
+
+    async def get_song_rank(self, song_id: str, window: str = None) -> int:
+        if window:
+            pipe = self._reader(window).pipeline(transaction=False)
+            if window == "week":
+                await self._queue_window_refresh(pipe, window)
+            self._queue_window_rank(pipe, window, song_id)
+            rank, score = (await pipe.execute())[-2:]
+            return self._window_rank(rank, score)
+        if self.shards.count > 1:
+            return await self._sharded_rank(song_id)
+
+        rank = await retry_redis_call_async(self._reader().zrevrank, self.LEADERBOARD_KEY, song_id)
+        return rank + 1 if rank is not None else None
+
+    async def get_song_score(self, song_id: str) -> int:
+        score = await retry_redis_call_async(self._shard_client(song_id).zscore, self.shards.key_for(song_id), song_id)
+        return int(score) if score is not None else 0
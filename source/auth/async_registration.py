@@ -0,0 +1,128 @@
+# auth/async_registration.py
+import asyncio
+import uuid
+from redis_client.async_redis_client import AsyncRedisClient, async_read_client
+from models.user import Role, User
+from auth.registration import UserRegistration, is_admin
+from leaderboard import Leaderboard
+from jobs.purge import shared_purge_jobs, job_key, parse_job, purge_started, job_result, USERS
+from storage.redis_backend import UPDATE_USER_SCRIPT, USER_ORDINAL_KEY, role_key, update_user_keys, queue_add_users
+from cache.catalog_version import catalog_version_key, aget_catalog_version
+from config.config import LIST_PAGE_SIZE, BULK_CREATE_BATCH_SIZE
+
+class AsyncUserRegistration(UserRegistration):
+    """
+    UserRegistration on redis.asyncio, sharing keys and scripts with
+    RedisBackend. Always Redis, whatever STORAGE_BACKEND is.
+    """
+
+    def __init__(self):
+        self.redis = AsyncRedisClient()
+        self._update_user_script = self.redis.register_script(UPDATE_USER_SCRIPT)
+
+    async def register_user(self, username: str, role: Role = Role.USER) -> User:
+        user = User(user_id=str(uuid.uuid4()), username=username, role=role)
+        last_ordinal = await self.redis.incr(USER_ORDINAL_KEY)
+        pipe = self.redis.pipeline()
+        queue_add_users(pipe, [user], last_ordinal)
+        await pipe.execute()
+        return user
+
+    async def register_users(self, entries: list) -> list[User]:
+        users = []
+        for start in range(0, len(entries), BULK_CREATE_BATCH_SIZE):
+            batch = [User(user_id=str(uuid.uuid4()), username=username, role=role)
+                     for username, role in entries[start:start + BULK_CREATE_BATCH_SIZE]]
+            last_ordinal = await self.redis.incrby(USER_ORDINAL_KEY, len(batch))
+            pipe = self.redis.pipeline()
+            queue_add_users(pipe, batch, last_ordinal)
+            await pipe.execute()
+            users.extend(batch)
+        return users
+
+    async def catalog_version(self) -> int:
+        return await aget_catalog_version(async_read_client(), USERS)
+
+    async def get_all_non_admin_users(self) -> list[User]:
+        return list({u.user_id: u async for u in self.iter_users()}.values())
+
+    async def get_all_admin_users(self) -> list[User]:
+        return list({u.user_id: u async for u in self.iter_users(admins=True)}.values())
+
+    async def scan_users(self, cursor: int = 0, count: int = LIST_PAGE_SIZE,
+                         admins: bool = False) -> tuple[int, list[User]]:
+        role = Role.ADMIN if admins else Role.USER
+        reader = async_read_client()
+        cursor, user_ids = await reader.sscan(role_key(role), cursor=cursor, count=count)
+        pipe = reader.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hgetall(f"user:{user_id}")
+
+        users = []
+        for user_id, data in zip(user_ids, await pipe.execute()):
+            if data:
+                users.append(User(user_id=user_id,
+                                username=data.get("username", ""),
+                                role=Role(data.get("role"))))
+        return int(cursor), users
+
+    async def iter_users(self, admins: bool = False, count: int = LIST_PAGE_SIZE):
+        cursor = 0
+        while True:
+            cursor, users = await self.scan_users(cursor, count, admins)
+            for user in users:
+                yield user
+            if cursor == 0:
+                break
+
+    async def get_user(self, user_id: str) -> User | None:
+        data = await self.redis.hgetall(f"user:{user_id}")
+        if not data:
+            return None
+        return User(user_id=user_id, username=data.get("username"), role=Role(data.get("role")))
+
+    async def user_exists(self, user_id: str) -> bool:
+        return await self.redis.exists(f"user:{user_id}") == 1
+
+    async def update_user(self, user, target_user_id: str, new_username: str, new_role: str):
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can update users."}
+
+        try:
+            role = Role(new_role)
+        except ValueError:
+            return {"success": False, "message": "Invalid role."}
+
+        args = [new_username, role.value, role_key(role), target_user_id]
+        if not await self._update_user_script(keys=update_user_keys(target_user_id), args=args):
+            return {"success": False, "message": "User not found."}
+        return {"success": True, "message": "User updated."}
+
+    async def delete_user(self, user, target_user_id: str):
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can delete users."}
+
+        key = f"user:{target_user_id}"
+        if not await self.redis.exists(key):
+            return {"success": False, "message": "User not found."}
+
+        pipe = self.redis.pipeline()
+        pipe.delete(key, Leaderboard.USER_VOTES_KEY_PATTERN.format(user_id=target_user_id))
+        pipe.srem("users:set", target_user_id)
+        for role in Role:
+            pipe.srem(role_key(role), target_user_id)
+        pipe.incr(catalog_version_key(USERS))
+        await pipe.execute()
+        return {"success": True, "message": "User deleted."}
+
+    async def delete_all_users(self, admin_user) -> dict:
+        if not is_admin(admin_user):
+            return {"success": False, "message": "Permission denied."}
+
+        job_id, started = await asyncio.to_thread(shared_purge_jobs().start, USERS)
+        return purge_started(job_id, started)
+
+    async def purge_status(self, admin_user, job_id: str) -> dict:
+        if not is_admin(admin_user):
+            return {"success": False, "message": "Permission denied."}
+        return job_result(parse_job(job_id, await self.redis.hgetall(job_key(job_id))), USERS)
@@ -1,6 +1,7 @@
 # auth/auth.py
 from models.user import Role, User
 from auth.registration import UserRegistration
+from lazy import lazy
 
 def is_admin(user: User) -> bool:
     return user.role == Role.ADMIN
@@ -13,6 +14,6 @@ def can_manage(user: User) -> bool:
     # Only ADMIN can perform management tasks (e.g., adding songs)
     return user.role == Role.ADMIN
 
-user_reg = UserRegistration()
+user_reg = lazy(UserRegistration)
 def is_registered(user_id: str) -> bool:
-    return user_reg.user_exists(user_id)
+    return user_reg().user_exists(user_id)
@@ -1,89 +1,102 @@
 # auth/registration.py
 import uuid
-from redis_client.redis_client import RedisClient
 from models.user import Role, User
+from jobs.purge import purge_started, job_result, USERS
+from storage.backend import shared_storage
+from config.config import LIST_PAGE_SIZE, BULK_CREATE_MAX_ITEMS
 
 def is_admin(user: User) -> bool:
     return user.role == Role.ADMIN
 
+def validate_bulk_users(items) -> tuple[list, str]:
+    """(username, role) pairs from a register_bulk body, or an error message."""
+    if not isinstance(items, list) or not items:
+        return None, "users must be a non-empty list."
+    if len(items) > BULK_CREATE_MAX_ITEMS:
+        return None, f"At most {BULK_CREATE_MAX_ITEMS} users per request."
+    entries = []
+    for i, item in enumerate(items):
+        username = item.get("username") if isinstance(item, dict) else None
+        if not isinstance(username, str) or not username:
+            return None, f"Invalid user at index {i}."
+        try:
+            role = Role(item.get("role", "USER"))
+        except ValueError:
+            return None, f"Invalid role at index {i}."
+        entries.append((username, role))
+    return entries, None
+
 class UserRegistration:
     def __init__(self):
-        self.redis = RedisClient()
-        self.redis.delete("leaderboard")
+        self.storage = shared_storage()
 
     def register_user(self, username: str, role: Role = Role.USER) -> User:
-        user_id = str(uuid.uuid4())
-        key = f"user:{user_id}"
-
-        # Save user hash
-        self.redis.hset(key, mapping={
-            "username": username,
-            "role": role.value
-        })
-
-        # Add to users set
-        self.redis.sadd("users:set", user_id)
+        user = User(user_id=str(uuid.uuid4()), username=username, role=role)
+        self.storage.add_users([user])
+        return user
+
+    def register_users(self, entries: list) -> list[User]:
+        """
+        Register (username, role) pairs, stored in batches of
+        BULK_CREATE_BATCH_SIZE. Returns the users in order.
+        """
+        users = [User(user_id=str(uuid.uuid4()), username=username, role=role) for username, role in entries]
+        self.storage.add_users(users)
+        return users
 
-        return User(user_id=user_id, username=username, role=role)
+    def catalog_version(self) -> int:
+        """Bumped by every change to the user listing; read it before listing."""
+        return self.storage.get_catalog_version(USERS)
 
     def get_all_non_admin_users(self) -> list[User]:
-        # Pull only the registered user IDs
-        all_ids = self.redis.smembers("users:set")
-        users = []
-        for user_id in all_ids:
-            key = f"user:{user_id}"
-            data = self.redis.hgetall(key)
-            if not data:
-                continue
-            if data.get("role") != Role.ADMIN.value:
-                users.append(User(user_id=user_id,
-                                username=data.get("username", ""),
-                                role=Role(data.get("role"))))
-        return users
+        # SSCAN may repeat members, dedupe on user_id
+        return list({u.user_id: u for u in self.iter_users()}.values())
 
     def get_all_admin_users(self) -> list[User]:
-        all_ids = self.redis.smembers("users:set")
-        admins = []
-        for user_id in all_ids:
-            key = f"user:{user_id}"
-            data = self.redis.hgetall(key)
-            if data.get("role") == Role.ADMIN.value:
-                admins.append(User(user_id=user_id,
-                                username=data.get("username", ""),
-                                role=Role(data.get("role"))))
-        return admins
+        return list({u.user_id: u for u in self.iter_users(admins=True)}.values())
+
+    def scan_users(self, cursor: int = 0, count: int = LIST_PAGE_SIZE,
+                   admins: bool = False) -> tuple[int, list[User]]:
+        """
+        One page of the USER or ADMIN role index. Returns (next_cursor,
+        users); a next_cursor of 0 means done.
+        """
+        return self.storage.scan_users(Role.ADMIN if admins else Role.USER, cursor, count)
+
+    def iter_users(self, admins: bool = False, count: int = LIST_PAGE_SIZE):
+        """Yield users page by page in constant memory."""
+        cursor = 0
+        while True:
+            cursor, users = self.scan_users(cursor, count, admins)
+            yield from users
+            if cursor == 0:
+                break
 
     def get_user(self, user_id: str) -> User | None:
-        key = f"user:{user_id}"
-        data = self.redis.hgetall(key)
-        if not data:
-            return None
-        role = Role(data.get("role"))
-        return User(user_id=user_id, username=data.get("username"), role=role)
+        return self.storage.get_user(user_id)
 
     def user_exists(self, user_id: str) -> bool:
-        return self.redis.exists(f"user:{user_id}") == 1
+        return self.storage.user_exists(user_id)
 
     def update_user(self, user, target_user_id: str, new_username: str, new_role: str):
         if not is_admin(user):
             return {"success": False, "message": "Permission denied: Only admins can update users."}
 
-        key = f"user:{target_user_id}"
-        if not self.redis.exists(key):
-            return {"success": False, "message": "User not found."}
+        try:
+            role = Role(new_role)
+        except ValueError:
+            return {"success": False, "message": "Invalid role."}
 
-        self.redis.hset(key, mapping={"username": new_username, "role": new_role})
+        if not self.storage.update_user(target_user_id, new_username, role):
+            return {"success": False, "message": "User not found."}
         return {"success": True, "message": "User updated."}
 
     def delete_user(self, user, target_user_id: str):
         if not is_admin(user):
             return {"success": False, "message": "Permission denied: Only admins can delete users."}
 
-        key = f"user:{target_user_id}"
-        if not self.redis.exists(key):
+        if not self.storage.delete_user(target_user_id):
             return {"success": False, "message": "User not found."}
-
-        self.redis.delete(key)
         return {"success": True, "message": "User deleted."}
 
     # def delete_all_users(self, admin_user) -> dict:
@@ -118,18 +131,11 @@ class UserRegistration:
         if not is_admin(admin_user):
             return {"success": False, "message": "Permission denied."}
 
-        all_ids = self.redis.smembers("users:set")
-        deleted = 0
-        pipe = self.redis.pipeline()
-        for user_id in all_ids:
-            key = f"user:{user_id}"
-            data = self.redis.hgetall(key)
-            if data.get("role") == Role.ADMIN.value:
-                continue
-            pipe.delete(key)
-            pipe.srem("users:set", user_id)
-            pipe.delete(f"user:{user_id}:voted_songs")
-            deleted += 1
-        pipe.execute()
-
-        return {"success": True, "message": f"Deleted {deleted} users and their votes."}
+        # Only the USER index is walked; admins are never touched
+        job_id, started = self.storage.start_purge(USERS)
+        return purge_started(job_id, started)
+
+    def purge_status(self, admin_user, job_id: str) -> dict:
+        if not is_admin(admin_user):
+            return {"success": False, "message": "Permission denied."}
+        return job_result(self.storage.get_purge(job_id), USERS)
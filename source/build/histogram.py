@@ -0,0 +1,91 @@
+# Latency histogram used by main.py; results are saved with it so runs can be compared.
+SUB_BUCKET_BITS = 7  # 128 linear sub-buckets per power of two, < 1% relative error
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of integer values (microseconds). Values
+    below 2**SUB_BUCKET_BITS are exact, larger ones are kept with
+    SUB_BUCKET_BITS significant bits, so memory stays bounded however many
+    values are recorded and percentiles stay accurate in the tail.
+    Histograms merge by adding counts and round-trip through JSON.
+    """
+
+    def __init__(self):
+        self.counts = {}  # bucket lower bound -> count
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def bucket_of(value: int) -> int:
+        shift = max(0, value.bit_length() - SUB_BUCKET_BITS)
+        return (value >> shift) << shift
+
+    @staticmethod
+    def bucket_width(lower: int) -> int:
+        return 1 << max(0, lower.bit_length() - SUB_BUCKET_BITS)
+
+    def record(self, value: int, count: int = 1):
+        value = max(0, int(value))
+        bucket = self.bucket_of(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> int:
+        """Upper edge of the bucket holding the p-th percentile, capped at the exact max."""
+        if not self.total:
+            return 0
+        target = max(1, -(-self.total * p // 100))  # ceil
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(bucket + self.bucket_width(bucket) - 1, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def summary(self) -> dict:
+        """Percentiles in milliseconds."""
+        return {
+            "count": self.total,
+            "mean_ms": round(self.mean() / 1000, 3),
+            "p50_ms": self.percentile(50) / 1000,
+            "p90_ms": self.percentile(90) / 1000,
+            "p99_ms": self.percentile(99) / 1000,
+            "p99.9_ms": self.percentile(99.9) / 1000,
+            "max_ms": self.max / 1000,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "unit": "us",
+            "min": self.min,
+            "max": self.max,
+            "sum": self.sum,
+            "counts": {str(bucket): count for bucket, count in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(bucket): count for bucket, count in data["counts"].items()}
+        histogram.total = sum(histogram.counts.values())
+        histogram.sum = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
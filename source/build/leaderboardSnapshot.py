@@ -0,0 +1,56 @@
+# Leaderboard snapshots: scores, song metadata, users and votes in a
+# compact columnar file (see storage/snapshot.py), for load tests, disaster
+# recovery and offline analysis. Export and restore stream block by block.
+#
+#   python leaderboardSnapshot.py export snap.lbs
+#   python leaderboardSnapshot.py restore snap.lbs    # into an empty database only
+#   python leaderboardSnapshot.py info snap.lbs       # row counts and top songs, no Redis needed
+import heapq
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.snapshot import SnapshotReader, SCORES, SONGS
+
+TOP_N = int(os.getenv("TOP_N", 10))
+
+def print_counts(counts: dict, elapsed: float):
+    print(" | ".join(f"{kind}: {rows}" for kind, rows in counts.items()) + f" | {elapsed:.1f}s")
+
+def info(path: str):
+    with SnapshotReader(path) as snapshot:
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created_at))
+        print(f"{path}: {os.path.getsize(path)} bytes, created {created}, "
+              f"leaderboard version {snapshot.version}, user ordinal {snapshot.user_ordinal}, "
+              f"song ordinal {snapshot.song_ordinal}")
+        print(" | ".join(f"{kind}: {rows}" for kind, rows in snapshot.counts().items()))
+        # Top N straight off the mapped score columns, then titles for those only
+        top = heapq.nlargest(TOP_N, snapshot.rows(SCORES), key=lambda row: (row[1], row[0]))
+        wanted = {song_id for song_id, _ in top}
+        titles = {}
+        for song_id, title, artist, _ in snapshot.rows(SONGS):
+            if song_id in wanted:
+                titles[song_id] = f"{title} - {artist}"
+        for rank, (song_id, score) in enumerate(top, start=1):
+            print(f"{rank:>4}. {score:>10.0f}  {song_id}  {titles.get(song_id, 'Unknown')}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("export", "restore", "info"):
+        sys.exit("usage: python leaderboardSnapshot.py export|restore|info <file>")
+    command, path = sys.argv[1:]
+    if command == "info":
+        info(path)
+        sys.exit(0)
+
+    from storage.redis_backend import RedisBackend
+    from storage.snapshot import export_snapshot, restore_snapshot
+
+    started = time.perf_counter()
+    backend = RedisBackend()
+    try:
+        counts = export_snapshot(backend, path) if command == "export" else restore_snapshot(backend, path)
+    except ValueError as e:
+        sys.exit(str(e))
+    print_counts(counts, time.perf_counter() - started)
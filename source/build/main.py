@@ -1,16 +1,39 @@
-import requests
-import random
-import time
+# Open-loop load generator. Requests are started at a constant arrival rate
+# whether or not earlier ones have finished, and latency is measured from the
+# scheduled start, so a slow server shows up as latency instead of a lower
+# request rate (no coordinated omission).
+#
+#   python main.py                        run, write results to OUTPUT
+#   python main.py compare base.json new.json
+#                                         flag percentiles that regressed
+import asyncio
+import bisect
+import json
 import logging
 import os
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
+import random
+import sys
+import time
+import aiohttp
+from histogram import LatencyHistogram
 
 # Config
-TOTAL_ACTIONS = 10000
-WORKER_STEPS = [100, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000]
-BASE_URL = "http://127.0.0.1:5000"
+BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:5000")  # same for app.py and async_app.py
+RATE = float(os.getenv("RATE", 500))  # requests per second
+DURATION = float(os.getenv("DURATION", 30))  # seconds
+WARMUP = float(os.getenv("WARMUP", 2))  # seconds at RATE not recorded
+MIX = os.getenv("MIX", "vote=60,unvote=20,top=15,rank=5")  # relative weights
+ZIPF_S = float(os.getenv("ZIPF_S", 1.1))  # song popularity skew, 0 = uniform
+TOP_N = int(os.getenv("TOP_N", 10))
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 10000))  # arrivals beyond this are counted as dropped
+TIMEOUT = float(os.getenv("TIMEOUT", 10))
+SEED = os.getenv("SEED")
+OUTPUT = os.getenv("OUTPUT", f"logs/bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+REGRESSION_THRESHOLD = float(os.getenv("REGRESSION_THRESHOLD", 0.10))  # compare: allowed relative slowdown
+REGRESSION_MIN_MS = float(os.getenv("REGRESSION_MIN_MS", 0.5))  # compare: ignore smaller absolute changes
+COMPARED_PERCENTILES = ("p50_ms", "p99_ms", "p99.9_ms")
+
+OPERATIONS = ("vote", "unvote", "top", "rank")
 
 # Logging
 os.makedirs("logs", exist_ok=True)
@@ -21,130 +44,262 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# Shared state
-votes_map = {}
-votes_lock = threading.Lock()
-latencies = []
-lat_lock = threading.Lock()
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation in MIX: {name!r}")
+        weights[name] = float(weight)
+    if not any(weights.values()):
+        raise ValueError("MIX needs at least one positive weight.")
+    return weights
 
-success_counter = 0
-fail_counter = 0
-error_counter = 0
-counter_lock = threading.Lock()
+class ZipfSampler:
+    """Picks items with P(rank k) ~ 1 / k**s; popularity is shuffled over the items."""
 
-def get_all_users():
-    try:
-        response = requests.get(f"{BASE_URL}/user/users", timeout=10)
-        response.raise_for_status()
-        return response.json().get("user_ids", [])
-    except Exception as e:
-        logging.error(f"Failed to fetch users: {e}")
-        return []
+    def __init__(self, items: list, s: float, rng: random.Random):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.rng = rng
+        self.cumulative = []
+        total = 0.0
+        for k in range(1, len(self.items) + 1):
+            total += 1.0 / k ** s
+            self.cumulative.append(total)
 
-def get_all_songs():
-    try:
-        response = requests.get(f"{BASE_URL}/song/songs", timeout=10)
-        response.raise_for_status()
-        return response.json().get("song_ids", [])
-    except Exception as e:
-        logging.error(f"Failed to fetch songs: {e}")
-        return []
+    def sample(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return self.items[bisect.bisect_left(self.cumulative, point)]
+
+class Workload:
+    """
+    Picks the next request. Votes are tracked per user so unvotes target a
+    song the user voted for; a pick that can't be served falls back to a
+    vote after a bounded number of tries rather than looping.
+    """
+
+    def __init__(self, users: list, songs: list, mix: dict, rng: random.Random):
+        self.users = users
+        self.songs = ZipfSampler(songs, ZIPF_S, rng)
+        self.rng = rng
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.votes = {}  # user_id -> set of song_ids voted by this run
+
+    def next(self) -> tuple[str, str, str]:
+        """(operation, user_id, song_id)"""
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        user = self.rng.choice(self.users)
+        if operation == "unvote":
+            voted = self.votes.get(user)
+            if voted:
+                return "unvote", user, self.rng.choice(tuple(voted))
+            operation = "vote"
+        if operation == "vote":
+            voted = self.votes.get(user, ())
+            for _ in range(8):
+                song = self.songs.sample()
+                if song not in voted:
+                    break
+            return "vote", user, song
+        return operation, user, self.songs.sample()
 
-def vote(song_id, user_id, vote_action=True):
-    global success_counter, fail_counter, error_counter
+    def completed(self, operation: str, user: str, song: str, ok: bool):
+        if not ok:
+            return
+        if operation == "vote":
+            self.votes.setdefault(user, set()).add(song)
+        elif operation == "unvote":
+            self.votes.get(user, set()).discard(song)
 
-    endpoint = "vote" if vote_action else "unvote"
-    url = f"{BASE_URL}/user/{endpoint}/{song_id}"
-    headers = {
-        "X-User-Id": user_id,
-        "X-User-Role": "USER"
-    }
+class Results:
+    def __init__(self):
+        self.histograms = {op: LatencyHistogram() for op in OPERATIONS}
+        self.success = {op: 0 for op in OPERATIONS}
+        self.fail = {op: 0 for op in OPERATIONS}
+        self.errors = {op: 0 for op in OPERATIONS}
+        self.shed = {op: 0 for op in OPERATIONS}
+        self.dropped = 0
 
-    start = time.time()
+    def record(self, operation: str, latency_us: int, outcome: str):
+        # Shed requests are counted apart so the percentiles describe admitted ones
+        if outcome != "shed":
+            self.histograms[operation].record(latency_us)
+        getattr(self, outcome)[operation] += 1
+
+    def to_dict(self, elapsed: float, sent: int) -> dict:
+        overall = LatencyHistogram()
+        operations = {}
+        for op, histogram in self.histograms.items():
+            if not histogram.total and not self.shed[op]:
+                continue
+            overall.merge(histogram)
+            operations[op] = {
+                **histogram.summary(),
+                "success": self.success[op],
+                "fail": self.fail[op],
+                "errors": self.errors[op],
+                "shed": self.shed[op],
+                "histogram": histogram.to_dict(),
+            }
+        return {
+            "config": {
+                "base_url": BASE_URL,
+                "rate": RATE,
+                "duration": DURATION,
+                "mix": MIX,
+                "zipf_s": ZIPF_S,
+                "top_n": TOP_N,
+                "max_in_flight": MAX_IN_FLIGHT,
+            },
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "elapsed_s": round(elapsed, 3),
+            "sent": sent,
+            "achieved_rate": round(sent / elapsed, 1) if elapsed else 0,
+            "dropped": self.dropped,
+            "overall": overall.summary(),
+            "operations": operations,
+        }
+
+async def fetch_ids(session, path: str, field: str) -> list:
+    """All IDs from a cursor-paginated list endpoint (SSCAN may repeat members)."""
+    ids, cursor = {}, 0
+    while True:
+        async with session.get(f"{BASE_URL}{path}", params={"cursor": cursor, "count": 5000}) as response:
+            response.raise_for_status()
+            page = await response.json()
+        ids.update(dict.fromkeys(page.get(field, [])))
+        cursor = int(page.get("cursor", 0))
+        if cursor == 0:
+            return list(ids)
+
+def request_for(operation: str, user: str, song: str) -> tuple[str, str, dict]:
+    headers = {"X-User-Id": user, "X-User-Role": "USER"}
+    if operation in ("vote", "unvote"):
+        return "POST", f"{BASE_URL}/user/{operation}/{song}", headers
+    if operation == "top":
+        return "GET", f"{BASE_URL}/song/top?top_n={TOP_N}", headers
+    return "GET", f"{BASE_URL}/song/rank/{song}", headers
+
+async def issue(session, workload: Workload, results: Results, in_flight: list,
+                operation: str, user: str, song: str, scheduled: float, record: bool):
+    method, url, headers = request_for(operation, user, song)
+    outcome = "errors"
     try:
-        response = requests.post(url, headers=headers, timeout=10)
-        elapsed = time.time() - start
-
-        with lat_lock:
-            latencies.append(elapsed)
-
-        if response.status_code in [200, 201]:
-            with counter_lock:
-                success_counter += 1
-            return True
-        else:
-            with counter_lock:
-                fail_counter += 1
-            logging.error(f"Failed {endpoint} ({user_id} -> {song_id}): {response.status_code} - {response.text}")
-            return False
+        async with session.request(method, url, headers=headers) as response:
+            await response.read()
+            # "Already voted" answers are expected under a skewed mix
+            outcome = "success" if response.status in (200, 201) else "fail"
+            if response.status in (429, 503):
+                outcome = "shed"  # refused by admission control
+            elif outcome == "fail":
+                logging.error(f"Failed {operation} ({user} -> {song}): {response.status}")
     except Exception as e:
-        elapsed = time.time() - start
-        with counter_lock:
-            error_counter += 1
-        with lat_lock:
-            latencies.append(elapsed)
-        logging.error(f"Exception during {endpoint} ({user_id} -> {song_id}): {e}")
-        return False
-
-def simulate_votes(users, songs, total_actions, max_workers):
-    def attempt_action():
-        while True:
-            user = random.choice(users)
-            with votes_lock:
-                voted = votes_map.get(user, set())
-
-            if random.choice([True, False]):
-                options = list(set(songs) - voted)
-                if not options:
-                    continue
-                song = random.choice(options)
-                if vote(song, user, True):
-                    with votes_lock:
-                        votes_map.setdefault(user, set()).add(song)
-                break
-            else:
-                if not voted:
-                    continue
-                song = random.choice(list(voted))
-                if vote(song, user, False):
-                    with votes_lock:
-                        votes_map[user].remove(song)
-                break
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(attempt_action) for _ in range(total_actions)]
-        for _ in tqdm(as_completed(futures), total=total_actions, unit="action"):
-            pass
-
-def benchmark_scaling(users, songs, step_list):
-    global success_counter, fail_counter, error_counter, latencies
-    for workers in step_list:
-        print(f"\n--- Benchmark: {workers} workers ---")
-        logging.info(f"--- Starting benchmark with {workers} workers ---")
-
-        success_counter = fail_counter = error_counter = 0
-        latencies.clear()
-
-        start = time.time()
-        simulate_votes(users, songs, TOTAL_ACTIONS, workers)
-        elapsed = time.time() - start
-
-        avg_lat = sum(latencies) / len(latencies) if latencies else 0
-        p95_lat = sorted(latencies)[int(len(latencies) * 0.95)] if latencies else 0
-
-        print(f"Time: {elapsed:.2f}s | Success: {success_counter} | Fail: {fail_counter} | Errors: {error_counter}")
-        print(f"Avg Latency: {avg_lat:.3f}s | P95 Latency: {p95_lat:.3f}s")
-        logging.info(f"Completed in {elapsed:.2f}s | Avg: {avg_lat:.3f}s | P95: {p95_lat:.3f}s")
+        logging.error(f"Exception during {operation} ({user} -> {song}): {e}")
+    finally:
+        in_flight[0] -= 1
+    latency_us = int((time.perf_counter() - scheduled) * 1_000_000)
+    workload.completed(operation, user, song, outcome == "success")
+    if record:
+        results.record(operation, latency_us, outcome)
+
+async def run(users: list, songs: list) -> dict:
+    rng = random.Random(SEED)
+    workload = Workload(users, songs, parse_mix(MIX), rng)
+    results = Results()
+    in_flight = [0]
+    tasks = set()
+    interval = 1.0 / RATE
+    total = int((WARMUP + DURATION) * RATE)
+    warmup = int(WARMUP * RATE)
+
+    connector = aiohttp.TCPConnector(limit=MAX_IN_FLIGHT)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            record = i >= warmup
+            if in_flight[0] >= MAX_IN_FLIGHT:
+                if record:
+                    results.dropped += 1
+                continue
+            in_flight[0] += 1
+            operation, user, song = workload.next()
+            task = asyncio.create_task(
+                issue(session, workload, results, in_flight, operation, user, song, scheduled, record)
+            )
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        elapsed = time.perf_counter() - start - WARMUP
+    return results.to_dict(elapsed, total - warmup - results.dropped)
+
+async def load_ids() -> tuple[list, list]:
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300)) as session:
+        return await fetch_ids(session, "/user/users", "user_ids"), await fetch_ids(session, "/song/songs", "song_ids")
+
+def print_summary(report: dict):
+    print(f"Sent {report['sent']} in {report['elapsed_s']}s ({report['achieved_rate']}/s) | Dropped: {report['dropped']}")
+    print(f"{'op':<8}{'count':>9}{'fail':>7}{'err':>6}{'shed':>7}{'p50':>10}{'p99':>10}{'p99.9':>10}{'max':>10}  (ms)")
+    rows = [*report["operations"].items(), ("overall", {**report["overall"], "fail": "", "errors": "", "shed": ""})]
+    for op, stats in rows:
+        print(f"{op:<8}{stats['count']:>9}{stats['fail']:>7}{stats['errors']:>6}{stats.get('shed', 0):>7}"
+              f"{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['p99.9_ms']:>10.3f}{stats['max_ms']:>10.3f}")
+
+def compare(base_path: str, new_path: str) -> int:
+    """Print per-operation percentile changes; returns the number of regressions."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    if base["config"] != new["config"]:
+        print("Warning: runs used different configs, compare with care.")
+
+    regressions = 0
+    print(f"{'op':<8}{'percentile':<11}{'base':>10}{'new':>10}{'change':>10}")
+    for op, new_stats in {**new["operations"], "overall": new["overall"]}.items():
+        base_stats = base["overall"] if op == "overall" else base["operations"].get(op)
+        if not base_stats:
+            continue
+        for key in COMPARED_PERCENTILES:
+            old, cur = base_stats[key], new_stats[key]
+            change = (cur - old) / old if old else 0.0
+            regressed = change > REGRESSION_THRESHOLD and cur - old > REGRESSION_MIN_MS
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{op:<8}{key[:-3]:<11}{old:>10.3f}{cur:>10.3f}{change:>+10.1%}{flag}")
+    if base["achieved_rate"] and new["achieved_rate"] < base["achieved_rate"] * (1 - REGRESSION_THRESHOLD):
+        print(f"Achieved rate dropped: {base['achieved_rate']} -> {new['achieved_rate']}/s")
+        regressions += 1
+    print(f"{regressions} regression(s) over {REGRESSION_THRESHOLD:.0%}")
+    return regressions
 
 def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "compare":
+        sys.exit(1 if compare(sys.argv[2], sys.argv[3]) else 0)
+
     logging.info("Benchmark started")
-    users = get_all_users()
-    songs = get_all_songs()
+    users, songs = asyncio.run(load_ids())
     print(f"Fetched {len(users)} users and {len(songs)} songs.")
     if not users or not songs:
         print("Insufficient users or songs.")
         return
-    benchmark_scaling(users, songs, WORKER_STEPS)
+
+    print(f"Running {DURATION}s at {RATE}/s, mix {MIX}, zipf s={ZIPF_S}")
+    report = asyncio.run(run(users, songs))
+    print_summary(report)
+    os.makedirs(os.path.dirname(OUTPUT) or ".", exist_ok=True)
+    with open(OUTPUT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {OUTPUT}")
+    logging.info(f"Completed {report['sent']} requests | overall {report['overall']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,12 @@
+# One-time backfill of the users:role:* index sets for data created before
+# they existed. Run from source/build: python migrateRoleIndexes.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.redis_backend import RedisBackend
+
+if __name__ == "__main__":
+    result = RedisBackend().migrate_role_indexes()
+    print(f"Indexed {result['indexed']} | Skipped (missing or invalid role): {result['skipped']}")
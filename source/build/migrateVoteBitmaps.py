@@ -0,0 +1,16 @@
+# One-time move of votes from the per-user user:<id>:voted_songs sets to the
+# per-song voters bitmaps, giving every existing user an ordinal on the way.
+# Songs get an ordinal too, and the bitmaps are indexed into the per-user
+# user:<id>:votes sets that GET /user/votes reads.
+# Run from source/build with the app stopped: python migrateVoteBitmaps.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.redis_backend import RedisBackend
+
+if __name__ == "__main__":
+    result = RedisBackend().migrate_vote_bitmaps()
+    print(f"Ordinals assigned: {result['assigned']} | Votes moved: {result['votes']} | "
+          f"Song ordinals assigned: {result['songs']} | Votes indexed: {result['indexed']}")
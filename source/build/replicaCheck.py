@@ -0,0 +1,100 @@
+# Checks read-replica routing against two local redis-server processes, a
+# scratch primary and its replica (WRITE_BEHIND_ENABLED=0 so votes land at once):
+#
+#   redis-server --port 6379
+#   redis-server --port 6380 --replicaof 127.0.0.1 6379
+#   REDIS_REPLICA_URLS=redis://127.0.0.1:6380/0 python replicaCheck.py
+#
+# Reads go to the replica once it is healthy. The script then detaches it
+# (REPLICAOF NO ONE) to show a stale replica read, a writer's own reads on
+# the primary (from this process and, through the shared marker, from
+# another worker) and the fallback once the lag bound passes, and reattaches it.
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.backend import create_storage, REDIS
+from redis_client.replicas import (
+    begin_request,
+    end_request,
+    node_name,
+    read_target,
+    recent_writers,
+    shared_replica_monitor,
+)
+from models.user import Role, User
+from config.config import REDIS_HOST, REDIS_PORT, REDIS_REPLICA_URLS
+
+failures = []
+
+def check(name: str, actual, expected):
+    if actual != expected:
+        failures.append(f"{name}: expected {expected!r}, got {actual!r}")
+    print(f"{'ok  ' if actual == expected else 'FAIL'} {name}: {actual!r}")
+
+def wait_for(name: str, condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            sys.exit(f"timed out waiting for {name}")
+        time.sleep(0.05)
+
+def read_as(user_id: str = None):
+    """Start a GET request and return the node its reads go to."""
+    begin_request("GET", user_id)
+    return node_name(read_target())
+
+def run_checks(storage, monitor):
+    replica = monitor.clients[0]
+    wait_for("the replica to take reads", lambda: monitor.is_healthy(0))
+
+    user = User(user_id=str(uuid.uuid4()), username="replica-check", role=Role.USER)
+    songs = [str(uuid.uuid4()), str(uuid.uuid4())]
+    storage.add_users([user])
+    storage.add_songs([{"song_id": song_id, "title": "t", "artist": "a"} for song_id in songs])
+    storage.vote_song(user.user_id, songs[0])
+    wait_for("the vote to replicate", lambda: replica.zscore(storage.LEADERBOARD_KEY, songs[0]) is not None)
+
+    check("reads on the replica", read_as(), "replica1")
+    check("rank from the replica", storage.get_song_rank(songs[0]), 1)
+
+    replica.replicaof("NO", "ONE")
+    try:
+        begin_request("POST", user.user_id)
+        storage.vote_song(user.user_id, songs[1])
+        end_request("POST", user.user_id, 200)
+
+        check("other users read the replica", read_as(), "replica1")
+        check("stale rank from the replica", storage.get_song_rank(songs[1]), None)
+        check("the writer reads the primary", read_as(user.user_id), "primary")
+        check("fresh rank for the writer", storage.get_song_rank(songs[1]) is not None, True)
+        recent_writers._until.pop(user.user_id, None)  # as another worker sees it
+        check("the writer reads the primary elsewhere", read_as(user.user_id), "primary")
+
+        wait_for("the replica to fall behind", lambda: not monitor.is_healthy(0))
+        check("lagging replica skipped", read_as(), "primary")
+        check("fresh rank from the primary", storage.get_song_rank(songs[1]) is not None, True)
+    finally:
+        replica.replicaof(REDIS_HOST, REDIS_PORT)
+
+    wait_for("the replica to catch up", lambda: monitor.is_healthy(0), timeout=30.0)
+    check("reads back on the replica", read_as(), "replica1")
+    check("caught-up rank from the replica", storage.get_song_rank(songs[1]) is not None, True)
+
+    begin_request("POST")
+    for song_id in songs:
+        storage.delete_song(song_id)
+    storage.delete_user(user.user_id)
+
+if __name__ == "__main__":
+    if not REDIS_REPLICA_URLS:
+        sys.exit("Set REDIS_REPLICA_URLS to the replica, e.g. redis://127.0.0.1:6380/0")
+    storage = create_storage(REDIS)
+    monitor = shared_replica_monitor()
+    run_checks(storage, monitor)
+    print(monitor.stats())
+    print("ok" if not failures else f"{len(failures)} failed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,13 @@
+# One-time move of songs:leaderboard into the shard keys after turning on
+# LEADERBOARD_SHARDS. Stop the app first. Run from source/build: python reshardLeaderboard.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import Leaderboard
+
+if __name__ == "__main__":
+    leaderboard = Leaderboard()
+    moved = leaderboard.reshard()
+    print(f"Moved {moved} songs into {leaderboard.shards.count} shards")
@@ -1,26 +1,26 @@
-import subprocess
+import os
+import sys
+import time
+import requests
 
-numSongs = 100
-url = "http://127.0.0.1:5000/song/create"
+numSongs = int(os.getenv("NUM_SONGS", 100))
+batchSize = int(os.getenv("BATCH_SIZE", 10000))  # keep <= BULK_CREATE_MAX_ITEMS on the server
+BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:5000")
+url = f"{BASE_URL}/song/create_bulk"
 
 admin_id = "7d70364a-ad81-45cd-a50b-51ec0d467ca5"
 admin_role = "ADMIN"
+headers = {"X-User-Id": admin_id, "X-User-Role": admin_role}
 
-for i in range(1, numSongs + 1):
-    title = f"song{i}"
-    artist = f"artist{i}"
-    payload = f'{{"title": "{title}", "artist": "{artist}"}}'
-
-    cmd = [
-        "curl", "-s", "-X", "POST", url,
-        "-H", "Content-Type: application/json",
-        "-H", f"X-User-Id: {admin_id}",
-        "-H", f"X-User-Role: {admin_role}",
-        "-d", payload
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"Failed to create {title}: {result.stderr}")
-    else:
-        print(f"Created {title}: {result.stdout}")
+start = time.perf_counter()
+created = 0
+for first in range(1, numSongs + 1, batchSize):
+    last = min(first + batchSize, numSongs + 1)
+    payload = {"songs": [{"title": f"song{i}", "artist": f"artist{i}"} for i in range(first, last)]}
+    response = requests.post(url, json=payload, headers=headers, timeout=300)
+    if response.status_code != 201:
+        print(f"Failed to create song{first}..song{last - 1}: {response.status_code} {response.text}")
+        sys.exit(1)
+    created += response.json()["created"]
+    print(f"Created {created}/{numSongs} songs")
+print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,72 @@
+# Times the hot operations of either storage backend in-process so the two
+# can be compared. The conformance checks live in tests/test_storage_conformance.py.
+# The redis run needs a live server and purges every song and non-admin
+# user: point REDIS_DB at a scratch database.
+#
+#   python storageBench.py memory    ops/s and latency per operation
+#   python storageBench.py redis
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from histogram import LatencyHistogram
+from storage.backend import create_storage
+from jobs.purge import SONGS, USERS
+from models.user import Role, User
+
+# Bench config
+NUM_SONGS = int(os.getenv("NUM_SONGS", 10000))
+NUM_USERS = int(os.getenv("NUM_USERS", 1000))
+OPS = int(os.getenv("OPS", 20000))  # per operation
+TOP_N = int(os.getenv("TOP_N", 10))
+
+def purge(storage, kind: str) -> dict:
+    job_id, _ = storage.start_purge(kind)
+    while True:
+        job = storage.get_purge(job_id)
+        if job and job["status"] != "running":
+            return job
+        time.sleep(0.05)
+
+def new_user(name: str, role: Role = Role.USER) -> User:
+    return User(user_id=str(uuid.uuid4()), username=name, role=role)
+
+def timed(name: str, fn, args: list):
+    histogram = LatencyHistogram()
+    started = time.perf_counter()
+    for call_args in args:
+        call_started = time.perf_counter()
+        fn(*call_args)
+        histogram.record((time.perf_counter() - call_started) * 1_000_000)
+    elapsed = time.perf_counter() - started
+    summary = histogram.summary()
+    print(f"{name:<8} {len(args) / elapsed:>10.0f} ops/s   p50 {summary['p50_ms']:.3f} ms   "
+          f"p99 {summary['p99_ms']:.3f} ms   max {summary['max_ms']:.3f} ms")
+
+def run_bench(storage):
+    purge(storage, SONGS)
+    purge(storage, USERS)
+    users = [new_user(f"bench{i}") for i in range(NUM_USERS)]
+    storage.add_users(users)
+    song_ids = [str(uuid.uuid4()) for _ in range(NUM_SONGS)]
+    storage.add_songs([{"song_id": song_id, "title": "t", "artist": "a"} for song_id in song_ids])
+    print(f"{NUM_SONGS} songs, {NUM_USERS} users, {OPS} calls per operation")
+
+    votes = [(random.choice(users).user_id, random.choice(song_ids)) for _ in range(OPS)]
+    timed("vote", storage.vote_song, votes)
+    ranked = [song_id for _, song_id in votes]
+    timed("rank", storage.get_song_rank, [(random.choice(ranked),) for _ in range(OPS)])
+    timed("top", storage.get_top_songs, [(TOP_N,)] * OPS)
+    timed("around", storage.get_songs_around, [(random.choice(ranked), 5) for _ in range(OPS)])
+    timed("unvote", storage.unvote_song, votes)
+
+    purge(storage, SONGS)
+    purge(storage, USERS)
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "memory"
+    run_bench(create_storage(name))
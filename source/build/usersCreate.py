@@ -1,18 +1,33 @@
-import subprocess
+import os
+import sys
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
 
-numUsers = 10000
-url = "http://127.0.0.1:5000/user/register"
+numUsers = int(os.getenv("NUM_USERS", 10000))
+batchSize = int(os.getenv("BATCH_SIZE", 10000))  # keep <= BULK_CREATE_MAX_ITEMS on the server
+concurrency = int(os.getenv("CONCURRENCY", 4))
+BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:5000")
+url = f"{BASE_URL}/user/register_bulk"
 
-for i in range(1, numUsers + 1):
-    username = f"user{i}"
-    payload = f'{{"username": "{username}", "role": "USER"}}'
-    cmd = [
-        "curl", "-s", "-X", "POST", url,
-        "-H", "Content-Type: application/json",
-        "-d", payload
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"Failed to register {username}: {result.stderr}")
-    else:
-        print(f"Registered {username}: {result.stdout}")
+session = requests.Session()
+
+def register_batch(first):
+    last = min(first + batchSize, numUsers + 1)
+    payload = {"users": [{"username": f"user{i}", "role": "USER"} for i in range(first, last)]}
+    response = session.post(url, json=payload, timeout=300)
+    if response.status_code != 201:
+        raise RuntimeError(f"user{first}..user{last - 1}: {response.status_code} {response.text}")
+    return response.json()["created"]
+
+start = time.perf_counter()
+created = 0
+with ThreadPoolExecutor(max_workers=concurrency) as executor:
+    try:
+        for count in executor.map(register_batch, range(1, numUsers + 1, batchSize)):
+            created += count
+            print(f"Registered {created}/{numUsers} users")
+    except Exception as e:
+        print(f"Failed to register {e}")
+        sys.exit(1)
+print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,84 @@
+# Compares the Redis memory taken by the two vote layouts for the same
+# synthetic votes: per-user sets of song UUIDs (the old user:<id>:voted_songs)
+# against per-song bitmaps indexed by user ordinal (song:<id>:voters) plus
+# the per-user intsets of song ordinals that list a user's votes
+# (user:<id>:votes). Keys are written under a report: prefix, measured with
+# MEMORY USAGE and deleted.
+# Needs a real Redis server; point REDIS_DB at a scratch database.
+#
+#   NUM_USERS=10000 NUM_SONGS=100 VOTES_PER_USER=10 python voteMemoryReport.py
+import os
+import random
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from redis_client.redis_client import RedisClient
+
+NUM_USERS = int(os.getenv("NUM_USERS", 10000))
+NUM_SONGS = int(os.getenv("NUM_SONGS", 100))
+VOTES_PER_USER = int(os.getenv("VOTES_PER_USER", 10))
+BATCH_SIZE = 1000
+PREFIX = "report:"
+
+def write_votes(redis, votes: dict, song_ordinals: dict) -> tuple[list, list, list]:
+    """Both layouts for {user_ordinal: [song_id]}; returns (set keys, bitmap keys, index keys)."""
+    set_keys, bitmap_keys, index_keys = [], set(), []
+    pipe = redis.pipeline(transaction=False)
+    for ordinal, song_ids in votes.items():
+        user_id = uuid.uuid4()
+        set_key = f"{PREFIX}user:{user_id}:voted_songs"
+        pipe.sadd(set_key, *song_ids)
+        set_keys.append(set_key)
+        index_key = f"{PREFIX}user:{user_id}:votes"
+        pipe.sadd(index_key, *(song_ordinals[song_id] for song_id in song_ids))
+        index_keys.append(index_key)
+        for song_id in song_ids:
+            bitmap_key = f"{PREFIX}song:{song_id}:voters"
+            pipe.setbit(bitmap_key, ordinal, 1)
+            bitmap_keys.add(bitmap_key)
+        if len(pipe) >= BATCH_SIZE:
+            pipe.execute()
+    pipe.execute()
+    return set_keys, list(bitmap_keys), index_keys
+
+def memory_usage(redis, keys: list) -> int:
+    total = 0
+    for start in range(0, len(keys), BATCH_SIZE):
+        pipe = redis.pipeline(transaction=False)
+        for key in keys[start:start + BATCH_SIZE]:
+            pipe.memory_usage(key, samples=0)
+        total += sum(size or 0 for size in pipe.execute())
+    return total
+
+def delete_keys(redis, keys: list):
+    for start in range(0, len(keys), BATCH_SIZE):
+        redis.unlink(*keys[start:start + BATCH_SIZE])
+
+if __name__ == "__main__":
+    redis = RedisClient()
+    song_ids = [str(uuid.uuid4()) for _ in range(NUM_SONGS)]
+    song_ordinals = {song_id: ordinal for ordinal, song_id in enumerate(song_ids, start=1)}
+    per_user = min(VOTES_PER_USER, NUM_SONGS)
+    votes = {ordinal: random.sample(song_ids, per_user) for ordinal in range(1, NUM_USERS + 1)}
+    total_votes = NUM_USERS * per_user
+
+    set_keys, bitmap_keys, index_keys = write_votes(redis, votes, song_ordinals)
+    try:
+        set_bytes = memory_usage(redis, set_keys)
+        bitmap_bytes = memory_usage(redis, bitmap_keys)
+        index_bytes = memory_usage(redis, index_keys)
+    finally:
+        delete_keys(redis, set_keys + bitmap_keys + index_keys)
+
+    print(f"{NUM_USERS} users, {NUM_SONGS} songs, {total_votes} votes")
+    print(f"{'layout':<18} {'keys':>8} {'bytes':>12} {'bytes/vote':>11}")
+    rows = (
+        ("user vote sets", set_keys, set_bytes),
+        ("song bitmaps", bitmap_keys, bitmap_bytes),
+        ("user vote intsets", index_keys, index_bytes),
+    )
+    for name, keys, size in rows:
+        print(f"{name:<18} {len(keys):>8} {size:>12} {size / total_votes:>11.1f}")
+    print(f"bitmaps and intsets use {(bitmap_bytes + index_bytes) / set_bytes:.1%} of the sets' memory")
@@ -0,0 +1,14 @@
+# cache/catalog_version.py
+# Catalogue versions: one counter per listing kind (jobs.purge.SONGS, USERS),
+# bumped in the same pipeline or script as every write that changes what
+# /song/songs or /user/users return. The list routes build their ETags from
+# it, so a poll of an unchanged catalogue is answered from one GET.
+
+def catalog_version_key(kind: str) -> str:
+    return f"{kind}:catalog:version"
+
+def get_catalog_version(client, kind: str) -> int:
+    return int(client.get(catalog_version_key(kind)) or 0)
+
+async def aget_catalog_version(client, kind: str) -> int:
+    return int(await client.get(catalog_version_key(kind)) or 0)
@@ -0,0 +1,154 @@
+# cache/metadata_cache.py
+import threading
+import time
+from collections import OrderedDict
+from redis_client.subscriber import shared_subscriber
+from metrics.registry import registry
+
+# Payload is a song_id, or "*" to drop every cached entry
+INVALIDATION_CHANNEL = "songs:metadata:invalidate"
+INVALIDATE_ALL = "*"
+
+class MetadataCache:
+    """
+    Bounded LRU of song metadata ({"title", "artist"}) shared by every reader
+    in the process. Writers publish on INVALIDATION_CHANNEL so all workers
+    drop their copy; the TTL only guards against lost messages.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # song_id -> (cached_at, metadata)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._generation = 0  # bumped by invalidations, guards in-flight loads
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, song_ids: list, loader) -> dict:
+        """
+        Metadata for `song_ids`; `loader(missing_ids)` fetches the misses and
+        returns {song_id: metadata or None}. Unknown songs are not cached.
+        """
+        found, missing, generation = self.lookup(song_ids)
+        if missing:
+            self.store(found, loader(missing), generation)
+        return found
+
+    def lookup(self, song_ids: list) -> tuple[dict, list, int]:
+        """Split into (cached metadata, missing ids, generation to pass to store())."""
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for song_id in song_ids:
+                entry = self._entries.get(song_id)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self._entries.move_to_end(song_id)
+                    found[song_id] = entry[1]
+                else:
+                    missing.append(song_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing, self._generation
+
+    def store(self, found: dict, loaded: dict, generation: int):
+        now = time.monotonic()
+        with self._lock:
+            for song_id, metadata in loaded.items():
+                found[song_id] = metadata
+                # Don't cache a load that raced with an invalidation
+                if metadata is None or generation != self._generation:
+                    continue
+                self._entries[song_id] = (now, metadata)
+                self._entries.move_to_end(song_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, song_id: str = INVALIDATE_ALL):
+        with self._lock:
+            self._generation += 1
+            if song_id == INVALIDATE_ALL:
+                self._entries.clear()
+            else:
+                self._entries.pop(song_id, None)
+        for listener in self._listeners:
+            listener()
+
+    def add_listener(self, listener):
+        """Called after every invalidation, e.g. to drop results built from stale metadata."""
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+def _queue_metadata(pipe, song_ids: list):
+    for song_id in song_ids:
+        pipe.hmget(f"song:{song_id}:metadata", "title", "artist")
+
+def _parse_metadata(song_ids: list, rows: list) -> dict:
+    results = {}
+    for song_id, (title, artist) in zip(song_ids, rows):
+        if title is None and artist is None:
+            results[song_id] = None
+        else:
+            results[song_id] = {"title": title, "artist": artist}
+    return results
+
+def fetch_song_metadata(client, song_ids: list) -> dict:
+    """Pipelined HMGET of title/artist; None for songs without metadata."""
+    pipe = client.pipeline()
+    _queue_metadata(pipe, song_ids)
+    return _parse_metadata(song_ids, pipe.execute())
+
+async def afetch_song_metadata(client, song_ids: list) -> dict:
+    """fetch_song_metadata for a redis.asyncio client."""
+    pipe = client.pipeline()
+    _queue_metadata(pipe, song_ids)
+    return _parse_metadata(song_ids, await pipe.execute())
+
+def get_songs_metadata(client, cache, song_ids: list) -> dict:
+    """Metadata for `song_ids`, through `cache` when one is given."""
+    if not song_ids:
+        return {}
+    if cache is None:
+        return fetch_song_metadata(client, song_ids)
+    return cache.get_many(song_ids, lambda missing: fetch_song_metadata(client, missing))
+
+async def aget_songs_metadata(client, cache, song_ids: list) -> dict:
+    """get_songs_metadata for a redis.asyncio client."""
+    if not song_ids:
+        return {}
+    if cache is None:
+        return await afetch_song_metadata(client, song_ids)
+    found, missing, generation = cache.lookup(song_ids)
+    if missing:
+        cache.store(found, await afetch_song_metadata(client, missing), generation)
+    return found
+
+def publish_invalidation(client, song_id: str = INVALIDATE_ALL):
+    """Queue an invalidation on `client`, which may be a pipeline."""
+    return client.publish(INVALIDATION_CHANNEL, song_id)
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def shared_metadata_cache(max_entries: int, ttl_seconds: int) -> MetadataCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = MetadataCache(max_entries, ttl_seconds)
+            registry.add_cache("metadata", _shared_cache.stats)
+            shared_subscriber().subscribe(
+                INVALIDATION_CHANNEL,
+                _shared_cache.invalidate,
+                on_resync=_shared_cache.invalidate,
+            )
+        return _shared_cache
@@ -0,0 +1,131 @@
+# cache/top_songs_cache.py
+import threading
+import time
+
+class TopSongsCache:
+    """
+    In-process cache of top-N results keyed by (window key, top_n). Entries
+    are tagged with the leaderboard version they were built from: an entry
+    younger than `staleness_ms` is served as-is, an older one is revalidated
+    with a single version read and only rebuilt when the version moved.
+    `window_key(window)` names the bucket behind a window, so entries stop
+    matching when it rolls over.
+    """
+
+    def __init__(self, loader, version_fn, staleness_ms: int, max_entries: int, window_key=None):
+        self.loader = loader
+        self.version_fn = version_fn
+        self.window_key = window_key
+        self.staleness = staleness_ms / 1000.0
+        self.max_entries = max_entries
+
+        self._entries = {}  # (window key, top_n) -> (version, checked_at, results)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def get(self, top_n: int, window: str = None) -> list:
+        return self.get_tagged(top_n, window)[1]
+
+    def get_tagged(self, top_n: int, window: str = None) -> tuple[int, list]:
+        """(version the results were built from, results)"""
+        key = self._key(top_n, window)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[0], entry[2]
+        version = self.version_fn()
+        entry = self._revalidate(key, version)
+        if entry is not None:
+            return version, entry[2]
+        results = self.loader(top_n, window)
+        self._store(key, version, results)
+        return version, results
+
+    async def aget(self, top_n: int, window: str = None) -> list:
+        """Same as get() for a cache built from coroutine loader/version_fn."""
+        return (await self.aget_tagged(top_n, window))[1]
+
+    async def aget_tagged(self, top_n: int, window: str = None) -> tuple[int, list]:
+        key = self._key(top_n, window)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[0], entry[2]
+        version = await self.version_fn()
+        entry = self._revalidate(key, version)
+        if entry is not None:
+            return version, entry[2]
+        results = await self.loader(top_n, window)
+        self._store(key, version, results)
+        return version, results
+
+    def current_version(self, top_n: int, window: str = None) -> int:
+        """
+        Version get_tagged() would answer with right now, without loading
+        results or counting a lookup: a fresh entry's own version, else the
+        current one (a stale entry at another version would be rebuilt).
+        """
+        version = self._fresh_version(self._key(top_n, window))
+        return version if version is not None else self.version_fn()
+
+    async def acurrent_version(self, top_n: int, window: str = None) -> int:
+        version = self._fresh_version(self._key(top_n, window))
+        return version if version is not None else await self.version_fn()
+
+    def _key(self, top_n: int, window: str):
+        if window and self.window_key:
+            return (self.window_key(window), top_n)
+        return (window, top_n)
+
+    def _lookup(self, key: tuple):
+        # Entry young enough to serve without checking the version
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.staleness:
+            self._count_hit()
+            return entry
+        return None
+
+    def _fresh_version(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.staleness:
+            return entry[0]
+        return None
+
+    def _revalidate(self, key: tuple, version: int):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            entry = (version, time.monotonic(), entry[2])
+            self._entries[key] = entry
+            self._count_hit(revalidated=True)
+            return entry
+        return None
+
+    def _store(self, key: tuple, version: int, results: list):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Evict the entry that was checked longest ago
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                del self._entries[oldest]
+            self._entries[key] = (version, time.monotonic(), results)
+            self.misses += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _count_hit(self, revalidated: bool = False):
+        with self._lock:
+            self.hits += 1
+            if revalidated:
+                self.revalidations += 1
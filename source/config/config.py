@@ -2,9 +2,144 @@
 
 import os
 
+# Where users, songs and votes live: "redis", or "memory" for a single-process
+# in-memory engine (no Redis needed; data is lost on restart). The sync app only.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "redis")
+
 REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 
+# Per-process blocking connection pool, created on first use in each worker.
+# When every connection is busy a caller waits up to REDIS_POOL_TIMEOUT_SECONDS
+# and then fails instead of opening more connections.
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", 50))  # >= threads per worker + background threads
+REDIS_POOL_TIMEOUT_SECONDS = float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", 5))
+REDIS_POOL_WARMUP = int(os.getenv("REDIS_POOL_WARMUP", 4))  # connections opened by create_app
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))  # PING idle connections before reuse
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 2))
+
+# Read replicas of the primary (comma-separated redis:// URLs). Top songs,
+# ranks and the song/user listings are read from a replica at most
+# REDIS_REPLICA_MAX_LAG_MS behind, chosen "round_robin" or "least_latency";
+# with none healthy they fall back to the primary. Each request reads from a
+# single node; requests that write, and a user's reads shortly after their
+# own writes, use the primary.
+REDIS_REPLICA_URLS = [url for url in os.getenv("REDIS_REPLICA_URLS", "").split(",") if url]
+REDIS_REPLICA_SELECTION = os.getenv("REDIS_REPLICA_SELECTION", "round_robin")
+REDIS_REPLICA_MAX_LAG_MS = int(os.getenv("REDIS_REPLICA_MAX_LAG_MS", 500))
+REDIS_REPLICA_CHECK_INTERVAL_MS = int(os.getenv("REDIS_REPLICA_CHECK_INTERVAL_MS", 250))  # also the lag resolution
+
+# Shared redis.asyncio pool for the async serving mode (async_app.py)
+ASYNC_REDIS_MAX_CONNECTIONS = int(os.getenv("ASYNC_REDIS_MAX_CONNECTIONS", 1000))
+
+# /metrics in Prometheus text format: per-route latency, in-flight requests,
+# Redis commands and round trips per route, pool usage and cache hit rates
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Per-request Redis tracing (needs METRICS_ENABLED): an X-Redis-Trace header
+# in debug mode or when forced on, and a JSON line in the slow-request log
+# for requests over either threshold (0 disables that threshold)
+REQUEST_TRACE_HEADER = os.getenv("REQUEST_TRACE_HEADER", "0") == "1"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 250))
+SLOW_REQUEST_ROUND_TRIPS = int(os.getenv("SLOW_REQUEST_ROUND_TRIPS", 20))
+
+# Threads per gunicorn gthread worker, also read by gunicorn.conf.py
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", 8))
+
+# Admission control on /user/vote, /user/unvote and /user/votes. Per process
+# at most ADMISSION_MAX_CONCURRENT vote requests run at once and up to
+# ADMISSION_MAX_QUEUE more wait ADMISSION_QUEUE_TIMEOUT_MS for a slot; the
+# rest get a 503. A waiting request holds a gunicorn thread too, so both
+# default to a share of GUNICORN_THREADS and leave threads free to refuse
+# quickly; the async app has its own limits. Each user also has a token
+# bucket in Redis refilled at VOTE_RATE_PER_SECOND up to VOTE_BURST
+# (0 = no per-user limit), one token per vote; an empty bucket is a 429.
+# Bulk requests draw on a separate bucket, see BULK_VOTE_RATE_PER_SECOND.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", max(1, GUNICORN_THREADS // 2)))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", max(1, GUNICORN_THREADS // 4)))
+ASYNC_ADMISSION_MAX_CONCURRENT = int(os.getenv("ASYNC_ADMISSION_MAX_CONCURRENT", 32))  # < ASYNC_REDIS_MAX_CONNECTIONS
+ASYNC_ADMISSION_MAX_QUEUE = int(os.getenv("ASYNC_ADMISSION_MAX_QUEUE", 64))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 50))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))  # on 503s
+VOTE_RATE_PER_SECOND = float(os.getenv("VOTE_RATE_PER_SECOND", 10))
+VOTE_BURST = int(os.getenv("VOTE_BURST", 20))
+
+# Bulk vote ingestion (POST /user/votes)
+BULK_VOTE_MAX_OPS = int(os.getenv("BULK_VOTE_MAX_OPS", 10000))  # per request
+BULK_VOTE_BATCH_SIZE = int(os.getenv("BULK_VOTE_BATCH_SIZE", 1000))  # script calls per pipeline
+# Per-user bulk budget, apart from the vote bucket: one token per operation,
+# refilled at BULK_VOTE_RATE_PER_SECOND (0 = no limit) up to BULK_VOTE_BURST.
+# The burst is raised to BULK_VOTE_MAX_OPS if lower, so a full request fits.
+BULK_VOTE_RATE_PER_SECOND = float(os.getenv("BULK_VOTE_RATE_PER_SECOND", 1000))
+BULK_VOTE_BURST = int(os.getenv("BULK_VOTE_BURST", BULK_VOTE_MAX_OPS))
+
+# Bulk provisioning (POST /user/register_bulk, /song/create_bulk)
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", 10000))  # per request
+BULK_CREATE_BATCH_SIZE = int(os.getenv("BULK_CREATE_BATCH_SIZE", 1000))  # entities per MULTI/EXEC
+
+# Batch rank lookups (GET /song/ranks) and "around me" rank windows
+BULK_RANK_MAX_IDS = int(os.getenv("BULK_RANK_MAX_IDS", 1000))
+RANK_AROUND_MAX_K = int(os.getenv("RANK_AROUND_MAX_K", 50))
+
+# Response encoding: "orjson" when it is installed (the stdlib otherwise), or "json"
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson")
+
+# Cursor pagination for /song/songs and /user/users (SSCAN COUNT hint)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", 500))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", 5000))
+
+# Sharded leaderboard: scores spread over N sub-keys, each song hashed to one.
+# Shards go round-robin over the primary and any extra instances listed
+# (comma-separated redis:// URLs); users, votes and time buckets stay on the primary.
+LEADERBOARD_SHARDS = int(os.getenv("LEADERBOARD_SHARDS", 1))  # 1 = single songs:leaderboard key
+LEADERBOARD_SHARD_URLS = [url for url in os.getenv("LEADERBOARD_SHARD_URLS", "").split(",") if url]
+
+# delete_all runs as a background job: SSCAN batches, UNLINK, a pause between batches
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 500))
+PURGE_BATCH_PAUSE_MS = int(os.getenv("PURGE_BATCH_PAUSE_MS", 5))
+PURGE_JOB_TTL_SECONDS = int(os.getenv("PURGE_JOB_TTL_SECONDS", 86400))  # status kept after the job ends
+PURGE_LOCK_TTL_SECONDS = int(os.getenv("PURGE_LOCK_TTL_SECONDS", 60))  # refreshed every batch
+
+# Snapshot export/restore (build/leaderboardSnapshot.py): rows per block, which
+# is also the SCAN COUNT hint on export and one pipeline on restore. Blocks of
+# voter bitmaps and votes sets are cut early once they hold SNAPSHOT_BLOCK_MAX_BYTES.
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", 5000))
+SNAPSHOT_BLOCK_MAX_BYTES = int(os.getenv("SNAPSHOT_BLOCK_MAX_BYTES", 64 * 1024 * 1024))
+
+# Write-behind scoring: dedupe stays synchronous, score deltas are summed
+# in-process and flushed every interval or once enough votes are pending
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "0") == "1"
+WRITE_BEHIND_FLUSH_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", 50))
+WRITE_BEHIND_FLUSH_MAX_VOTES = int(os.getenv("WRITE_BEHIND_FLUSH_MAX_VOTES", 1000))
+
+# Hour/day/week leaderboards: votes also go to expiring per-bucket sorted
+# sets; "week" is served from a rollup refreshed at most once per TTL
+WINDOWED_LEADERBOARDS_ENABLED = os.getenv("WINDOWED_LEADERBOARDS_ENABLED", "1") == "1"
+WINDOW_ROLLUP_TTL_MS = int(os.getenv("WINDOW_ROLLUP_TTL_MS", 1000))
+
+# In-process /song/top cache, revalidated against the leaderboard version
+TOP_CACHE_ENABLED = os.getenv("TOP_CACHE_ENABLED", "1") == "1"
+TOP_CACHE_STALENESS_MS = int(os.getenv("TOP_CACHE_STALENESS_MS", 100))  # served without a version check
+TOP_CACHE_MAX_ENTRIES = int(os.getenv("TOP_CACHE_MAX_ENTRIES", 64))  # distinct (window, top_n) pairs
+
+# Per-process LRU of song metadata, invalidated over pub/sub
+METADATA_CACHE_ENABLED = os.getenv("METADATA_CACHE_ENABLED", "1") == "1"
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", 10000))
+METADATA_CACHE_TTL_SECONDS = int(os.getenv("METADATA_CACHE_TTL_SECONDS", 300))  # safety net for lost messages
+
+# Server-Sent Events stream for /song/top/stream
+STREAM_POLL_INTERVAL_MS = int(os.getenv("STREAM_POLL_INTERVAL_MS", 100))  # one version check per process
+STREAM_HEARTBEAT_SECONDS = int(os.getenv("STREAM_HEARTBEAT_SECONDS", 15))
+STREAM_MAX_TOP_N = int(os.getenv("STREAM_MAX_TOP_N", 100))
+# An open stream holds a gthread thread for as long as it lasts, so the sync
+# app serves at most this many per worker (0 = no limit, streams may then
+# take every thread) and answers 503 with Retry-After beyond that. Half the
+# threads by default, the rest stay free for votes and reads. The async app
+# has no such limit.
+STREAM_MAX_PER_WORKER = int(os.getenv("STREAM_MAX_PER_WORKER", max(1, GUNICORN_THREADS // 2)))
+
 # Additional configs can be added here, e.g.:
 # VOTE_EXPIRATION_SECONDS = 86400  # if vote expiration is required
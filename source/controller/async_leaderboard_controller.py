@@ -0,0 +1,123 @@
+# controller/async_leaderboard_controller.py
+from auth.auth import can_vote
+from async_leaderboard import AsyncLeaderboard
+from models.user import User
+from cache.top_songs_cache import TopSongsCache
+from metrics.registry import registry
+from stream.leaderboard_watcher import AsyncLeaderboardWatcher
+from controller.leaderboard_controller import (
+    CANNOT_VOTE,
+    vote_result,
+    unvote_result,
+    validate_bulk_operations,
+    bulk_vote_response,
+    resolve_window,
+    around_result,
+    votes_target,
+    top_etag,
+)
+from config.config import (
+    BULK_VOTE_MAX_OPS,
+    BULK_RANK_MAX_IDS,
+    RANK_AROUND_MAX_K,
+    TOP_CACHE_ENABLED,
+    TOP_CACHE_STALENESS_MS,
+    TOP_CACHE_MAX_ENTRIES,
+    STREAM_POLL_INTERVAL_MS,
+)
+
+class AsyncLeaderboardController:
+    def __init__(self):
+        self.leaderboard = AsyncLeaderboard()
+        self.top_cache = None
+        if TOP_CACHE_ENABLED:
+            self.top_cache = TopSongsCache(
+                self.leaderboard.get_top_songs,
+                self.leaderboard.get_version,
+                TOP_CACHE_STALENESS_MS,
+                TOP_CACHE_MAX_ENTRIES,
+                self.leaderboard.window_key,
+            )
+            registry.add_cache("top_songs", self.top_cache.stats)
+            if self.leaderboard.metadata_cache:
+                self.leaderboard.metadata_cache.add_listener(self.top_cache.invalidate)
+        self.watcher = AsyncLeaderboardWatcher(self.leaderboard, STREAM_POLL_INTERVAL_MS)
+
+    async def vote(self, user: User, song_id: str) -> dict:
+        if not can_vote(user):
+            return {"success": False, "message": CANNOT_VOTE}
+        return vote_result(await self.leaderboard.vote_song(user.user_id, song_id))
+
+    async def unvote(self, user: User, song_id: str) -> dict:
+        if not can_vote(user):
+            return {"success": False, "message": "Permission denied: Cannot unvote."}
+        return unvote_result(await self.leaderboard.unvote_song(user.user_id, song_id))
+
+    async def user_votes(self, user: User, target_user_id: str = None) -> dict:
+        target_user_id, error = votes_target(user, target_user_id)
+        if error:
+            return error
+        return {"success": True, "user_id": target_user_id,
+                "song_ids": await self.leaderboard.get_user_votes(target_user_id)}
+
+    async def bulk_vote(self, user: User, operations: list) -> dict:
+        if not can_vote(user):
+            return {"success": False, "message": CANNOT_VOTE}
+        if len(operations) > BULK_VOTE_MAX_OPS:
+            return {"success": False, "message": f"At most {BULK_VOTE_MAX_OPS} operations per request."}
+
+        results, accepted = validate_bulk_operations(user, operations)
+        statuses = await self.leaderboard.bulk_vote([op[1:] for op in accepted])
+        return bulk_vote_response(results, accepted, statuses)
+
+    async def top_songs(self, top_n: int = 10, window: str = None) -> dict:
+        return (await self.tagged_top_songs(top_n, window))[1]
+
+    async def tagged_top_songs(self, top_n: int = 10, window: str = None) -> tuple[str, dict]:
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return None, error
+        if self.top_cache:
+            version, results = await self.top_cache.aget_tagged(top_n, window)
+        else:
+            version = await self.leaderboard.get_version()
+            results = await self.leaderboard.get_top_songs(top_n, window)
+        return top_etag(self.leaderboard, version, top_n, window), {"success": True, "data": results}
+
+    async def top_songs_etag(self, top_n: int = 10, window: str = None) -> str | None:
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return None
+        if self.top_cache:
+            version = await self.top_cache.acurrent_version(top_n, window)
+        else:
+            version = await self.leaderboard.get_version()
+        return top_etag(self.leaderboard, version, top_n, window)
+
+    def top_cache_stats(self) -> dict:
+        if not self.top_cache:
+            return {"success": True, "enabled": False}
+        return {"success": True, "enabled": True, **self.top_cache.stats()}
+
+    def write_behind_lag(self) -> dict:
+        return {"success": True, "write_behind": self.leaderboard.write_behind_lag()}
+
+    async def song_rank(self, song_id: str, window: str = None) -> dict:
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return error
+        rank = await self.leaderboard.get_song_rank(song_id, window)
+        if rank is None:
+            return {"success": False, "message": "Song not ranked."}
+        return {"success": True, "rank": rank}
+
+    async def song_ranks(self, song_ids: list, window: str = None) -> dict:
+        if len(song_ids) > BULK_RANK_MAX_IDS:
+            return {"success": False, "message": f"At most {BULK_RANK_MAX_IDS} song IDs per request."}
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return error
+        return {"success": True, "data": await self.leaderboard.get_song_ranks(song_ids, window)}
+
+    async def songs_around(self, song_id: str, k: int) -> dict:
+        return around_result(await self.leaderboard.get_songs_around(song_id, max(0, min(k, RANK_AROUND_MAX_K))))
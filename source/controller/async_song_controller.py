@@ -0,0 +1,138 @@
+# controller/async_song_controller.py
+import asyncio
+from redis_client.async_redis_client import AsyncRedisClient, async_read_client
+from models.song import Song
+from auth.auth import is_admin
+from leaderboard import Leaderboard
+from async_leaderboard import AsyncLeaderboard
+from jobs.purge import shared_purge_jobs, job_key, parse_job, purge_started, job_result, SONGS
+from cache.metadata_cache import aget_songs_metadata, publish_invalidation, INVALIDATE_ALL
+from cache.catalog_version import catalog_version_key, aget_catalog_version
+from controller.song_controller import SongController
+from storage.redis_backend import SONG_ORDINAL_KEY, queue_add_songs
+from config.config import LIST_PAGE_SIZE, BULK_CREATE_BATCH_SIZE
+
+class AsyncSongController(SongController):
+    """
+    SongController on redis.asyncio, sharing keys and the metadata cache
+    with RedisBackend. Always Redis, whatever STORAGE_BACKEND is.
+    """
+
+    def __init__(self):
+        self.redis = AsyncRedisClient()
+        self.leaderboard = AsyncLeaderboard()
+        self.metadata_cache = self.leaderboard.metadata_cache
+        self.purge_jobs = shared_purge_jobs()
+
+    async def create_song(self, user, title: str, artist: str) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can create songs."}
+
+        song = self._new_songs([(title, artist)])[0]
+        last_ordinal = await self.redis.incr(SONG_ORDINAL_KEY)
+        pipe = self.redis.pipeline()
+        queue_add_songs(pipe, [song], last_ordinal)
+        await pipe.execute()
+        return {"success": True, **song}
+
+    async def create_songs(self, user, entries: list) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can create songs."}
+
+        songs = []
+        for start in range(0, len(entries), BULK_CREATE_BATCH_SIZE):
+            batch = self._new_songs(entries[start:start + BULK_CREATE_BATCH_SIZE])
+            last_ordinal = await self.redis.incrby(SONG_ORDINAL_KEY, len(batch))
+            pipe = self.redis.pipeline()
+            queue_add_songs(pipe, batch, last_ordinal)
+            await pipe.execute()
+            songs.extend(batch)
+        return {"success": True, "created": len(songs), "songs": songs}
+
+    async def get_song(self, song_id: str) -> Song | None:
+        data = (await self._get_metadata([song_id])).get(song_id)
+        if not data:
+            return None
+        return Song(song_id=song_id, title=data.get("title"), artist=data.get("artist"))
+
+    async def catalog_version(self) -> int:
+        return await aget_catalog_version(async_read_client(), SONGS)
+
+    async def list_songs(self) -> list[Song]:
+        return list({s.song_id: s async for s in self.iter_songs()}.values())
+
+    async def scan_songs(self, cursor: int = 0, count: int = LIST_PAGE_SIZE) -> tuple[int, list[Song]]:
+        cursor, song_ids = await async_read_client().sscan("songs:set", cursor=cursor, count=count)
+        metadata = await self._get_metadata(song_ids)
+        songs = []
+        for sid in song_ids:
+            data = metadata.get(sid)
+            if data:
+                songs.append(Song(song_id=sid, title=data.get("title"), artist=data.get("artist")))
+        return int(cursor), songs
+
+    async def iter_songs(self, count: int = LIST_PAGE_SIZE):
+        cursor = 0
+        while True:
+            cursor, songs = await self.scan_songs(cursor, count)
+            for song in songs:
+                yield song
+            if cursor == 0:
+                break
+
+    async def _get_metadata(self, song_ids: list) -> dict:
+        return await aget_songs_metadata(self.redis, self.metadata_cache, song_ids)
+
+    async def _invalidate_metadata(self, song_id: str = INVALIDATE_ALL):
+        await publish_invalidation(self.redis, song_id)
+        if self.metadata_cache:
+            self.metadata_cache.invalidate(song_id)
+
+    async def update_song(self, user, song_id: str, title: str, artist: str) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can update songs."}
+
+        key = f"song:{song_id}:metadata"
+        if not await self.redis.exists(key):
+            return {"success": False, "message": "Song not found."}
+
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={"title": title, "artist": artist})
+        pipe.incr(Leaderboard.VERSION_KEY)
+        pipe.incr(catalog_version_key(SONGS))
+        await pipe.execute()
+        await self._invalidate_metadata(song_id)
+        return {"success": True, "message": "Song updated."}
+
+    async def delete_song(self, user, song_id: str) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can delete songs."}
+
+        key = f"song:{song_id}:metadata"
+        title, ordinal = await self.redis.hmget(key, "title", "ordinal")
+        if title is None:
+            return {"success": False, "message": "Song not found."}
+
+        pipe = self.redis.pipeline()
+        pipe.unlink(key, f"song:{song_id}")
+        if ordinal is not None:
+            pipe.hdel(Leaderboard.SONG_ORDINALS_KEY, ordinal)
+        pipe.srem("songs:set", song_id)
+        pipe.incr(catalog_version_key(SONGS))
+        await pipe.execute()
+        await self.leaderboard.remove_songs([song_id])
+        await self._invalidate_metadata(song_id)
+        return {"success": True, "message": "Song deleted."}
+
+    async def delete_all_songs(self, user) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied."}
+
+        # The job itself runs on a thread with the sync client
+        job_id, started = await asyncio.to_thread(self.purge_jobs.start, SONGS)
+        return purge_started(job_id, started)
+
+    async def purge_status(self, user, job_id: str) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied."}
+        return job_result(parse_job(job_id, await self.redis.hgetall(job_key(job_id))), SONGS)
@@ -1,34 +1,199 @@
 # controller/leaderboard_controller.py
-from auth.auth import can_vote
+from auth.auth import can_vote, is_admin
 from leaderboard import Leaderboard
 from models.user import User
+from cache.top_songs_cache import TopSongsCache
+from metrics.registry import registry
+from stream.leaderboard_watcher import shared_watcher
+from storage.backend import shared_storage
+from time_windows import ALL_TIME, WINDOWS
+from config.config import (
+    BULK_VOTE_MAX_OPS,
+    BULK_RANK_MAX_IDS,
+    RANK_AROUND_MAX_K,
+    TOP_CACHE_ENABLED,
+    TOP_CACHE_STALENESS_MS,
+    TOP_CACHE_MAX_ENTRIES,
+    STREAM_POLL_INTERVAL_MS,
+)
+
+VOTE_ACTIONS = ("vote", "unvote")
+CANNOT_VOTE = "Permission denied: Cannot vote."
+WINDOW_CHOICES = (ALL_TIME, *WINDOWS)
+
+# Response mapping shared with the async controller
+def vote_result(status: int) -> dict:
+    if status == Leaderboard.VOTE_UNKNOWN_SONG:
+        return {"success": False, "message": "Song not found."}
+    if status != Leaderboard.VOTE_OK:
+        return {"success": False, "message": "Already voted for this song."}
+    return {"success": True, "message": "Vote registered."}
+
+def unvote_result(status: int) -> dict:
+    if status != Leaderboard.UNVOTE_OK:
+        return {"success": False, "message": "You have not voted for this song."}
+    return {"success": True, "message": "Vote removed."}
+
+def resolve_window(leaderboard: Leaderboard, window: str) -> tuple[str, dict]:
+    """(window to query, None for all time; error dict when windows are disabled)"""
+    if window in (None, ALL_TIME):
+        return None, None
+    if not leaderboard.windows:
+        return None, {"success": False, "message": "Windowed leaderboards are disabled."}
+    return window, None
+
+def top_etag(leaderboard, version: int, top_n: int, window: str) -> str:
+    # The window key moves when a bucket rolls over, even if nobody voted
+    return f"top:{version}:{leaderboard.window_key(window)}:{top_n}"
+
+def votes_target(user: User, target_user_id: str) -> tuple[str, dict]:
+    """(whose votes to list, error dict when the user may not see them)"""
+    target_user_id = target_user_id or user.user_id
+    # Only admins may list another user's votes
+    if target_user_id != user.user_id and not is_admin(user):
+        return None, {"success": False, "message": "Permission denied: Cannot list another user's votes."}
+    return target_user_id, None
+
+def around_result(around) -> dict:
+    if around is None:
+        return {"success": False, "message": "Song not ranked."}
+    rank, songs = around
+    return {"success": True, "rank": rank, "data": songs}
+
+def is_id(value) -> bool:
+    # Lists, dicts or numbers from the JSON body would reach redis-py and fail there
+    return isinstance(value, str) and bool(value)
+
+def validate_bulk_operations(user: User, operations: list) -> tuple[list, list]:
+    """
+    Returns (results, accepted): results has an error dict for every rejected
+    operation and None for the others; accepted holds (index, action, user_id,
+    song_id) for the operations to run.
+    """
+    results = [None] * len(operations)
+    accepted = []
+    for i, op in enumerate(operations):
+        if not isinstance(op, dict):
+            results[i] = {"success": False, "message": "Invalid operation."}
+            continue
+        action = op.get("action", "vote")
+        song_id = op.get("song_id")
+        user_id = op.get("user_id", user.user_id)
+        if action not in VOTE_ACTIONS or not is_id(song_id) or not is_id(user_id):
+            results[i] = {"success": False, "message": "Invalid operation."}
+            continue
+        # Only admins may submit votes on behalf of other users
+        if user_id != user.user_id and not is_admin(user):
+            results[i] = {"success": False, "message": "Permission denied: Cannot vote for another user."}
+            continue
+        accepted.append((i, action, user_id, song_id))
+    return results, accepted
+
+def bulk_vote_response(results: list, accepted: list, statuses: list) -> dict:
+    for (i, action, _, _), status in zip(accepted, statuses):
+        results[i] = vote_result(status) if action == "vote" else unvote_result(status)
+    succeeded = sum(1 for r in results if r["success"])
+    return {"success": True, "processed": len(results), "succeeded": succeeded, "results": results}
 
 class LeaderboardController:
     def __init__(self):
-        self.leaderboard = Leaderboard()
+        # Leaderboard itself (RedisBackend) or the in-memory engine
+        self.leaderboard = shared_storage()
+        self.top_cache = None
+        if TOP_CACHE_ENABLED:
+            self.top_cache = TopSongsCache(
+                self.leaderboard.get_top_songs,
+                self.leaderboard.get_version,
+                TOP_CACHE_STALENESS_MS,
+                TOP_CACHE_MAX_ENTRIES,
+                self.leaderboard.window_key,
+            )
+            registry.add_cache("top_songs", self.top_cache.stats)
+            if self.leaderboard.metadata_cache:
+                # Entries built before a metadata invalidation may embed stale titles
+                self.leaderboard.metadata_cache.add_listener(self.top_cache.invalidate)
+        self.watcher = shared_watcher(self.leaderboard, STREAM_POLL_INTERVAL_MS)
 
     def vote(self, user: User, song_id: str) -> dict:
         if not can_vote(user):
-            return {"success": False, "message": "Permission denied: Cannot vote."}
-        success = self.leaderboard.vote_song(user.user_id, song_id)
-        if not success:
-            return {"success": False, "message": "Already voted for this song."}
-        return {"success": True, "message": "Vote registered."}
+            return {"success": False, "message": CANNOT_VOTE}
+        status = self.leaderboard.vote_song(user.user_id, song_id)
+        return vote_result(status)
 
     def unvote(self, user: User, song_id: str) -> dict:
         if not can_vote(user):
             return {"success": False, "message": "Permission denied: Cannot unvote."}
-        success = self.leaderboard.unvote_song(user.user_id, song_id)
-        if not success:
-            return {"success": False, "message": "You have not voted for this song."}
-        return {"success": True, "message": "Vote removed."}
+        status = self.leaderboard.unvote_song(user.user_id, song_id)
+        return unvote_result(status)
 
-    def top_songs(self, top_n: int = 10) -> dict:
-        results = self.leaderboard.get_top_songs(top_n)
-        return {"success": True, "data": results}
+    def user_votes(self, user: User, target_user_id: str = None) -> dict:
+        target_user_id, error = votes_target(user, target_user_id)
+        if error:
+            return error
+        return {"success": True, "user_id": target_user_id,
+                "song_ids": self.leaderboard.get_user_votes(target_user_id)}
 
-    def song_rank(self, song_id: str) -> dict:
-        rank = self.leaderboard.get_song_rank(song_id)
+    def bulk_vote(self, user: User, operations: list) -> dict:
+        if not can_vote(user):
+            return {"success": False, "message": CANNOT_VOTE}
+        if len(operations) > BULK_VOTE_MAX_OPS:
+            return {"success": False, "message": f"At most {BULK_VOTE_MAX_OPS} operations per request."}
+
+        results, accepted = validate_bulk_operations(user, operations)
+        statuses = self.leaderboard.bulk_vote([op[1:] for op in accepted])
+        return bulk_vote_response(results, accepted, statuses)
+
+    def top_songs(self, top_n: int = 10, window: str = None) -> dict:
+        return self.tagged_top_songs(top_n, window)[1]
+
+    def tagged_top_songs(self, top_n: int = 10, window: str = None) -> tuple[str, dict]:
+        """(ETag of the results, top_songs() result); the ETag is None for errors."""
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return None, error
+        if self.top_cache:
+            version, results = self.top_cache.get_tagged(top_n, window)
+        else:
+            # Read before the results, so the tag is never newer than the body
+            version = self.leaderboard.get_version()
+            results = self.leaderboard.get_top_songs(top_n, window)
+        return top_etag(self.leaderboard, version, top_n, window), {"success": True, "data": results}
+
+    def top_songs_etag(self, top_n: int = 10, window: str = None) -> str | None:
+        """ETag tagged_top_songs() would answer with, from one version read at most."""
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return None
+        if self.top_cache:
+            version = self.top_cache.current_version(top_n, window)
+        else:
+            version = self.leaderboard.get_version()
+        return top_etag(self.leaderboard, version, top_n, window)
+
+    def top_cache_stats(self) -> dict:
+        if not self.top_cache:
+            return {"success": True, "enabled": False}
+        return {"success": True, "enabled": True, **self.top_cache.stats()}
+
+    def write_behind_lag(self) -> dict:
+        return {"success": True, "write_behind": self.leaderboard.write_behind_lag()}
+
+    def song_rank(self, song_id: str, window: str = None) -> dict:
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return error
+        rank = self.leaderboard.get_song_rank(song_id, window)
         if rank is None:
             return {"success": False, "message": "Song not ranked."}
         return {"success": True, "rank": rank}
+
+    def song_ranks(self, song_ids: list, window: str = None) -> dict:
+        if len(song_ids) > BULK_RANK_MAX_IDS:
+            return {"success": False, "message": f"At most {BULK_RANK_MAX_IDS} song IDs per request."}
+        window, error = resolve_window(self.leaderboard, window)
+        if error:
+            return error
+        return {"success": True, "data": self.leaderboard.get_song_ranks(song_ids, window)}
+
+    def songs_around(self, song_id: str, k: int) -> dict:
+        return around_result(self.leaderboard.get_songs_around(song_id, max(0, min(k, RANK_AROUND_MAX_K))))
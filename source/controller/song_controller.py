@@ -1,82 +1,102 @@
 # controller/song_controller.py
 import uuid
-from redis_client.redis_client import RedisClient
 from models.song import Song
 from auth.auth import is_admin
+from jobs.purge import purge_started, job_result, SONGS
+from storage.backend import shared_storage
+from config.config import LIST_PAGE_SIZE, BULK_CREATE_MAX_ITEMS
+
+def validate_bulk_songs(items) -> tuple[list, str]:
+    """(title, artist) pairs from a create_bulk body, or an error message."""
+    if not isinstance(items, list) or not items:
+        return None, "songs must be a non-empty list."
+    if len(items) > BULK_CREATE_MAX_ITEMS:
+        return None, f"At most {BULK_CREATE_MAX_ITEMS} songs per request."
+    entries = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("title") or not item.get("artist"):
+            return None, f"Title and artist required at index {i}."
+        entries.append((item["title"], item["artist"]))
+    return entries, None
 
 class SongController:
     def __init__(self):
-        self.redis = RedisClient()
+        self.storage = shared_storage()
 
     def create_song(self, user, title: str, artist: str) -> dict:
         if not is_admin(user):
             return {"success": False, "message": "Permission denied: Only admins can create songs."}
 
-        song_id = str(uuid.uuid4())
-        # key = f"song:{song_id}"
-        key = f"song:{song_id}:metadata"
+        song = self._new_songs([(title, artist)])[0]
+        self.storage.add_songs([song])
+        return {"success": True, **song}
 
-        self.redis.hset(key, mapping={
-            "title": title,
-            "artist": artist
-        })
-        self.redis.sadd("songs:set", song_id)
-        return {"success": True, "song_id": song_id, "title": title, "artist": artist}
+    def create_songs(self, user, entries: list) -> dict:
+        """
+        Create (title, artist) pairs, stored in batches of
+        BULK_CREATE_BATCH_SIZE. Returns the songs with their IDs, in order.
+        """
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied: Only admins can create songs."}
+
+        songs = self._new_songs(entries)
+        self.storage.add_songs(songs)
+        return {"success": True, "created": len(songs), "songs": songs}
+
+    def _new_songs(self, entries: list) -> list[dict]:
+        return [{"song_id": str(uuid.uuid4()), "title": title, "artist": artist} for title, artist in entries]
 
     def get_song(self, song_id: str) -> Song | None:
-        # key = f"song:{song_id}"
-        key = f"song:{song_id}:metadata"
-        data = self.redis.hgetall(key)
+        data = self.storage.get_songs_metadata([song_id]).get(song_id)
         if not data:
             return None
         return Song(song_id=song_id, title=data.get("title"), artist=data.get("artist"))
 
+    def catalog_version(self) -> int:
+        """Bumped by every change to the song listing; read it before listing."""
+        return self.storage.get_catalog_version(SONGS)
+
     def list_songs(self) -> list[Song]:
-        song_ids = self.redis.smembers("songs:set")
-        songs = []
-        for sid in song_ids:
-            s = self.get_song(sid)
-            if s:
-                songs.append(s)
-        return songs
+        # SSCAN may repeat members, dedupe on song_id
+        return list({s.song_id: s for s in self.iter_songs()}.values())
+
+    def scan_songs(self, cursor: int = 0, count: int = LIST_PAGE_SIZE) -> tuple[int, list[Song]]:
+        """One page of songs with their metadata. Returns (next_cursor, songs)."""
+        return self.storage.scan_songs(cursor, count)
+
+    def iter_songs(self, count: int = LIST_PAGE_SIZE):
+        """Yield songs page by page in constant memory."""
+        cursor = 0
+        while True:
+            cursor, songs = self.scan_songs(cursor, count)
+            yield from songs
+            if cursor == 0:
+                break
 
     def update_song(self, user, song_id: str, title: str, artist: str) -> dict:
         if not is_admin(user):
             return {"success": False, "message": "Permission denied: Only admins can update songs."}
 
-        # key = f"song:{song_id}"
-        key = f"song:{song_id}:metadata"
-        if not self.redis.exists(key):
+        if not self.storage.update_song(song_id, title, artist):
             return {"success": False, "message": "Song not found."}
-
-        self.redis.hset(key, mapping={"title": title, "artist": artist})
         return {"success": True, "message": "Song updated."}
 
     def delete_song(self, user, song_id: str) -> dict:
         if not is_admin(user):
             return {"success": False, "message": "Permission denied: Only admins can delete songs."}
 
-        # key = f"song:{song_id}"
-        key = f"song:{song_id}:metadata"
-        if not self.redis.exists(key):
+        if not self.storage.delete_song(song_id):
             return {"success": False, "message": "Song not found."}
-
-        self.redis.delete(key)
-        self.redis.srem("songs:set", song_id)
-        self.redis.zrem("leaderboard", song_id)
         return {"success": True, "message": "Song deleted."}
 
     def delete_all_songs(self, user) -> dict:
         if not is_admin(user):
             return {"success": False, "message": "Permission denied."}
 
-        song_ids = list(self.redis.smembers("songs:set"))  # cast to list to freeze members
-        deleted_count = 0
-        for sid in song_ids:
-            self.redis.delete(f"song:{sid}")
-            self.redis.zrem("leaderboard", sid)
-            deleted_count += 1
-
-        self.redis.delete("songs:set")  # clear the set after deleting members
+        job_id, started = self.storage.start_purge(SONGS)
+        return purge_started(job_id, started)
 
-        return {"success": True, "message": f"Deleted {deleted_count} songs.", "deleted_songs": song_ids}
+    def purge_status(self, user, job_id: str) -> dict:
+        if not is_admin(user):
+            return {"success": False, "message": "Permission denied."}
+        return job_result(self.storage.get_purge(job_id), SONGS)
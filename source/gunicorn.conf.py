@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# Production serving: gunicorn -c gunicorn.conf.py "app:create_app()"
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+if os.getenv("STORAGE_BACKEND") == "memory":
+    workers = 1  # the in-memory engine is per process; more workers would each hold their own data
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))  # keep below REDIS_POOL_MAX_CONNECTIONS; admission limits derive from it
+
+# Each worker imports and builds the app itself: pools, pub/sub subscribers
+# and flush threads are never created in the master and shared across fork
+preload_app = False
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")  # unset = no access log
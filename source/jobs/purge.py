@@ -0,0 +1,288 @@
+# jobs/purge.py
+import logging
+import threading
+import time
+import uuid
+from redis_client.redis_client import RedisClient
+from models.user import Role
+from cache.metadata_cache import publish_invalidation
+from cache.catalog_version import catalog_version_key
+from config.config import (
+    PURGE_BATCH_SIZE,
+    PURGE_BATCH_PAUSE_MS,
+    PURGE_JOB_TTL_SECONDS,
+    PURGE_LOCK_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+SONGS = "songs"
+USERS = "users"
+JOB_NOT_FOUND = "Job not found."
+
+# Drops the per-kind lock only while it still names this job
+# KEYS: lock key | ARGV: job_id
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Once every USER is gone, the ordinals they held can be handed out again.
+# Returns the last ordinal given out, or -1 while USERs remain.
+# KEYS: users:role:USER, users:ordinal
+ORDINAL_CEILING_SCRIPT = """
+if redis.call('SCARD', KEYS[1]) > 0 then
+    return -1
+end
+return tonumber(redis.call('GET', KEYS[2]) or 0)
+"""
+
+# Clears the bits at ordinals ARGV[1] + 1 .. ARGV[2] (purged users) in each
+# song voters bitmap. A bitmap with nothing set above that range is cut back
+# to its low bytes, and dropped when no bit is left.
+# KEYS: song voters bitmaps | ARGV: highest kept ordinal, highest purged ordinal
+CLEAR_VOTER_BITS_SCRIPT = """
+local kept = tonumber(ARGV[1])
+local ceiling = tonumber(ARGV[2])
+for _, key in ipairs(KEYS) do
+    local length = redis.call('STRLEN', key)
+    local last = math.min(ceiling, length * 8 - 1)
+    local offset = kept + 1
+    while offset <= last and offset % 8 ~= 0 do
+        redis.call('SETBIT', key, offset, 0)
+        offset = offset + 1
+    end
+    local whole = math.floor((last - offset + 1) / 8)
+    if whole > 0 then
+        redis.call('SETRANGE', key, math.floor(offset / 8), string.rep('\\0', whole))
+        offset = offset + whole * 8
+    end
+    while offset <= last do
+        redis.call('SETBIT', key, offset, 0)
+        offset = offset + 1
+    end
+    local ceiling_byte = math.floor(ceiling / 8)
+    local above = 0
+    for bit = ceiling + 1, math.min(length * 8 - 1, ceiling_byte * 8 + 7) do
+        above = above + redis.call('GETBIT', key, bit)
+    end
+    if length > ceiling_byte + 1 then
+        above = above + redis.call('BITCOUNT', key, ceiling_byte + 1, -1)
+    end
+    if length > 0 and above == 0 then
+        if redis.call('BITCOUNT', key) == 0 then
+            redis.call('UNLINK', key)
+        else
+            local head = redis.call('GETRANGE', key, 0, math.floor(kept / 8))
+            if #head < length then
+                redis.call('SET', key, head)
+            end
+        end
+    end
+end
+return #KEYS
+"""
+
+# Moves the ordinal counter back, unless a USER registered meanwhile.
+# KEYS: users:role:USER, users:ordinal | ARGV: ceiling, new counter value
+RESET_ORDINALS_SCRIPT = """
+if redis.call('SCARD', KEYS[1]) > 0 or tonumber(redis.call('GET', KEYS[2]) or 0) ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2])
+return 1
+"""
+
+def job_key(job_id: str) -> str:
+    return f"jobs:{job_id}"
+
+def lock_key(kind: str) -> str:
+    return f"jobs:lock:{kind}"
+
+def parse_job(job_id: str, raw: dict) -> dict | None:
+    """Job status from its hash, None for unknown (or expired) jobs."""
+    if not raw:
+        return None
+    job = {"job_id": job_id, **raw}
+    for field in ("processed", "total"):
+        job[field] = int(job.get(field, 0))
+    for field in ("started_at", "finished_at"):
+        if field in job:
+            job[field] = float(job[field])
+    return job
+
+def purge_started(job_id: str, started: bool) -> dict:
+    message = "Purge started." if started else "Purge already running."
+    return {"success": True, "job_id": job_id, "message": message}
+
+def job_result(job: dict | None, kind: str) -> dict:
+    if job is None or job["kind"] != kind:
+        return {"success": False, "message": JOB_NOT_FOUND}
+    return {"success": True, "job": job}
+
+class PurgeJobs:
+    """
+    delete_all as a background job. The index set is walked with SSCAN, each
+    batch of keys is UNLINKed (freed off the main thread by Redis) in one
+    pipeline and the thread sleeps between batches, so voters never wait
+    behind a purge. Progress lives in `jobs:<id>` so any worker can report
+    it; a lock per kind keeps one purge of songs and one of users at a time.
+    """
+
+    def __init__(self):
+        self.redis = RedisClient()
+        self._release_lock_script = self.redis.register_script(RELEASE_LOCK_SCRIPT)
+        self._ordinal_ceiling_script = self.redis.register_script(ORDINAL_CEILING_SCRIPT)
+        self._clear_voter_bits_script = self.redis.register_script(CLEAR_VOTER_BITS_SCRIPT)
+        self._reset_ordinals_script = self.redis.register_script(RESET_ORDINALS_SCRIPT)
+        self._leaderboard = None
+
+    @property
+    def leaderboard(self):
+        # Built on first use so importing this module stays cheap
+        if self._leaderboard is None:
+            from leaderboard import Leaderboard
+            self._leaderboard = Leaderboard()
+        return self._leaderboard
+
+    def start(self, kind: str) -> tuple[str, bool]:
+        """(job_id, started); when a purge of `kind` is already running its id is returned."""
+        index_key, purge_batch = {
+            SONGS: ("songs:set", self._purge_songs),
+            USERS: ("users:role:USER", self._purge_users),  # admins are never touched
+        }[kind]
+
+        job_id = str(uuid.uuid4())
+        while not self.redis.set(lock_key(kind), job_id, nx=True, ex=PURGE_LOCK_TTL_SECONDS):
+            running = self.redis.get(lock_key(kind))
+            if running:
+                return running, False
+
+        self.redis.hset(job_key(job_id), mapping={
+            "kind": kind,
+            "status": "running",
+            "processed": 0,
+            "total": self.redis.scard(index_key),  # members added later may be purged too
+            "started_at": time.time(),
+        })
+
+        thread = threading.Thread(
+            target=self._run,
+            args=(job_id, kind, index_key, purge_batch),
+            name=f"purge-{kind}",
+            daemon=True,
+        )
+        thread.start()
+        return job_id, True
+
+    def get(self, job_id: str) -> dict | None:
+        return parse_job(job_id, self.redis.hgetall(job_key(job_id)))
+
+    def _run(self, job_id: str, kind: str, index_key: str, purge_batch):
+        processed = 0
+        status = {"status": "done"}
+        try:
+            cursor = 0
+            while True:
+                cursor, members = self.redis.sscan(index_key, cursor=cursor, count=PURGE_BATCH_SIZE)
+                if members:
+                    processed += purge_batch(members)
+                    pipe = self.redis.pipeline()
+                    pipe.hset(job_key(job_id), "processed", processed)
+                    pipe.expire(lock_key(kind), PURGE_LOCK_TTL_SECONDS)
+                    pipe.execute()
+                if cursor == 0:
+                    break
+                time.sleep(PURGE_BATCH_PAUSE_MS / 1000.0)
+            if kind == SONGS:
+                publish_invalidation(self.redis)
+            else:
+                self._reset_ordinals()
+        except Exception as e:
+            logger.exception("Purge job %s failed", job_id)
+            status = {"status": "failed", "error": str(e)}
+
+        pipe = self.redis.pipeline()
+        pipe.hset(job_key(job_id), mapping={**status, "processed": processed, "finished_at": time.time()})
+        pipe.expire(job_key(job_id), PURGE_JOB_TTL_SECONDS)
+        pipe.execute()
+        self._release_lock_script(keys=[lock_key(kind)], args=[job_id])
+
+    def _purge_songs(self, song_ids: list) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.incr(catalog_version_key(SONGS))
+        for sid in song_ids:
+            pipe.hget(f"song:{sid}:metadata", "ordinal")
+        # song:<id> is the pre-metadata layout, still present on old datasets
+        pipe.unlink(*(f"song:{sid}:metadata" for sid in song_ids), *(f"song:{sid}" for sid in song_ids))
+        pipe.srem("songs:set", *song_ids)
+        replies = pipe.execute()
+        ordinals = [ordinal for ordinal in replies[1:-2] if ordinal is not None]
+        if ordinals:
+            self.redis.hdel(self.leaderboard.SONG_ORDINALS_KEY, *ordinals)
+        self.leaderboard.remove_songs(song_ids)
+        return replies[-1]
+
+    def _purge_users(self, user_ids: list) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.incr(catalog_version_key(USERS))
+        # Their bits in the song voters bitmaps are cleared by _reset_ordinals
+        pipe.unlink(*(f"user:{uid}" for uid in user_ids),
+                    *(self.leaderboard.USER_VOTES_KEY_PATTERN.format(user_id=uid) for uid in user_ids))
+        pipe.srem("users:set", *user_ids)
+        pipe.srem(f"users:role:{Role.USER.value}", *user_ids)
+        return pipe.execute()[-2]
+
+    def _reset_ordinals(self):
+        """
+        After a full user purge, clear the purged users' bits from every
+        song voters bitmap and hand their ordinals out again, so the bitmaps
+        shrink back to the admins' ordinals. Users registering meanwhile get
+        ordinals above the cleared range; if any did, the counter stays put.
+        """
+        from storage.redis_backend import USER_ORDINAL_KEY
+        ordinal_keys = [f"users:role:{Role.USER.value}", USER_ORDINAL_KEY]
+        ceiling = int(self._ordinal_ceiling_script(keys=ordinal_keys))
+        if ceiling < 0:
+            logger.info("Users registered during the purge, ordinals kept")
+            return
+
+        kept, cursor = 0, 0
+        while True:
+            cursor, admin_ids = self.redis.sscan(f"users:role:{Role.ADMIN.value}", cursor=cursor, count=PURGE_BATCH_SIZE)
+            pipe = self.redis.pipeline(transaction=False)
+            for admin_id in admin_ids:
+                pipe.hget(f"user:{admin_id}", "ordinal")
+            ordinals = [int(ordinal) for ordinal in pipe.execute() if ordinal is not None]
+            kept = max([kept] + [ordinal for ordinal in ordinals if ordinal <= ceiling])
+            if cursor == 0:
+                break
+        if kept >= ceiling:
+            return
+
+        voters_key = self.leaderboard.SONG_VOTERS_KEY_PATTERN
+        cursor = 0
+        while True:
+            cursor, song_ids = self.redis.sscan("songs:set", cursor=cursor, count=PURGE_BATCH_SIZE)
+            if song_ids:
+                self._clear_voter_bits_script(
+                    keys=[voters_key.format(song_id=song_id) for song_id in song_ids],
+                    args=[kept, ceiling],
+                )
+            if cursor == 0:
+                break
+            self.redis.expire(lock_key(USERS), PURGE_LOCK_TTL_SECONDS)
+            time.sleep(PURGE_BATCH_PAUSE_MS / 1000.0)
+        self._reset_ordinals_script(keys=ordinal_keys, args=[ceiling, kept])
+
+_shared_jobs = None
+_shared_lock = threading.Lock()
+
+def shared_purge_jobs() -> PurgeJobs:
+    global _shared_jobs
+    with _shared_lock:
+        if _shared_jobs is None:
+            _shared_jobs = PurgeJobs()
+        return _shared_jobs
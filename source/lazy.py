@@ -0,0 +1,21 @@
+# lazy.py
+import threading
+
+def lazy(factory):
+    """
+    Zero-argument getter for one shared `factory()` instance, built on first
+    call. Lets route modules declare their controllers at import time while
+    Redis clients, subscriber threads and pools are only created in the
+    worker that serves requests.
+    """
+    instance = None
+    lock = threading.Lock()
+
+    def get():
+        nonlocal instance
+        if instance is None:
+            with lock:
+                if instance is None:
+                    instance = factory()
+        return instance
+    return get
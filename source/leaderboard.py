@@ -1,57 +1,344 @@
 # leaderboard.py
-from redis_client.redis_client import RedisClient, retry_redis_call
-from auth.registration import UserRegistration
+import uuid
+from redis_client.redis_client import RedisClient, retry_redis_call, shard_clients
+from redis_client.replicas import read_client
+from config.config import (
+    BULK_VOTE_BATCH_SIZE,
+    LIST_PAGE_SIZE,
+    LEADERBOARD_SHARDS,
+    LEADERBOARD_SHARD_URLS,
+    WRITE_BEHIND_ENABLED,
+    WRITE_BEHIND_FLUSH_INTERVAL_MS,
+    WRITE_BEHIND_FLUSH_MAX_VOTES,
+    METADATA_CACHE_ENABLED,
+    METADATA_CACHE_MAX_ENTRIES,
+    METADATA_CACHE_TTL_SECONDS,
+    WINDOWED_LEADERBOARDS_ENABLED,
+    WINDOW_ROLLUP_TTL_MS,
+)
+from vote_buffer import shared_vote_buffer
+from cache.metadata_cache import shared_metadata_cache, get_songs_metadata
 from models.song import Song
+from time_windows import TimeWindows, CLOSED_ROLLUP_TTL_SECONDS
+from leaderboard_shards import (
+    LeaderboardShards,
+    SCORE_DELTAS_SCRIPT,
+    RANK_AHEAD_SCRIPT,
+    NEIGHBOURS_SCRIPT,
+    apply_score_deltas,
+)
 
-user_reg = UserRegistration()
+# Vote/unvote run server side so the membership check, the dedupe and the
+# leaderboard update happen atomically in a single round trip.
+# Dedupe is one bit per user in the song's voters bitmap, at the user's
+# ordinal; users without one (deleted, or not yet migrated) can't vote.
+# Songs must exist and have an ordinal: a bitmap left behind by a deleted or
+# unknown song would outlive the users purge, and the ordinals it reclaims
+# (see jobs/purge.py). The user's votes set holds the song ordinals, the
+# index GET /user/votes reads.
+# Every score change also bumps the leaderboard version counter. The score
+# keys are the song's leaderboard shard and, when windowed leaderboards are
+# on, the time buckets (see TimeWindows), which carry a TTL.
+# KEYS: user hash, song metadata, song voters bitmap, user votes, version, score keys... |
+# ARGV: song_id, TTL per score key (0 = no expiry)...
+VOTE_SCRIPT = """
+local ordinal = redis.call('HGET', KEYS[1], 'ordinal')
+if not ordinal then
+    return -1
+end
+local song_ordinal = redis.call('HGET', KEYS[2], 'ordinal')
+if not song_ordinal then
+    return -2
+end
+if redis.call('SETBIT', KEYS[3], ordinal, 1) == 1 then
+    return 0
+end
+redis.call('SADD', KEYS[4], song_ordinal)
+for i = 6, #KEYS do
+    redis.call('ZINCRBY', KEYS[i], 1, ARGV[1])
+    if tonumber(ARGV[i - 4]) > 0 then
+        redis.call('EXPIRE', KEYS[i], ARGV[i - 4])
+    end
+end
+redis.call('INCR', KEYS[5])
+return 1
+"""
+
+# Time buckets hold net changes: unvoting an older vote can take a bucket
+# score below zero, readers only rank songs with a positive score.
+# KEYS: user hash, song metadata, song voters bitmap, user votes, version, score keys... |
+# ARGV: song_id, TTL per score key (0 = no expiry)...
+UNVOTE_SCRIPT = """
+local ordinal = redis.call('HGET', KEYS[1], 'ordinal')
+local song_ordinal = redis.call('HGET', KEYS[2], 'ordinal')
+if not ordinal or not song_ordinal or redis.call('SETBIT', KEYS[3], ordinal, 0) == 0 then
+    return 0
+end
+redis.call('SREM', KEYS[4], song_ordinal)
+for i = 6, #KEYS do
+    local ttl = tonumber(ARGV[i - 4])
+    local score = tonumber(redis.call('ZINCRBY', KEYS[i], -1, ARGV[1]))
+    if score == 0 or (score < 0 and ttl == 0) then
+        redis.call('ZREM', KEYS[i], ARGV[1])
+    end
+    if ttl > 0 then
+        redis.call('EXPIRE', KEYS[i], ARGV[i - 4])
+    end
+end
+redis.call('INCR', KEYS[5])
+return 1
+"""
+
+# Write-behind variants: only the checks, the dedupe and the votes index,
+# the score delta is applied later by the vote buffer.
+# KEYS: user hash, song metadata, song voters bitmap, user votes
+DEDUPE_VOTE_SCRIPT = """
+local ordinal = redis.call('HGET', KEYS[1], 'ordinal')
+if not ordinal then
+    return -1
+end
+local song_ordinal = redis.call('HGET', KEYS[2], 'ordinal')
+if not song_ordinal then
+    return -2
+end
+if redis.call('SETBIT', KEYS[3], ordinal, 1) == 1 then
+    return 0
+end
+redis.call('SADD', KEYS[4], song_ordinal)
+return 1
+"""
+
+DEDUPE_UNVOTE_SCRIPT = """
+local ordinal = redis.call('HGET', KEYS[1], 'ordinal')
+local song_ordinal = redis.call('HGET', KEYS[2], 'ordinal')
+if not ordinal or not song_ordinal or redis.call('SETBIT', KEYS[3], ordinal, 0) == 0 then
+    return 0
+end
+redis.call('SREM', KEYS[4], song_ordinal)
+return 1
+"""
+
+# Closed days never change, so their union is built once per day; each
+# refresh then only unions that rollup with today's bucket.
+# KEYS: week view, closed days rollup, today's bucket, closed day buckets... |
+# ARGV: view TTL (ms), closed rollup TTL (s)
+WEEK_ROLLUP_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('ZUNIONSTORE', KEYS[2], #KEYS - 3, unpack(KEYS, 4))
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+redis.call('ZUNIONSTORE', KEYS[1], 2, KEYS[2], KEYS[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+def format_top_songs(top_songs: list, metadata: dict) -> list:
+    """[{song_id, score, title, artist}] for (song_id, score) pairs."""
+    results = []
+    for song_id, score in top_songs:
+        meta = metadata.get(song_id) or {}
+        title = meta.get("title") or "Unknown Title"
+        artist = meta.get("artist") or "Unknown Artist"
+        results.append({
+            "song_id": song_id,
+            "score": score,
+            "title": title,
+            "artist": artist
+        })
+    return results
+
+def rank_songs(first_rank: int, members: list, metadata: dict) -> list:
+    """format_top_songs with consecutive ranks from `first_rank`."""
+    songs = format_top_songs(members, metadata)
+    return [{"rank": rank, **song} for rank, song in enumerate(songs, start=first_rank)]
 
 class Leaderboard:
     LEADERBOARD_KEY = "songs:leaderboard"
-    USER_VOTES_KEY_PATTERN = "user:{user_id}:voted_songs"
+    # Generation counter bumped on every leaderboard or song metadata change
+    VERSION_KEY = "songs:leaderboard:version"
+    USER_KEY_PATTERN = "user:{user_id}"
+    SONG_METADATA_KEY_PATTERN = "song:{song_id}:metadata"
+    # One bit per user, at the ordinal stored in the user hash
+    SONG_VOTERS_KEY_PATTERN = "song:{song_id}:voters"
+    # Ordinals of the songs a user voted for, small enough for an intset
+    USER_VOTES_KEY_PATTERN = "user:{user_id}:votes"
+    # Song ordinal -> song_id, for reading the votes sets back
+    SONG_ORDINALS_KEY = "songs:ordinals"
+
+    # Status codes returned by the vote/unvote scripts
+    VOTE_OK = 1
+    VOTE_DUPLICATE = 0
+    VOTE_UNKNOWN_USER = -1
+    VOTE_UNKNOWN_SONG = -2
+    UNVOTE_OK = 1
+    UNVOTE_NOT_VOTED = 0
 
     def __init__(self):
         self.redis = RedisClient()
+        # Instance 0 is the primary, extra instances only hold leaderboard shards
+        self.shard_clients = [self.redis, *shard_clients(LEADERBOARD_SHARD_URLS)]
+        self.shards = LeaderboardShards(self.LEADERBOARD_KEY, LEADERBOARD_SHARDS, len(self.shard_clients))
+        self._register_scripts()
+        self.windows = TimeWindows(self.LEADERBOARD_KEY) if WINDOWED_LEADERBOARDS_ENABLED else None
+        self.vote_buffer = None
+        if WRITE_BEHIND_ENABLED:
+            self.vote_buffer = shared_vote_buffer(
+                self.shards,
+                self.shard_clients,
+                self.VERSION_KEY,
+                WRITE_BEHIND_FLUSH_INTERVAL_MS,
+                WRITE_BEHIND_FLUSH_MAX_VOTES,
+                self.windows,
+            )
+        self.metadata_cache = None
+        if METADATA_CACHE_ENABLED:
+            self.metadata_cache = shared_metadata_cache(METADATA_CACHE_MAX_ENTRIES, METADATA_CACHE_TTL_SECONDS)
 
-    def vote_song(self, user_id: str, song_id: str) -> bool:
-        if not user_reg.user_exists(user_id):
-            return False
-        user_votes_key = self.USER_VOTES_KEY_PATTERN.format(user_id=user_id)
-        if self.redis.sismember(user_votes_key, song_id):
-            return False
-        # self.redis.sadd(user_votes_key, song_id)
-        # self.redis.zincrby(self.LEADERBOARD_KEY, 1, song_id)
-        # EXTRA #
-        pipe = self.redis.pipeline()
-        pipe.sadd(user_votes_key, song_id)
-        pipe.zincrby(self.LEADERBOARD_KEY, 1, song_id)
-        pipe.execute()
-        # EXTRA #
-
-        return True
-
-    def unvote_song(self, user_id: str, song_id: str) -> bool:
-        user_votes_key = self.USER_VOTES_KEY_PATTERN.format(user_id=user_id)
-        if not self.redis.sismember(user_votes_key, song_id):
-            return False
-        # self.redis.srem(user_votes_key, song_id)
-        # EXTRA #
-        pipe = self.redis.pipeline()
-        pipe.srem(user_votes_key, song_id)
-        # EXTRA #
-
-        current_score = self.redis.zscore(self.LEADERBOARD_KEY, song_id)
-        if current_score is None or current_score <= 1:
-            # self.redis.zrem(self.LEADERBOARD_KEY, song_id)
-            # EXTRA #
-            pipe.zrem(self.LEADERBOARD_KEY, song_id)
-            # EXTRA #
-        else:
-            # self.redis.zincrby(self.LEADERBOARD_KEY, -1, song_id)
-            # EXTRA #
-            pipe.zincrby(self.LEADERBOARD_KEY, -1, song_id)
-            # EXTRA #
-        pipe.execute()
-        return True
+    def _register_scripts(self):
+        # register_script sends EVALSHA and reloads the script on NOSCRIPT
+        self._vote_script = self.redis.register_script(VOTE_SCRIPT)
+        self._unvote_script = self.redis.register_script(UNVOTE_SCRIPT)
+        self._dedupe_vote_script = self.redis.register_script(DEDUPE_VOTE_SCRIPT)
+        self._dedupe_unvote_script = self.redis.register_script(DEDUPE_UNVOTE_SCRIPT)
+        self._week_rollup_script = self.redis.register_script(WEEK_ROLLUP_SCRIPT)
+        self._score_deltas_script = self.redis.register_script(SCORE_DELTAS_SCRIPT)
+        self._rank_ahead_script = self.redis.register_script(RANK_AHEAD_SCRIPT)
+        self._neighbours_script = self.redis.register_script(NEIGHBOURS_SCRIPT)
+
+    def vote_song(self, user_id: str, song_id: str) -> int:
+        status = int(self._queue_vote(self.redis, user_id, song_id))
+        if status == self.VOTE_OK:
+            self._after_score_change(song_id, 1)
+        return status
+
+    def unvote_song(self, user_id: str, song_id: str) -> int:
+        status = int(self._queue_unvote(self.redis, user_id, song_id))
+        if status == self.UNVOTE_OK:
+            self._after_score_change(song_id, -1)
+        return status
+
+    def _after_score_change(self, song_id: str, delta: int):
+        if self.vote_buffer:
+            self.vote_buffer.add(song_id, delta)
+        elif not self.shards.is_local(song_id):
+            self._apply_remote({song_id: delta})
+
+    def _remote_calls(self, deltas: dict) -> dict:
+        # The vote scripts already updated everything on the primary
+        calls = self.shards.plan_deltas(deltas, [], [])
+        calls.pop(0, None)
+        return calls
+
+    def _apply_remote(self, deltas: dict):
+        # One apply_id and applied set across retries, so a retry after a lost
+        # EXEC reply skips what already landed
+        calls = self._remote_calls(deltas)
+        if calls:
+            retry_redis_call(apply_score_deltas, self.shard_clients, self._score_deltas_script, calls,
+                             self.VERSION_KEY, str(uuid.uuid4()), set())
+
+    def _vote_keys(self, user_id: str, song_id: str) -> list:
+        return [
+            self.USER_KEY_PATTERN.format(user_id=user_id),
+            self.SONG_METADATA_KEY_PATTERN.format(song_id=song_id),
+            self.SONG_VOTERS_KEY_PATTERN.format(song_id=song_id),
+            self.USER_VOTES_KEY_PATTERN.format(user_id=user_id),
+        ]
+
+    def _queue_vote(self, client, user_id: str, song_id: str):
+        if self.vote_buffer:
+            return self._dedupe_vote_script(keys=self._vote_keys(user_id, song_id), client=client)
+        score_keys, ttls = self._score_keys(song_id)
+        return self._vote_script(keys=[*self._vote_keys(user_id, song_id), self.VERSION_KEY, *score_keys],
+                                 args=[song_id, *ttls], client=client)
+
+    def _queue_unvote(self, client, user_id: str, song_id: str):
+        if self.vote_buffer:
+            return self._dedupe_unvote_script(keys=self._vote_keys(user_id, song_id), client=client)
+        score_keys, ttls = self._score_keys(song_id)
+        return self._unvote_script(keys=[*self._vote_keys(user_id, song_id), self.VERSION_KEY, *score_keys],
+                                   args=[song_id, *ttls], client=client)
+
+    def _score_keys(self, song_id: str) -> tuple[list, list]:
+        """Primary-instance keys a vote for `song_id` updates, with their TTLs."""
+        keys, ttls = [], []
+        if self.shards.is_local(song_id):
+            keys.append(self.shards.key_for(song_id))
+            ttls.append(0)
+        if self.windows:
+            bucket_keys, bucket_ttls = self.windows.write_keys()
+            keys.extend(bucket_keys)
+            ttls.extend(bucket_ttls)
+        return keys, ttls
+
+    def _reader(self, window: str = None):
+        # Replicas (REDIS_REPLICA_URLS) serve plain reads. The week rollup
+        # script writes, so week reads stay on the primary.
+        return self.redis if window == "week" else read_client()
+
+    def _instance_reader(self, instance: int):
+        # Replicas mirror the primary only, not the extra shard instances
+        return self._reader() if instance == 0 else self.shard_clients[instance]
+
+    def get_version(self) -> int:
+        return int(retry_redis_call(self._reader().get, self.VERSION_KEY) or 0)
+
+    def get_user_votes(self, user_id: str) -> list:
+        """
+        Song IDs `user_id` has voted for: the song ordinals in their votes
+        set, mapped back through songs:ordinals. O(votes) whatever the size
+        of the catalogue. Ordinals of deleted songs have no mapping and are
+        skipped.
+        """
+        reader = self._reader()
+        ordinals = list(reader.smembers(self.USER_VOTES_KEY_PATTERN.format(user_id=user_id)))
+        if not ordinals:
+            return []
+        return [song_id for song_id in reader.hmget(self.SONG_ORDINALS_KEY, ordinals) if song_id is not None]
+
+    def write_behind_lag(self) -> dict:
+        if not self.vote_buffer:
+            return {"enabled": False}
+        return {"enabled": True, **self.vote_buffer.lag()}
+
+    def bulk_vote(self, operations: list) -> list[int]:
+        """
+        Run (action, user_id, song_id) tuples, action being "vote" or "unvote",
+        through the vote scripts in pipelined batches. Returns one status code
+        per operation, in order.
+        """
+        statuses = []
+        for start in range(0, len(operations), BULK_VOTE_BATCH_SIZE):
+            batch = operations[start:start + BULK_VOTE_BATCH_SIZE]
+            pipe = self.redis.pipeline(transaction=False)
+            for action, user_id, song_id in batch:
+                if action == "vote":
+                    self._queue_vote(pipe, user_id, song_id)
+                else:
+                    self._queue_unvote(pipe, user_id, song_id)
+            batch_statuses = [int(status) for status in pipe.execute()]
+            self._buffer_deltas(batch, batch_statuses)
+            if not self.vote_buffer and self.shards.remote:
+                self._apply_remote(self._batch_deltas(batch, batch_statuses))
+            statuses.extend(batch_statuses)
+        return statuses
+
+    def _buffer_deltas(self, batch: list, statuses: list):
+        if not self.vote_buffer:
+            return
+        for (action, _, song_id), status in zip(batch, statuses):
+            if status == 1:  # VOTE_OK / UNVOTE_OK
+                self.vote_buffer.add(song_id, 1 if action == "vote" else -1)
+
+    def _batch_deltas(self, batch: list, statuses: list) -> dict:
+        deltas = {}
+        for (action, _, song_id), status in zip(batch, statuses):
+            if status == 1:
+                deltas[song_id] = deltas.get(song_id, 0) + (1 if action == "vote" else -1)
+        return deltas
 
     # def get_top_songs(self, top_n: int = 10) -> list:
     #     return self.redis.zrevrange(self.LEADERBOARD_KEY, 0, top_n - 1, withscores=True)
@@ -64,42 +351,177 @@ class Leaderboard:
     #     score = self.redis.zscore(self.LEADERBOARD_KEY, song_id)
     #     return int(score) if score is not None else 0
 
-    def get_top_songs(self, top_n: int = 10) -> list:
+    def get_top_songs(self, top_n: int = 10, window: str = None) -> list:
         """
         Return list of dicts: {song_id, score, title, artist}
+        `window` is one of "hour", "day", "week"; None means all time.
         """
-        top_songs = retry_redis_call(
-            self.redis.zrevrange,
-            self.LEADERBOARD_KEY,
-            0,
-            top_n - 1,
-            withscores=True
-        )
+        if window:
+            pipe = self._reader(window).pipeline(transaction=False)
+            self._queue_window_refresh(pipe, window)
+            self._queue_window_top(pipe, window, top_n)
+            top_songs = pipe.execute()[-1]
+            metadata = self.get_songs_metadata([song_id for song_id, _ in top_songs])
+            return format_top_songs(top_songs, metadata)
+
+        if self.shards.count > 1:
+            top_songs = self._sharded_top(top_n)
+        else:
+            top_songs = retry_redis_call(
+                self._reader().zrevrange,
+                self.LEADERBOARD_KEY,
+                0,
+                top_n - 1,
+                withscores=True
+            )
+
+        metadata = self.get_songs_metadata([song_id for song_id, _ in top_songs])
+        return format_top_songs(top_songs, metadata)
+
+    def get_songs_metadata(self, song_ids: list) -> dict:
+        """{song_id: {"title", "artist"} or None}, served from the LRU when enabled."""
+        # From the primary: a miss right after an invalidation must not cache a replica's old copy
+        return get_songs_metadata(self.redis, self.metadata_cache, song_ids)
+
+    def window_key(self, window: str = None) -> str:
+        """Key currently backing `window`, usable as a cache tag that rolls over with it."""
+        if not window:
+            return self.LEADERBOARD_KEY
+        return self.windows.read_key(window)
+
+    def _queue_window_refresh(self, pipe, window: str):
+        # Only "week" spans several buckets and needs the rollup
+        if window == "week":
+            return self._week_rollup_script(
+                keys=self.windows.week_rollup_keys(),
+                args=[WINDOW_ROLLUP_TTL_MS, CLOSED_ROLLUP_TTL_SECONDS],
+                client=pipe,
+            )
+        return None
+
+    def _queue_window_top(self, pipe, window: str, top_n: int):
+        return pipe.zrevrangebyscore(self.windows.read_key(window), "+inf", "(0",
+                                     start=0, num=top_n, withscores=True)
+
+    def _queue_window_rank(self, pipe, window: str, song_id: str):
+        key = self.windows.read_key(window)
+        pipe.zrevrank(key, song_id)
+        return pipe.zscore(key, song_id)
+
+    def _window_rank(self, rank, score) -> int:
+        # Songs with a zero or negative net score in the window are not ranked
+        if rank is None or score is None or score <= 0:
+            return None
+        return rank + 1
+
+    def _sharded_top(self, top_n: int) -> list:
+        # Every shard's own top N is enough for an exact merged top N
+        lists = []
+        for instance, keys in self.shards.by_instance().items():
+            pipe = self._instance_reader(instance).pipeline(transaction=False)
+            for key in keys:
+                pipe.zrevrange(key, 0, top_n - 1, withscores=True)
+            lists.extend(pipe.execute())
+        return self.shards.merge_top(lists, top_n)
+
+    def _shard_client(self, song_id: str):
+        return self.shard_clients[self.shards.instance_of(self.shards.shard_of(song_id))]
 
-        pipe = self.redis.pipeline()
-        for song_id, _ in top_songs:
-            meta_key = f"song:{song_id}:metadata"
-            pipe.hget(meta_key, "title")
-            pipe.hget(meta_key, "artist")
+    def _sharded_scores(self, song_ids: list) -> dict:
+        by_instance = {}
+        for song_id in song_ids:
+            by_instance.setdefault(self.shards.instance_of(self.shards.shard_of(song_id)), []).append(song_id)
+        scores = {}
+        for instance, ids in by_instance.items():
+            pipe = self.shard_clients[instance].pipeline(transaction=False)
+            for song_id in ids:
+                pipe.zscore(self.shards.key_for(song_id), song_id)
+            scores.update(zip(ids, pipe.execute()))
+        return scores
 
-        metadata = pipe.execute()
+    def _sharded_ranks(self, song_ids: list) -> list:
+        # Scores first, then per shard how many members rank ahead of each song
+        scores = self._sharded_scores(song_ids)
+        ranked = [song_id for song_id in dict.fromkeys(song_ids) if scores[song_id] is not None]
+        ahead = dict.fromkeys(ranked, 0)
+        for instance, keys in self.shards.by_instance().items():
+            pipe = self.shard_clients[instance].pipeline(transaction=False)
+            for key in keys:
+                for song_id in ranked:
+                    self._rank_ahead_script(keys=[key], args=[scores[song_id], song_id], client=pipe)
+            counts = iter(pipe.execute())
+            for _ in keys:
+                for song_id in ranked:
+                    ahead[song_id] += next(counts)
+        return [self._rank_entry(song_id, ahead.get(song_id), scores[song_id]) for song_id in song_ids]
 
-        results = []
-        for i, (song_id, score) in enumerate(top_songs):
-            title = metadata[2*i] or "Unknown Title"
-            artist = metadata[2*i + 1] or "Unknown Artist"
-            results.append({
-                "song_id": song_id,
-                "score": score,
-                "title": title,
-                "artist": artist
-            })
-        return results
+    def _sharded_rank(self, song_id: str) -> int:
+        return self._sharded_ranks([song_id])[0]["rank"]
 
+    def _rank_entry(self, song_id: str, rank, score, window: str = None) -> dict:
+        if window:
+            rank = self._window_rank(rank, score)
+        elif rank is not None:
+            rank += 1
+        return {"song_id": song_id, "rank": rank, "score": score if rank is not None else 0}
+
+    def get_song_ranks(self, song_ids: list, window: str = None) -> list:
+        """
+        [{song_id, rank, score}] in the order of `song_ids`; rank is None for
+        songs not on the leaderboard. A single pipeline unless sharded.
+        """
+        if not song_ids:
+            return []
+        if self.shards.count > 1 and not window:
+            return self._sharded_ranks(song_ids)
+        key = self.window_key(window)
+        pipe = self._reader(window).pipeline(transaction=False)
+        self._queue_window_refresh(pipe, window)
+        for song_id in song_ids:
+            pipe.zrevrank(key, song_id)
+            pipe.zscore(key, song_id)
+        replies = pipe.execute()[-2 * len(song_ids):]
+        return [self._rank_entry(song_id, rank, score, window)
+                for song_id, rank, score in zip(song_ids, replies[::2], replies[1::2])]
+
+    def get_songs_around(self, song_id: str, k: int) -> tuple[int, list]:
+        """
+        (rank, songs) with the k songs ranked right above and right below
+        `song_id`, the song itself included, each as {rank, song_id, score,
+        title, artist}. None if the song is not on the leaderboard.
+        """
+        score = retry_redis_call(self._shard_client(song_id).zscore, self.shards.key_for(song_id), song_id)
+        if score is None:
+            return None
+        ahead, replies = 0, []
+        for instance, keys in self.shards.by_instance().items():
+            pipe = self.shard_clients[instance].pipeline(transaction=False)
+            for key in keys:
+                self._rank_ahead_script(keys=[key], args=[score, song_id], client=pipe)
+                self._neighbours_script(keys=[key], args=[score, song_id, k], client=pipe)
+            results = pipe.execute()
+            ahead += sum(results[::2])
+            replies.extend(results[1::2])
+        first_rank, members = self._around_members(ahead + 1, song_id, score, k, replies)
+        metadata = self.get_songs_metadata([member for member, _ in members])
+        return ahead + 1, rank_songs(first_rank, members, metadata)
+
+    def _around_members(self, rank: int, song_id: str, score: float, k: int, replies: list) -> tuple[int, list]:
+        above, below = self.shards.merge_neighbours(replies, k)
+        return rank - len(above), [*above, (song_id, score), *below]
+
+    def get_song_rank(self, song_id: str, window: str = None) -> int:
+        if window:
+            pipe = self._reader(window).pipeline(transaction=False)
+            self._queue_window_refresh(pipe, window)
+            self._queue_window_rank(pipe, window, song_id)
+            rank, score = pipe.execute()[-2:]
+            return self._window_rank(rank, score)
+        if self.shards.count > 1:
+            return self._sharded_rank(song_id)
 
-    def get_song_rank(self, song_id: str) -> int:
         rank = retry_redis_call(
-            self.redis.zrevrank,
+            self._reader().zrevrank,
             self.LEADERBOARD_KEY,
             song_id
         )
@@ -107,8 +529,46 @@ class Leaderboard:
 
     def get_song_score(self, song_id: str) -> int:
         score = retry_redis_call(
-            self.redis.zscore,
-            self.LEADERBOARD_KEY,
+            self._shard_client(song_id).zscore,
+            self.shards.key_for(song_id),
             song_id
         )
-        return int(score) if score is not None else 0
\ No newline at end of file
+        return int(score) if score is not None else 0
+
+    def remove_songs(self, song_ids: list):
+        """Drop deleted songs from their shards, voters and the live time buckets, then bump the version."""
+        groups = self.shards.group_songs(song_ids)
+        groups.setdefault(0, {})
+        for instance in sorted(groups, reverse=True):
+            pipe = self.shard_clients[instance].pipeline(transaction=False)
+            self._queue_remove_songs(pipe, instance, groups[instance], song_ids)
+            pipe.execute()
+
+    def _queue_remove_songs(self, pipe, instance: int, shard_groups: dict, song_ids: list):
+        for key, ids in shard_groups.items():
+            pipe.zrem(key, *ids)
+        if instance == 0:
+            # The primary goes last: voters, time buckets and the version live there
+            pipe.unlink(*(self.SONG_VOTERS_KEY_PATTERN.format(song_id=song_id) for song_id in song_ids))
+            for key in self.windows.live_keys() if self.windows else []:
+                pipe.zrem(key, *song_ids)
+            pipe.incr(self.VERSION_KEY)
+
+    def reshard(self, count: int = LIST_PAGE_SIZE) -> int:
+        """
+        Move the scores of the unsharded songs:leaderboard into the shards
+        configured by LEADERBOARD_SHARDS. Run it with the app stopped: votes
+        landing mid-move could be counted twice. Returns the songs moved.
+        """
+        if self.shards.count == 1:
+            return 0
+        moved = 0
+        while True:
+            members = self.redis.zrange(self.LEADERBOARD_KEY, 0, count - 1, withscores=True)
+            if not members:
+                return moved
+            calls = self.shards.plan_deltas(dict(members), [], [])
+            apply_score_deltas(self.shard_clients, self._score_deltas_script, calls, self.VERSION_KEY,
+                               str(uuid.uuid4()))
+            self.redis.zrem(self.LEADERBOARD_KEY, *[song_id for song_id, _ in members])
+            moved += len(members)
\ No newline at end of file
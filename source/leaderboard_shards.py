@@ -0,0 +1,246 @@
+# leaderboard_shards.py
+import heapq
+import uuid
+import zlib
+from itertools import islice
+
+# Marks an apply (one set of deltas) as done on an instance, so re-running it
+# after an EXEC whose reply was lost is a no-op. Kept well past any retry.
+APPLIED_KEY_PATTERN = "scores:applied:{apply_id}"
+APPLIED_TTL_SECONDS = 600
+
+# Applies summed score deltas to every score key. Keys with a TTL are time
+# buckets that keep net (possibly negative) scores; the others drop members
+# once they fall to zero. The marker holds the token of the attempt that
+# applied; another attempt's calls find it and skip, while the other calls
+# of the same MULTI/EXEC carry the same token and still apply.
+# KEYS: applied marker, score keys... |
+# ARGV: marker TTL, attempt token, TTL per score key (0 = no expiry)..., song_id, delta, song_id, delta, ...
+SCORE_DELTAS_SCRIPT = """
+local marker = redis.call('GET', KEYS[1])
+if marker and marker ~= ARGV[2] then
+    return -1
+end
+if not marker then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+end
+local n = #KEYS
+for i = n + 2, #ARGV, 2 do
+    for k = 2, n do
+        local score = tonumber(redis.call('ZINCRBY', KEYS[k], ARGV[i + 1], ARGV[i]))
+        if score == 0 or (score < 0 and tonumber(ARGV[k + 1]) == 0) then
+            redis.call('ZREM', KEYS[k], ARGV[i])
+        end
+    end
+end
+for k = 2, n do
+    if tonumber(ARGV[k + 1]) > 0 then
+        redis.call('EXPIRE', KEYS[k], ARGV[k + 1])
+    end
+end
+return (#ARGV - n - 1) / 2
+"""
+
+# Byte-wise member comparison, the order sorted sets use for equal scores.
+# Lua's own string comparison follows the server's collation locale.
+_LUA_AFTER = """
+local function after(a, b)
+    for i = 1, math.min(#a, #b) do
+        local x, y = string.byte(a, i), string.byte(b, i)
+        if x ~= y then
+            return x > y
+        end
+    end
+    return #a > #b
+end
+"""
+
+# Members of one shard ranked ahead of ARGV[2] (score ARGV[1]): higher scores,
+# or the same score and a greater member, which is how ZREVRANGE orders ties.
+# KEYS: shard key | ARGV: score, song_id
+RANK_AHEAD_SCRIPT = _LUA_AFTER + """
+local ahead = redis.call('ZCOUNT', KEYS[1], '(' .. ARGV[1], '+inf')
+local ties = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[1])
+for i = #ties, 1, -1 do
+    if not after(ties[i], ARGV[2]) then
+        break
+    end
+    ahead = ahead + 1
+end
+return ahead
+"""
+
+# Up to ARGV[3] members of one shard ranked right above and right below
+# ARGV[2] (score ARGV[1]), closest first, as flat member/score lists.
+# KEYS: shard key | ARGV: score, song_id, k
+NEIGHBOURS_SCRIPT = _LUA_AFTER + """
+local k = tonumber(ARGV[3])
+local above, below = {}, {}
+local ties = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[1])
+for i = 1, #ties do
+    if #above < 2 * k and after(ties[i], ARGV[2]) then
+        table.insert(above, ties[i])
+        table.insert(above, ARGV[1])
+    end
+end
+for i = #ties, 1, -1 do
+    if #below < 2 * k and after(ARGV[2], ties[i]) then
+        table.insert(below, ties[i])
+        table.insert(below, ARGV[1])
+    end
+end
+local higher = redis.call('ZRANGEBYSCORE', KEYS[1], '(' .. ARGV[1], '+inf', 'WITHSCORES', 'LIMIT', 0, k)
+local lower = redis.call('ZREVRANGEBYSCORE', KEYS[1], '(' .. ARGV[1], '-inf', 'WITHSCORES', 'LIMIT', 0, k)
+for i = 1, #higher do
+    table.insert(above, higher[i])
+end
+for i = 1, #lower do
+    table.insert(below, lower[i])
+end
+return {above, below}
+"""
+
+class LeaderboardShards:
+    """
+    Spreads leaderboard scores over `count` sub-keys, each song hashed to one
+    of them, so score writes are no longer serialized on a single key. Shard
+    i lives on instance `i % instances`; instance 0 is the primary, which
+    also holds users, votes, the version counter and the time buckets. With
+    count=1 the only shard is the plain base key.
+    """
+
+    def __init__(self, base_key: str, count: int, instances: int = 1):
+        self.base_key = base_key
+        self.count = max(1, count)
+        self.instances = max(1, min(instances, self.count))
+
+    @property
+    def remote(self) -> bool:
+        """True when some shards live outside the primary instance."""
+        return self.instances > 1
+
+    def shard_of(self, song_id: str) -> int:
+        if self.count == 1:
+            return 0
+        return zlib.crc32(song_id.encode()) % self.count
+
+    def key(self, shard: int) -> str:
+        if self.count == 1:
+            return self.base_key
+        return f"{self.base_key}:shard:{shard}"
+
+    def key_for(self, song_id: str) -> str:
+        return self.key(self.shard_of(song_id))
+
+    def instance_of(self, shard: int) -> int:
+        return shard % self.instances
+
+    def is_local(self, song_id: str) -> bool:
+        return self.instance_of(self.shard_of(song_id)) == 0
+
+    def by_instance(self) -> dict:
+        """{instance: [shard keys]}"""
+        groups = {}
+        for shard in range(self.count):
+            groups.setdefault(self.instance_of(shard), []).append(self.key(shard))
+        return groups
+
+    def group_songs(self, song_ids: list) -> dict:
+        """{instance: {shard key: [song_ids]}}"""
+        groups = {}
+        for song_id in song_ids:
+            shard = self.shard_of(song_id)
+            groups.setdefault(self.instance_of(shard), {}).setdefault(self.key(shard), []).append(song_id)
+        return groups
+
+    def plan_deltas(self, deltas: dict, bucket_keys: list, ttls: list) -> dict:
+        """
+        SCORE_DELTAS_SCRIPT calls applying {song_id: delta} to the shards and
+        time buckets, as {instance: [(keys, args)]}.
+        """
+        groups = {}  # (instance, shard key) -> [song_id, delta, ...]
+        for song_id, delta in deltas.items():
+            if delta:
+                shard = self.shard_of(song_id)
+                groups.setdefault((self.instance_of(shard), self.key(shard)), []).extend((song_id, delta))
+
+        calls = {}
+        for (instance, key), pairs in groups.items():
+            if instance == 0:
+                calls.setdefault(0, []).append(([key, *bucket_keys], [0, *ttls, *pairs]))
+                continue
+            calls.setdefault(instance, []).append(([key], [0, *pairs]))
+            if bucket_keys:
+                calls.setdefault(0, []).append((list(bucket_keys), [*ttls, *pairs]))
+        return calls
+
+    def merge_top(self, lists: list, top_n: int) -> list:
+        """k-way merge of per-shard ZREVRANGE ... WITHSCORES results."""
+        merged = heapq.merge(*lists, key=lambda member: (member[1], member[0]), reverse=True)
+        return list(islice(merged, top_n))
+
+    def merge_neighbours(self, replies: list, k: int) -> tuple[list, list]:
+        """
+        (above, below) from per-shard NEIGHBOURS_SCRIPT replies: the k
+        (song_id, score) pairs ranked right above and right below, each in
+        leaderboard order.
+        """
+        above, below = [], []
+        for shard_above, shard_below in replies:
+            above.extend(zip(shard_above[::2], map(float, shard_above[1::2])))
+            below.extend(zip(shard_below[::2], map(float, shard_below[1::2])))
+        order = lambda member: (member[1], member[0])
+        above = sorted(above, key=order)[:k]
+        below = sorted(below, key=order, reverse=True)[:k]
+        return above[::-1], below
+
+def marked_call(call: tuple, apply_id: str, token: str) -> tuple:
+    """A plan_deltas() (keys, args) call with the marker SCORE_DELTAS_SCRIPT checks."""
+    keys, args = call
+    return [APPLIED_KEY_PATTERN.format(apply_id=apply_id), *keys], [APPLIED_TTL_SECONDS, token, *args]
+
+def apply_score_deltas(clients: list, script, calls: dict, version_key: str, apply_id: str, applied: set = None):
+    """
+    Run plan_deltas() calls, one MULTI/EXEC pipeline per instance, then bump
+    the version on the primary. Other instances go first so the version only
+    moves once every score has. Instances that committed are added to
+    `applied` and skipped when the same apply is run again; one whose EXEC
+    failed mid-reply is covered by the marker, so retrying with the same
+    apply_id never counts a delta twice.
+    """
+    applied = set() if applied is None else applied
+    token = str(uuid.uuid4())
+    for instance in sorted(calls, reverse=True):
+        if instance in applied:
+            continue
+        pipe = clients[instance].pipeline()
+        for call in calls[instance]:
+            keys, args = marked_call(call, apply_id, token)
+            script(keys=keys, args=args, client=pipe)
+        if instance == 0:
+            pipe.incr(version_key)
+        pipe.execute()
+        applied.add(instance)
+    if 0 not in calls and 0 not in applied:
+        clients[0].incr(version_key)
+        applied.add(0)
+
+async def apply_score_deltas_async(clients: list, script, calls: dict, version_key: str, apply_id: str,
+                                   applied: set = None):
+    """Async twin of apply_score_deltas, for redis.asyncio clients and scripts."""
+    applied = set() if applied is None else applied
+    token = str(uuid.uuid4())
+    for instance in sorted(calls, reverse=True):
+        if instance in applied:
+            continue
+        pipe = clients[instance].pipeline()
+        for call in calls[instance]:
+            keys, args = marked_call(call, apply_id, token)
+            await script(keys=keys, args=args, client=pipe)
+        if instance == 0:
+            pipe.incr(version_key)
+        await pipe.execute()
+        applied.add(instance)
+    if 0 not in calls and 0 not in applied:
+        await clients[0].incr(version_key)
+        applied.add(0)
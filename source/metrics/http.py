@@ -0,0 +1,84 @@
+# metrics/http.py
+import json
+import logging
+from metrics.registry import registry, current_request
+from config.config import REQUEST_TRACE_HEADER, SLOW_REQUEST_MS, SLOW_REQUEST_ROUND_TRIPS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED = "unmatched"  # 404s and other requests without a route
+TRACE_HEADER = "X-Redis-Trace"
+
+slow_log = logging.getLogger("slow_requests")
+
+def _route(request) -> str:
+    # The rule template, e.g. /user/vote/<song_id>, keeps label cardinality bounded
+    return request.url_rule.rule if request.url_rule is not None else UNMATCHED
+
+def _after(response, debug: bool):
+    stats = current_request.get()
+    if stats is not None:
+        stats.status = response.status_code
+        if debug or REQUEST_TRACE_HEADER:
+            # Redis work up to here; a streamed body may add more
+            trace = stats.trace()
+            trace["elapsed_ms"] = round(stats.elapsed() * 1000, 3)
+            response.headers[TRACE_HEADER] = "; ".join(f"{k}={v}" for k, v in trace.items())
+    return response
+
+def _finish(path: str):
+    stats = current_request.get()
+    if stats is None:
+        return
+    elapsed_ms = registry.finish_request(stats) * 1000
+    if (SLOW_REQUEST_MS and elapsed_ms >= SLOW_REQUEST_MS) or (
+        SLOW_REQUEST_ROUND_TRIPS and stats.round_trips >= SLOW_REQUEST_ROUND_TRIPS
+    ):
+        slow_log.warning(json.dumps({
+            "event": "slow_request",
+            "route": stats.route,
+            "path": path,
+            "method": stats.method,
+            "status": stats.status,
+            "elapsed_ms": round(elapsed_ms, 3),
+            **stats.trace(),
+        }))
+
+def instrument_flask(app):
+    """Record every request of a Flask app and serve GET /metrics."""
+    from flask import Response, request
+
+    @app.before_request
+    def start():
+        registry.start_request(_route(request), request.method)
+
+    @app.after_request
+    def after(response):
+        return _after(response, app.debug)
+
+    @app.teardown_request
+    def finish(_exc=None):
+        _finish(request.path)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+def instrument_quart(app):
+    """instrument_flask for Quart. Hooks are coroutines so they run in the request's task."""
+    from quart import Response, request
+
+    @app.before_request
+    async def start():
+        registry.start_request(_route(request), request.method)
+
+    @app.after_request
+    async def after(response):
+        return _after(response, app.debug)
+
+    @app.teardown_request
+    async def finish(_exc=None):
+        _finish(request.path)
+
+    @app.route('/metrics', methods=['GET'])
+    async def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,228 @@
+# metrics/registry.py
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+# Request latency buckets in seconds (Prometheus `le` bounds, +Inf implied)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BACKGROUND = "background"  # route label for Redis calls made outside a request
+
+class RequestStats:
+    """Per-request counters; only touched by the request's own thread or task."""
+    __slots__ = ("route", "method", "started", "status", "commands", "pipelines", "round_trips", "redis_seconds")
+
+    def __init__(self, route: str, method: str):
+        self.route = route
+        self.method = method
+        self.started = time.perf_counter()
+        self.status = 500  # until a response is produced
+        self.commands = 0
+        self.pipelines = 0
+        self.round_trips = 0
+        self.redis_seconds = 0.0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def trace(self) -> dict:
+        return {
+            "commands": self.commands,
+            "pipelines": self.pipelines,
+            "round_trips": self.round_trips,
+            "redis_ms": round(self.redis_seconds * 1000, 3),
+        }
+
+current_request: ContextVar = ContextVar("current_request", default=None)
+
+class MetricsRegistry:
+    """
+    Process-wide request and Redis metrics rendered in the Prometheus text
+    format. Per-request counts are kept on a RequestStats in a context
+    variable with no locking; they are folded in once when the request ends.
+    Pools and caches are read when /metrics is scraped, not on the hot path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}  # (route, method, status) -> count
+        self._latency = {}  # (route, method) -> [bucket counts..., +Inf count, sum]
+        self._in_flight = {}  # route -> open requests
+        self._redis = {}  # route -> [commands, pipelines, round trips, seconds]
+        self._pools = {}  # name -> pool
+        self._caches = []  # (name, stats_fn)
+        self._admission = []  # (name, stats_fn)
+        self._replicas = None  # ReplicaMonitor.stats
+
+    def start_request(self, route: str, method: str) -> RequestStats:
+        stats = RequestStats(route, method)
+        with self._lock:
+            self._in_flight[route] = self._in_flight.get(route, 0) + 1
+        current_request.set(stats)
+        return stats
+
+    def finish_request(self, stats: RequestStats) -> float:
+        """Fold the request into the totals; returns its duration in seconds."""
+        elapsed = stats.elapsed()
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, elapsed)
+        key = (stats.route, stats.method)
+        with self._lock:
+            self._in_flight[stats.route] -= 1
+            request_key = (stats.route, stats.method, stats.status)
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+            latency[bucket] += 1
+            latency[-1] += elapsed
+            self._add_redis(stats.route, stats.commands, stats.pipelines, stats.round_trips, stats.redis_seconds)
+        current_request.set(None)
+        return elapsed
+
+    def record_redis(self, commands: int, round_trips: int, seconds: float, pipeline: bool = False):
+        """Called by the instrumented Redis clients after every command or pipeline."""
+        stats = current_request.get()
+        if stats is not None:
+            stats.commands += commands
+            stats.pipelines += pipeline
+            stats.round_trips += round_trips
+            stats.redis_seconds += seconds
+            return
+        with self._lock:
+            self._add_redis(BACKGROUND, commands, int(pipeline), round_trips, seconds)
+
+    def _add_redis(self, route: str, commands: int, pipelines: int, round_trips: int, seconds: float):
+        totals = self._redis.get(route)
+        if totals is None:
+            totals = self._redis[route] = [0, 0, 0, 0.0]
+        totals[0] += commands
+        totals[1] += pipelines
+        totals[2] += round_trips
+        totals[3] += seconds
+
+    def add_pool(self, name: str, pool):
+        # Replaces a same-name pool, e.g. the one a worker inherited across fork
+        self._pools[name] = pool
+
+    def add_cache(self, name: str, stats_fn):
+        """`stats_fn()` returns at least {"hits", "misses", "entries"}; same-name caches are summed."""
+        self._caches.append((name, stats_fn))
+
+    def add_admission(self, name: str, stats_fn):
+        """`stats_fn()` returns AdmissionControl.stats(); same-name limiters are summed."""
+        self._admission.append((name, stats_fn))
+
+    def add_replicas(self, stats_fn):
+        """`stats_fn()` returns ReplicaMonitor.stats(); one monitor per process."""
+        self._replicas = stats_fn
+
+    def render(self) -> str:
+        with self._lock:
+            requests = dict(self._requests)
+            latency = {key: list(values) for key, values in self._latency.items()}
+            in_flight = dict(self._in_flight)
+            redis_totals = {route: list(totals) for route, totals in self._redis.items()}
+
+        lines = []
+        lines += _header("http_requests_total", "counter", "Requests by route, method and status.")
+        for (route, method, status), count in sorted(requests.items()):
+            lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}')
+
+        lines += _header("http_request_duration_seconds", "histogram", "Request latency by route.")
+        for (route, method), values in sorted(latency.items()):
+            labels = f'route="{route}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), values[:-1]):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += _header("http_requests_in_flight", "gauge", "Requests being served by route.")
+        for route, count in sorted(in_flight.items()):
+            lines.append(f'http_requests_in_flight{{route="{route}"}} {count}')
+
+        for i, (metric, help_text) in enumerate((
+            ("redis_commands_total", "Redis commands sent, by route."),
+            ("redis_pipelines_total", "Redis pipelines executed, by route."),
+            ("redis_round_trips_total", "Redis round trips, by route."),
+            ("redis_seconds_total", "Time spent waiting on Redis, by route."),
+        )):
+            lines += _header(metric, "counter", help_text)
+            for route, totals in sorted(redis_totals.items()):
+                value = f"{totals[i]:.6f}" if isinstance(totals[i], float) else totals[i]
+                lines.append(f'{metric}{{route="{route}"}} {value}')
+
+        lines += _header("redis_pool_connections", "gauge", "Connections per pool and state.")
+        max_lines = []
+        for name, pool in sorted(self._pools.items()):
+            in_use, idle = _pool_usage(pool)
+            lines.append(f'redis_pool_connections{{pool="{name}",state="in_use"}} {in_use}')
+            lines.append(f'redis_pool_connections{{pool="{name}",state="idle"}} {idle}')
+            max_lines.append(f'redis_pool_max_connections{{pool="{name}"}} {pool.max_connections}')
+        lines += _header("redis_pool_max_connections", "gauge", "Pool size limit.") + max_lines
+
+        caches = {}
+        for name, stats_fn in self._caches:
+            stats = stats_fn()
+            totals = caches.setdefault(name, {"hits": 0, "misses": 0, "entries": 0})
+            for field in totals:
+                totals[field] += stats.get(field, 0)
+        for metric, kind, help_text, field in (
+            ("cache_hits_total", "counter", "Cache hits.", "hits"),
+            ("cache_misses_total", "counter", "Cache misses.", "misses"),
+            ("cache_entries", "gauge", "Entries held.", "entries"),
+        ):
+            lines += _header(metric, kind, help_text)
+            lines += [f'{metric}{{cache="{name}"}} {totals[field]}' for name, totals in sorted(caches.items())]
+        lines += _header("cache_hit_ratio", "gauge", "Hits over lookups since start.")
+        for name, totals in sorted(caches.items()):
+            lookups = totals["hits"] + totals["misses"]
+            lines.append(f'cache_hit_ratio{{cache="{name}"}} {totals["hits"] / lookups if lookups else 0:.4f}')
+
+        admission = {}
+        for name, stats_fn in self._admission:
+            stats = stats_fn()
+            totals = admission.setdefault(name, {"requests": {}, "in_flight": 0, "queued": 0})
+            for outcome, count in stats["requests"].items():
+                totals["requests"][outcome] = totals["requests"].get(outcome, 0) + count
+            totals["in_flight"] += stats["in_flight"]
+            totals["queued"] += stats["queued"]
+        lines += _header("admission_requests_total", "counter", "Requests admitted or shed, by outcome.")
+        for name, totals in sorted(admission.items()):
+            lines += [f'admission_requests_total{{limiter="{name}",outcome="{outcome}"}} {count}'
+                      for outcome, count in sorted(totals["requests"].items())]
+        for metric, help_text, field in (
+            ("admission_in_flight", "Admitted requests being served.", "in_flight"),
+            ("admission_queued", "Requests waiting for a slot.", "queued"),
+        ):
+            lines += _header(metric, "gauge", help_text)
+            lines += [f'{metric}{{limiter="{name}"}} {totals[field]}' for name, totals in sorted(admission.items())]
+
+        if self._replicas:
+            replicas = self._replicas()
+            lines += _header("redis_replica_reads_total", "counter", "Requests whose reads were routed to each node.")
+            lines += [f'redis_replica_reads_total{{node="{node}"}} {count}'
+                      for node, count in sorted(replicas["routed"].items())]
+            for metric, help_text, field in (
+                ("redis_replica_healthy", "1 if the replica takes reads.", "healthy"),
+                ("redis_replica_lag_ms", "Replication lag from the heartbeat key.", "lag_ms"),
+                ("redis_replica_latency_ms", "Smoothed health check latency.", "latency_ms"),
+            ):
+                lines += _header(metric, "gauge", help_text)
+                lines += [f'{metric}{{replica="{r["replica"]}"}} {int(r[field]) if field == "healthy" else r[field]}'
+                          for r in replicas["replicas"] if r[field] is not None]
+        return "\n".join(lines) + "\n"
+
+def _pool_usage(pool) -> tuple[int, int]:
+    """(in use, idle) connections of a redis-py pool."""
+    if hasattr(pool, "_in_use_connections"):
+        return len(pool._in_use_connections), len(pool._available_connections)
+    # Sync BlockingConnectionPool: a queue of idle connections padded with None
+    idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+    return len(pool._connections) - idle, idle
+
+def _header(name: str, kind: str, help_text: str) -> list:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+registry = MetricsRegistry()
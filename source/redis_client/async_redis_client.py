@@ -0,0 +1,87 @@
+# redis_client/async_redis_client.py
+import asyncio
+import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError
+from config.config import (
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_DB,
+    ASYNC_REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_WARMUP,
+    REDIS_REPLICA_URLS,
+    METRICS_ENABLED,
+)
+from redis_client.instrumented import AsyncInstrumentedRedis
+from redis_client.redis_client import POOL_OPTIONS
+from redis_client.replicas import PRIMARY, read_target, shared_replica_monitor
+from metrics.registry import registry
+
+_client_class = AsyncInstrumentedRedis if METRICS_ENABLED else aioredis.Redis
+
+# Same timeouts and health checks as the sync pool, sized for one event loop
+ASYNC_POOL_OPTIONS = {**POOL_OPTIONS, "max_connections": ASYNC_REDIS_MAX_CONNECTIONS}
+
+class AsyncRedisClient:
+    """redis.asyncio counterpart of RedisClient: one client and pool per process."""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            pool = aioredis.BlockingConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, **ASYNC_POOL_OPTIONS)
+            cls._instance = _client_class(connection_pool=pool)
+            registry.add_pool("async_primary", pool)
+        return cls._instance
+
+async def warm_up_async_pool(count: int = REDIS_POOL_WARMUP) -> int:
+    """warm_up_pool for the redis.asyncio pool; call from the serving event loop."""
+    pool = AsyncRedisClient().connection_pool
+    connections = []
+    try:
+        for _ in range(min(count, pool.max_connections)):
+            connection = await pool.get_connection()
+            connections.append(connection)
+            await connection.send_command("PING")
+            await connection.read_response()
+    except ConnectionError:
+        pass  # Redis not up yet; requests will connect on demand
+    finally:
+        for connection in connections:
+            await pool.release(connection)
+    return len(connections)
+
+def async_shard_clients(urls: list) -> list:
+    """redis.asyncio clients for the extra leaderboard shard instances."""
+    clients = [
+        _client_class(connection_pool=aioredis.BlockingConnectionPool.from_url(url, **ASYNC_POOL_OPTIONS))
+        for url in urls
+    ]
+    for i, client in enumerate(clients, start=1):
+        registry.add_pool(f"async_shard{i}", client.connection_pool)
+    return clients
+
+def async_read_client():
+    """read_client for redis.asyncio; health and lag come from the same ReplicaMonitor."""
+    if not REDIS_REPLICA_URLS:
+        return AsyncRedisClient()
+    target = read_target()
+    if target == PRIMARY:
+        return AsyncRedisClient()
+    monitor = shared_replica_monitor()
+    if monitor.async_clients is None:
+        monitor.async_clients = [
+            _client_class(connection_pool=aioredis.BlockingConnectionPool.from_url(url, **ASYNC_POOL_OPTIONS))
+            for url in monitor.urls
+        ]
+        for i, client in enumerate(monitor.async_clients, start=1):
+            registry.add_pool(f"async_replica{i}", client.connection_pool)
+    return monitor.async_clients[target]
+
+# Async twin of retry_redis_call
+async def retry_redis_call_async(fn, *args, retries=3, backoff=0.05, **kwargs):
+    for attempt in range(retries):
+        try:
+            return await fn(*args, **kwargs)
+        except ConnectionError:
+            await asyncio.sleep(backoff * (2 ** attempt))  # Exponential backoff
+    # Final attempt (no catch)
+    return await fn(*args, **kwargs)
@@ -0,0 +1,55 @@
+# redis_client/instrumented.py
+import time
+import redis
+import redis.asyncio as aioredis
+from redis.client import Pipeline
+from redis.asyncio.client import Pipeline as AsyncPipeline
+from metrics.registry import registry
+
+# Each class counts what actually goes over the wire and how long it took:
+# one round trip per command, one per pipeline, plus the SCRIPT EXISTS check
+# redis-py sends before a pipeline that runs registered scripts.
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        if not self.command_stack:
+            return super().execute(raise_on_error)
+        commands, round_trips = len(self.command_stack), 2 if self.scripts else 1
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            registry.record_redis(commands, round_trips, time.perf_counter() - started, pipeline=True)
+
+class InstrumentedRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            registry.record_redis(1, 1, time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+class AsyncInstrumentedPipeline(AsyncPipeline):
+    async def execute(self, raise_on_error: bool = True):
+        if not self.command_stack:
+            return await super().execute(raise_on_error)
+        commands, round_trips = len(self.command_stack), 2 if self.scripts else 1
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            registry.record_redis(commands, round_trips, time.perf_counter() - started, pipeline=True)
+
+class AsyncInstrumentedRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            registry.record_redis(1, 1, time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return AsyncInstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
@@ -1,26 +1,98 @@
 # redis_client/redis_client.py
+import os
+import threading
 import time
 import redis
 from redis.exceptions import ConnectionError
-from config.config import REDIS_HOST, REDIS_PORT, REDIS_DB
-
-# High concurrency connection pool
-_pool = redis.ConnectionPool(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    db=REDIS_DB,
-    max_connections=10000,
-    decode_responses=True
+from config.config import (
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_DB,
+    REDIS_POOL_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT_SECONDS,
+    REDIS_POOL_WARMUP,
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    METRICS_ENABLED,
 )
+from redis_client.instrumented import InstrumentedRedis
+from metrics.registry import registry
+
+# Bounded and blocking: callers queue for a connection instead of opening
+# thousands of them, and fail after the timeout instead of piling on Redis
+POOL_OPTIONS = {
+    "max_connections": REDIS_POOL_MAX_CONNECTIONS,
+    "timeout": REDIS_POOL_TIMEOUT_SECONDS,
+    "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+    "socket_timeout": REDIS_SOCKET_TIMEOUT,
+    "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+    "decode_responses": True,
+}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> redis.BlockingConnectionPool:
+    """
+    This process's pool. It is created on first use and again after a fork,
+    so prefork workers never share sockets with the master or each other.
+    """
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                _pool = redis.BlockingConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, **POOL_OPTIONS)
+                _pool_pid = os.getpid()
+                registry.add_pool("primary", _pool)
+    return _pool
+
+def warm_up_pool(count: int = REDIS_POOL_WARMUP) -> int:
+    """Open and PING up to `count` connections so the first requests don't pay for the handshake; returns how many."""
+    pool = get_pool()
+    connections = []
+    try:
+        for _ in range(min(count, pool.max_connections)):
+            connection = pool.get_connection()
+            connections.append(connection)
+            connection.send_command("PING")
+            connection.read_response()
+    except ConnectionError:
+        pass  # Redis not up yet; requests will connect on demand
+    finally:
+        for connection in connections:
+            pool.release(connection)
+    return len(connections)
+
+# Counts commands and round trips for /metrics
+_client_class = InstrumentedRedis if METRICS_ENABLED else redis.Redis
 
 class RedisClient:
     _instance = None
+    _pid = None
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = redis.Redis(connection_pool=_pool)
+        if cls._pid != os.getpid():
+            cls._instance = _client_class(connection_pool=get_pool())
+            cls._pid = os.getpid()
         return cls._instance
 
+def raw_client():
+    """Client on its own small pool that returns bytes, for binary values such as the voter bitmaps."""
+    options = {**POOL_OPTIONS, "max_connections": 2, "decode_responses": False}
+    return _client_class(connection_pool=redis.BlockingConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, **options))
+
+def shard_clients(urls: list) -> list:
+    """Clients for the extra leaderboard shard instances (LEADERBOARD_SHARD_URLS)."""
+    clients = [
+        _client_class(connection_pool=redis.BlockingConnectionPool.from_url(url, **POOL_OPTIONS))
+        for url in urls
+    ]
+    for i, client in enumerate(clients, start=1):
+        registry.add_pool(f"shard{i}", client.connection_pool)
+    return clients
+
 # Retry wrapper for transient Redis failures (e.g., network hiccups)
 def retry_redis_call(fn, *args, retries=3, backoff=0.05, **kwargs):
     for attempt in range(retries):
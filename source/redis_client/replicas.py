@@ -0,0 +1,284 @@
+# redis_client/replicas.py
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+import redis
+from redis.exceptions import RedisError
+from config.config import (
+    REDIS_REPLICA_URLS,
+    REDIS_REPLICA_SELECTION,
+    REDIS_REPLICA_MAX_LAG_MS,
+    REDIS_REPLICA_CHECK_INTERVAL_MS,
+)
+from redis_client.redis_client import RedisClient, POOL_OPTIONS, _client_class
+from metrics.registry import registry
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_LATENCY = "least_latency"
+
+# The primary's clock in ms, rewritten every check. A replica's lag is how
+# far its copy trails the primary's.
+HEARTBEAT_KEY = "replication:heartbeat"
+PRIMARY = -1
+LATENCY_SMOOTHING = 0.3  # weight of the newest sample in the latency average
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Set on the primary after a user's write so every worker, not just the one
+# that took the write, sends that user's reads to the primary
+WROTE_KEY_PATTERN = "replication:wrote:{user_id}"
+
+# Node serving the current request's reads: PRIMARY, a replica index, or
+# None until the first read picks one
+_read_target = ContextVar("read_target", default=None)
+
+class ReplicaMonitor:
+    """
+    Health, lag and latency of the read replicas, checked from one thread
+    per process. Each check reads HEARTBEAT_KEY from the primary and every
+    replica, then writes a new heartbeat; lag is accurate to about one check
+    interval. Replicas that are unreachable, have no heartbeat yet or lag
+    more than max_lag_ms take no reads until they catch up.
+    """
+
+    def __init__(self, urls: list, selection: str, max_lag_ms: int, check_interval_ms: int):
+        if selection not in (ROUND_ROBIN, LEAST_LATENCY):
+            raise ValueError(f"Unknown REDIS_REPLICA_SELECTION: {selection!r}")
+        self.urls = urls
+        self.selection = selection
+        self.max_lag_ms = max_lag_ms
+        self.check_interval = check_interval_ms / 1000.0
+        self.clients = [
+            _client_class(connection_pool=redis.BlockingConnectionPool.from_url(url, **POOL_OPTIONS))
+            for url in urls
+        ]
+        for i, client in enumerate(self.clients, start=1):
+            registry.add_pool(f"replica{i}", client.connection_pool)
+        self.async_clients = None  # created by async_redis_client on first use
+
+        self._lock = threading.Lock()
+        self._healthy = ()  # replaced as a whole by each check, never mutated
+        self._lag_ms = [None] * len(urls)
+        self._latency_ms = [None] * len(urls)
+        self._turns = itertools.count()
+        self._routed = {}  # node name -> requests whose reads it served
+        registry.add_replicas(self.stats)
+        self._thread = threading.Thread(target=self._run, name="redis-replica-monitor", daemon=True)
+        self._thread.start()
+
+    def pick(self) -> int:
+        """A healthy replica's index, or PRIMARY when there is none."""
+        healthy = self._healthy
+        if not healthy:
+            target = PRIMARY
+        elif self.selection == LEAST_LATENCY:
+            target = min(healthy, key=lambda i: self._latency_ms[i])
+        else:
+            target = healthy[next(self._turns) % len(healthy)]
+        with self._lock:
+            name = node_name(target)
+            self._routed[name] = self._routed.get(name, 0) + 1
+        return target
+
+    def is_healthy(self, index: int) -> bool:
+        return index in self._healthy
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                # The primary is down; replicas keep their last state
+                logger.exception("Replica check failed")
+            time.sleep(self.check_interval)
+
+    def check(self):
+        primary = RedisClient()
+        heartbeat = primary.get(HEARTBEAT_KEY)
+        healthy = []
+        for i, client in enumerate(self.clients):
+            started = time.perf_counter()
+            try:
+                copy = client.get(HEARTBEAT_KEY)
+            except RedisError:
+                self._lag_ms[i] = None
+                continue
+            latency_ms = (time.perf_counter() - started) * 1000
+            previous = self._latency_ms[i]
+            self._latency_ms[i] = latency_ms if previous is None else previous + LATENCY_SMOOTHING * (latency_ms - previous)
+            # Workers write heartbeats concurrently, so the copy can be ahead
+            lag_ms = max(0, int(heartbeat) - int(copy)) if heartbeat and copy else None
+            self._lag_ms[i] = lag_ms
+            if lag_ms is not None and lag_ms <= self.max_lag_ms:
+                healthy.append(i)
+        self._healthy = tuple(healthy)
+
+        seconds, microseconds = primary.time()
+        primary.set(HEARTBEAT_KEY, seconds * 1000 + microseconds // 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            routed = dict(self._routed)
+        return {
+            "enabled": True,
+            "selection": self.selection,
+            "max_lag_ms": self.max_lag_ms,
+            "replicas": [
+                {
+                    "replica": node_name(i),
+                    "healthy": i in self._healthy,
+                    "lag_ms": self._lag_ms[i],
+                    "latency_ms": round(self._latency_ms[i], 3) if self._latency_ms[i] is not None else None,
+                }
+                for i in range(len(self.clients))
+            ],
+            "routed": routed,
+        }
+
+def node_name(target: int) -> str:
+    return "primary" if target == PRIMARY else f"replica{target + 1}"
+
+class RecentWriters:
+    """
+    Users who wrote in the last window_ms. Their reads go to the primary so
+    they see their own votes; the window covers the most a healthy replica
+    can trail. This process's writers are kept here; the WROTE_KEY_PATTERN
+    markers share them with other workers. A marker lives 1.5 windows and
+    is rewritten at most every half window, so a burst of votes costs one
+    SET rather than one per vote.
+    """
+
+    def __init__(self, window_ms: int, max_entries: int = 100000):
+        self.window = window_ms / 1000.0
+        self.marker_ttl_ms = window_ms * 3 // 2
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._until = {}  # user_id -> (monotonic deadline, when its marker was last set)
+
+    def add(self, user_id: str) -> bool:
+        """Note a write; True when the user's marker is due to be (re)written."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_entries:
+                self._until = {u: entry for u, entry in self._until.items() if entry[0] > now}
+            _, marked = self._until.get(user_id, (None, None))
+            due = marked is None or now - marked > self.window / 2
+            self._until[user_id] = (now + self.window, now if due else marked)
+            return due
+
+    def __contains__(self, user_id: str) -> bool:
+        entry = self._until.get(user_id)
+        return entry is not None and entry[0] > time.monotonic()
+
+recent_writers = RecentWriters(REDIS_REPLICA_MAX_LAG_MS + REDIS_REPLICA_CHECK_INTERVAL_MS)
+
+_shared_monitor = None
+_shared_lock = threading.Lock()
+
+def shared_replica_monitor() -> ReplicaMonitor:
+    global _shared_monitor
+    with _shared_lock:
+        if _shared_monitor is None:
+            _shared_monitor = ReplicaMonitor(
+                REDIS_REPLICA_URLS,
+                REDIS_REPLICA_SELECTION,
+                REDIS_REPLICA_MAX_LAG_MS,
+                REDIS_REPLICA_CHECK_INTERVAL_MS,
+            )
+        return _shared_monitor
+
+def begin_request(method: str, user_id: str = None):
+    """Forget the previous request's node. Writes, and reads by a user who just wrote, use the primary."""
+    if method not in SAFE_METHODS or (user_id and (user_id in recent_writers or _wrote_elsewhere(user_id))):
+        _read_target.set(PRIMARY)
+    else:
+        _read_target.set(None)
+
+def end_request(method: str, user_id: str, status: int):
+    if method not in SAFE_METHODS and user_id and status < 400 and recent_writers.add(user_id):
+        try:
+            RedisClient().set(WROTE_KEY_PATTERN.format(user_id=user_id), 1, px=recent_writers.marker_ttl_ms)
+        except RedisError:
+            logger.warning("Could not mark %s as a recent writer", user_id)
+
+def _wrote_elsewhere(user_id: str) -> bool:
+    # One EXISTS on the primary per read that carries a user id
+    try:
+        return RedisClient().exists(WROTE_KEY_PATTERN.format(user_id=user_id)) == 1
+    except RedisError:
+        return False
+
+async def abegin_request(method: str, user_id: str = None):
+    """begin_request with the marker checked over redis.asyncio."""
+    from redis_client.async_redis_client import AsyncRedisClient
+    if method not in SAFE_METHODS or (user_id and user_id in recent_writers):
+        _read_target.set(PRIMARY)
+        return
+    _read_target.set(None)
+    if user_id:
+        try:
+            if await AsyncRedisClient().exists(WROTE_KEY_PATTERN.format(user_id=user_id)) == 1:
+                _read_target.set(PRIMARY)
+        except RedisError:
+            pass
+
+async def aend_request(method: str, user_id: str, status: int):
+    from redis_client.async_redis_client import AsyncRedisClient
+    if method not in SAFE_METHODS and user_id and status < 400 and recent_writers.add(user_id):
+        try:
+            await AsyncRedisClient().set(WROTE_KEY_PATTERN.format(user_id=user_id), 1,
+                                         px=recent_writers.marker_ttl_ms)
+        except RedisError:
+            logger.warning("Could not mark %s as a recent writer", user_id)
+
+def read_target() -> int:
+    """This request's node for reads, picked on first use and kept while healthy."""
+    monitor = shared_replica_monitor()
+    target = _read_target.get()
+    if target is None or (target != PRIMARY and not monitor.is_healthy(target)):
+        target = monitor.pick()
+        _read_target.set(target)
+    return target
+
+def read_client():
+    """Client for read-only commands: the request's replica, else RedisClient()."""
+    if not REDIS_REPLICA_URLS:
+        return RedisClient()
+    target = read_target()
+    return RedisClient() if target == PRIMARY else _shared_monitor.clients[target]
+
+def enable_read_routing(app):
+    """Pin each Flask request's reads to one node, remember who wrote, and serve GET /replicas."""
+    from flask import jsonify, request
+
+    @app.before_request
+    def route_reads():
+        begin_request(request.method, request.headers.get('X-User-Id'))
+
+    @app.after_request
+    def note_writes(response):
+        end_request(request.method, request.headers.get('X-User-Id'), response.status_code)
+        return response
+
+    @app.route('/replicas', methods=['GET'])
+    def replicas():
+        return jsonify({"success": True, **shared_replica_monitor().stats()})
+
+def enable_async_read_routing(app):
+    """enable_read_routing for Quart; coroutine hooks so the pin lives in the request's task."""
+    from quart import jsonify, request
+
+    @app.before_request
+    async def route_reads():
+        await abegin_request(request.method, request.headers.get('X-User-Id'))
+
+    @app.after_request
+    async def note_writes(response):
+        await aend_request(request.method, request.headers.get('X-User-Id'), response.status_code)
+        return response
+
+    @app.route('/replicas', methods=['GET'])
+    async def replicas():
+        return jsonify({"success": True, **shared_replica_monitor().stats()})
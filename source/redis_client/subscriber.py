@@ -0,0 +1,79 @@
+# redis_client/subscriber.py
+import logging
+import queue
+import threading
+import time
+from redis.exceptions import RedisError
+from redis_client.redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+class ChannelSubscriber:
+    """
+    One pub/sub connection and listener thread per process. Handlers are
+    called with the message payload; resync callbacks run after every
+    (re)connect, since messages published while disconnected are lost.
+    """
+
+    def __init__(self, poll_timeout: float = 1.0, reconnect_backoff: float = 0.5):
+        self.poll_timeout = poll_timeout
+        self.reconnect_backoff = reconnect_backoff
+        self._lock = threading.Lock()
+        self._handlers = {}  # channel -> [handler]
+        self._resyncs = []
+        self._pending = queue.SimpleQueue()  # channels the listener still has to subscribe to
+        self._thread = None
+
+    def subscribe(self, channel: str, handler, on_resync=None):
+        with self._lock:
+            if channel not in self._handlers:
+                self._handlers[channel] = []
+                self._pending.put(channel)
+            self._handlers[channel].append(handler)
+            if on_resync:
+                self._resyncs.append(on_resync)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="redis-subscriber", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pubsub = None
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = RedisClient().pubsub(ignore_subscribe_messages=True)
+                    with self._lock:
+                        channels = list(self._handlers)
+                        resyncs = list(self._resyncs)
+                    pubsub.subscribe(*channels)
+                    for resync in resyncs:
+                        resync()
+
+                while not self._pending.empty():
+                    # SUBSCRIBE is idempotent, channels picked up on reconnect are harmless
+                    pubsub.subscribe(self._pending.get())
+
+                message = pubsub.get_message(timeout=self.poll_timeout)
+                if message and message["type"] == "message":
+                    with self._lock:
+                        handlers = list(self._handlers.get(message["channel"], ()))
+                    for handler in handlers:
+                        handler(message["data"])
+            except RedisError:
+                logger.exception("Pub/sub connection lost; resubscribing")
+                if pubsub is not None:
+                    pubsub.close()
+                pubsub = None
+                time.sleep(self.reconnect_backoff)
+            except Exception:
+                logger.exception("Pub/sub handler failed")
+
+_shared_subscriber = None
+_shared_lock = threading.Lock()
+
+def shared_subscriber() -> ChannelSubscriber:
+    global _shared_subscriber
+    with _shared_lock:
+        if _shared_subscriber is None:
+            _shared_subscriber = ChannelSubscriber()
+        return _shared_subscriber
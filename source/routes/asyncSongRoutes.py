@@ -0,0 +1,208 @@
+# routes/asyncSongRoutes.py
+import asyncio
+from quart import Blueprint, jsonify, request, Response
+from controller.async_leaderboard_controller import AsyncLeaderboardController
+from controller.async_song_controller import AsyncSongController
+from controller.song_controller import validate_bulk_songs
+from models.user import Role, User
+from stream.leaderboard_watcher import format_sse
+from routes.pagination import get_page_args
+from routes.conditional import catalog_etag, not_modified, json_response
+from routes.json_provider import dumps_bytes
+from controller.leaderboard_controller import WINDOW_CHOICES
+from config.config import STREAM_HEARTBEAT_SECONDS, STREAM_MAX_TOP_N
+from jobs.purge import JOB_NOT_FOUND, SONGS
+from lazy import lazy
+
+async_song_routes = Blueprint('async_song_routes', __name__)
+leaderboard_ctrl = lazy(AsyncLeaderboardController)
+song_ctrl = lazy(AsyncSongController)
+
+# Mock authentication (headers)
+def get_current_user():
+    user_id = request.headers.get('X-User-Id')
+    role_str = request.headers.get('X-User-Role')
+    if not user_id or not role_str:
+        return None
+    try:
+        role = Role(role_str)
+    except ValueError:
+        return None
+    return User(user_id=user_id, username="mockuser", role=role)
+
+@async_song_routes.route('/create', methods=['POST'])
+async def create_song():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+
+    data = await request.get_json()
+    title = data.get('title')
+    artist = data.get('artist')
+    if not title or not artist:
+        return jsonify({"success": False, "message": "Title and artist required."}), 400
+
+    result = await song_ctrl().create_song(user, title, artist)
+    status_code = 201 if result.get("success") else 403
+    return jsonify(result), status_code
+
+@async_song_routes.route('/create_bulk', methods=['POST'])
+async def create_songs_bulk():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+
+    data = await request.get_json() or {}
+    entries, error = validate_bulk_songs(data.get('songs'))
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+
+    result = await song_ctrl().create_songs(user, entries)
+    status_code = 201 if result.get("success") else 403
+    return jsonify(result), status_code
+
+@async_song_routes.route('/top', methods=['GET'])
+async def get_top_songs():
+    try:
+        top_n = int(request.args.get('top_n', 10))
+    except ValueError:
+        top_n = 10
+    window = request.args.get('window', 'all')
+    if window not in WINDOW_CHOICES:
+        return jsonify({"success": False, "message": "Invalid window."}), 400
+    response = not_modified(request, Response, await leaderboard_ctrl().top_songs_etag(top_n, window))
+    if response:
+        return response
+    etag, result = await leaderboard_ctrl().tagged_top_songs(top_n, window)
+    response = jsonify(result)
+    if etag:
+        response.set_etag(etag)
+    return response, 200 if result["success"] else 400
+
+@async_song_routes.route('/top/stream', methods=['GET'])
+async def stream_top_songs():
+    try:
+        top_n = int(request.args.get('top_n', 10))
+    except ValueError:
+        top_n = 10
+    top_n = max(1, min(top_n, STREAM_MAX_TOP_N))
+
+    async def events():
+        sub_id, pending, snapshot = await leaderboard_ctrl().watcher.subscribe(top_n)
+        try:
+            yield format_sse(*snapshot)
+            while True:
+                try:
+                    event = await asyncio.wait_for(pending.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(*event)
+        finally:
+            leaderboard_ctrl().watcher.unsubscribe(sub_id)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    response = Response(events(), mimetype='text/event-stream', headers=headers)
+    response.timeout = None  # keep the stream open past Quart's response timeout
+    return response
+
+@async_song_routes.route('/top/cache', methods=['GET'])
+async def get_top_cache_stats():
+    return jsonify(leaderboard_ctrl().top_cache_stats())
+
+@async_song_routes.route('/songs', methods=['GET'])
+async def list_songs():
+    cursor, count, fmt = get_page_args(request.args)
+    if fmt == 'ndjson':
+        async def rows():
+            async for s in song_ctrl().iter_songs(count):
+                yield dumps_bytes({"song_id": s.song_id, "title": s.title, "artist": s.artist}) + b"\n"
+        response = Response(rows(), mimetype='application/x-ndjson')
+        response.timeout = None
+        return response
+    etag = catalog_etag(SONGS, await song_ctrl().catalog_version(), cursor, count)
+    response = not_modified(request, Response, etag)
+    if response:
+        return response
+    if cursor is not None:
+        next_cursor, songs = await song_ctrl().scan_songs(cursor, count)
+        response = jsonify({
+            "success": True,
+            "cursor": next_cursor,
+            "song_ids": [s.song_id for s in songs],
+            "songs": [{"song_id": s.song_id, "title": s.title, "artist": s.artist} for s in songs],
+        })
+        response.set_etag(etag)
+        return response
+
+    result = await song_ctrl().list_songs()
+    payload = {"total_songs": len(result), "song_ids": [song.song_id for song in result]}
+    return json_response(Response, payload, etag)
+
+@async_song_routes.route('/rank/<song_id>', methods=['GET'])
+async def get_song_rank(song_id):
+    window = request.args.get('window', 'all')
+    if window.isdigit():
+        # window=k: the k songs ranked above and below this one
+        result = await leaderboard_ctrl().songs_around(song_id, int(window))
+        return jsonify(result)
+    if window not in WINDOW_CHOICES:
+        return jsonify({"success": False, "message": "Invalid window."}), 400
+    result = await leaderboard_ctrl().song_rank(song_id, window)
+    return jsonify(result)
+
+@async_song_routes.route('/ranks', methods=['GET'])
+async def get_song_ranks():
+    song_ids = [song_id for ids in request.args.getlist('ids') for song_id in ids.split(',') if song_id]
+    if not song_ids:
+        return jsonify({"success": False, "message": "ids required."}), 400
+    window = request.args.get('window', 'all')
+    if window not in WINDOW_CHOICES:
+        return jsonify({"success": False, "message": "Invalid window."}), 400
+    result = await leaderboard_ctrl().song_ranks(song_ids, window)
+    return jsonify(result), 200 if result["success"] else 400
+
+@async_song_routes.route('/lag', methods=['GET'])
+async def get_write_behind_lag():
+    return jsonify(leaderboard_ctrl().write_behind_lag())
+
+@async_song_routes.route('/update/<song_id>', methods=['PUT'])
+async def update_song(song_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = await request.get_json()
+    title = data.get('title')
+    artist = data.get('artist')
+    result = await song_ctrl().update_song(user, song_id, title, artist)
+    return jsonify(result), (200 if result["success"] else 403)
+
+@async_song_routes.route('/delete/<song_id>', methods=['DELETE'])
+async def delete_song(song_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = await song_ctrl().delete_song(user, song_id)
+    return jsonify(result), (200 if result["success"] else 403)
+
+@async_song_routes.route('/delete_all', methods=['DELETE'])
+async def delete_all_songs():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = await song_ctrl().delete_all_songs(user)
+    return jsonify(result), (202 if result["success"] else 403)
+
+@async_song_routes.route('/jobs/<job_id>', methods=['GET'])
+async def get_purge_job(job_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = await song_ctrl().purge_status(user, job_id)
+    if result["success"]:
+        return jsonify(result), 200
+    return jsonify(result), (404 if result["message"] == JOB_NOT_FOUND else 403)
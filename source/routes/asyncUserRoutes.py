@@ -0,0 +1,195 @@
+# routes/asyncUserRoutes.py
+from quart import Blueprint, request, jsonify, Response
+from models.user import User, Role
+from controller.async_leaderboard_controller import AsyncLeaderboardController
+from controller.leaderboard_controller import CANNOT_VOTE
+from auth.async_registration import AsyncUserRegistration
+from auth.registration import validate_bulk_users
+from admission.admission import AsyncAdmissionControl
+from routes.pagination import get_page_args
+from routes.conditional import catalog_etag, not_modified
+from routes.json_provider import dumps_bytes
+from jobs.purge import JOB_NOT_FOUND, USERS
+from lazy import lazy
+
+async_user_routes = Blueprint('async_user_routes', __name__)
+leaderboard_ctrl = lazy(AsyncLeaderboardController)
+user_reg = lazy(AsyncUserRegistration)
+admission = lazy(AsyncAdmissionControl)
+
+# Mock authentication (headers)
+def get_current_user():
+    user_id = request.headers.get('X-User-Id')
+    role_str = request.headers.get('X-User-Role')
+    if not user_id or not role_str:
+        return None
+    try:
+        role = Role(role_str)
+    except ValueError:
+        return None
+    return User(user_id=user_id, username="mockuser", role=role)
+
+def shed(rejection):
+    status, retry_after, result = rejection
+    return jsonify(result), status, {"Retry-After": str(retry_after)}
+
+@async_user_routes.route('/register', methods=['POST'])
+async def register():
+    data = await request.get_json()
+    username = data.get('username')
+    role_str = data.get('role', 'USER')
+    try:
+        role = Role(role_str)
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid role."}), 400
+
+    user = await user_reg().register_user(username, role)
+    return jsonify({
+        "success": True,
+        "user_id": user.user_id,
+        "username": user.username,
+        "role": user.role.value
+    }), 201
+
+@async_user_routes.route('/register_bulk', methods=['POST'])
+async def register_bulk():
+    data = await request.get_json() or {}
+    entries, error = validate_bulk_users(data.get('users'))
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+
+    users = await user_reg().register_users(entries)
+    return jsonify({
+        "success": True,
+        "created": len(users),
+        "users": [{"user_id": u.user_id, "username": u.username, "role": u.role.value} for u in users]
+    }), 201
+
+@async_user_routes.route('/users', methods=['GET'])
+async def get_all_users():
+    cursor, count, fmt = get_page_args(request.args)
+    if fmt == 'ndjson':
+        async def rows():
+            async for u in user_reg().iter_users(count=count):
+                yield dumps_bytes({"user_id": u.user_id, "username": u.username}) + b"\n"
+        response = Response(rows(), mimetype='application/x-ndjson')
+        response.timeout = None
+        return response
+    etag = catalog_etag(USERS, await user_reg().catalog_version(), cursor, count)
+    response = not_modified(request, Response, etag)
+    if response:
+        return response
+    if cursor is not None:
+        next_cursor, users = await user_reg().scan_users(cursor, count)
+        response = jsonify({
+            "success": True,
+            "cursor": next_cursor,
+            "user_ids": [u.user_id for u in users],
+            "users": [{"user_id": u.user_id, "username": u.username} for u in users],
+        })
+    else:
+        users = await user_reg().get_all_non_admin_users()
+        response = jsonify({
+            "success": True,
+            "user_ids": [u.user_id for u in users]
+        })
+    response.set_etag(etag)
+    return response
+
+@async_user_routes.route('/admins', methods=['GET'])
+async def get_all_admins():
+    admins = await user_reg().get_all_admin_users()
+    admins_data = [{"user_id": a.user_id, "username": a.username} for a in admins]
+    return jsonify({"success": True, "admins": admins_data})
+
+@async_user_routes.route('/vote/<song_id>', methods=['POST'])
+async def vote(song_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+    async with admission().admit(user.user_id) as rejection:
+        if rejection:
+            return shed(rejection)
+        result = await leaderboard_ctrl().vote(user, song_id)
+    return jsonify(result)
+
+@async_user_routes.route('/votes', methods=['POST'])
+async def bulk_vote():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+
+    data = await request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list):
+        return jsonify({"success": False, "message": "operations list required."}), 400
+
+    async with admission().admit(user.user_id, bulk_ops=len(operations)) as rejection:
+        if rejection:
+            return shed(rejection)
+        result = await leaderboard_ctrl().bulk_vote(user, operations)
+    if result["success"]:
+        return jsonify(result), 200
+    return jsonify(result), (403 if result["message"] == CANNOT_VOTE else 400)
+
+@async_user_routes.route('/votes', methods=['GET'])
+async def list_votes():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+    result = await leaderboard_ctrl().user_votes(user, request.args.get('user_id'))
+    return jsonify(result), (200 if result["success"] else 403)
+
+@async_user_routes.route('/unvote/<song_id>', methods=['POST'])
+async def unvote(song_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+    async with admission().admit(user.user_id) as rejection:
+        if rejection:
+            return shed(rejection)
+        result = await leaderboard_ctrl().unvote(user, song_id)
+    return jsonify(result)
+
+@async_user_routes.route('/admission', methods=['GET'])
+async def get_admission_stats():
+    return jsonify({"success": True, **admission().stats()})
+
+@async_user_routes.route('/update/<target_user_id>', methods=['PUT'])
+async def update_user(target_user_id):
+    admin_user = get_current_user()
+    if not admin_user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = await request.get_json()
+    result = await user_reg().update_user(admin_user, target_user_id, data.get("username"), data.get("role"))
+    return jsonify(result), (200 if result["success"] else 403)
+
+@async_user_routes.route('/delete/<target_user_id>', methods=['DELETE'])
+async def delete_user(target_user_id):
+    admin_user = get_current_user()
+    if not admin_user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = await user_reg().delete_user(admin_user, target_user_id)
+    return jsonify(result), (200 if result["success"] else 403)
+
+@async_user_routes.route('/delete_all', methods=['DELETE'])
+async def delete_all_users_route():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = await user_reg().delete_all_users(user)
+    return jsonify(result), (202 if result["success"] else 403)
+
+@async_user_routes.route('/jobs/<job_id>', methods=['GET'])
+async def get_purge_job(job_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = await user_reg().purge_status(user, job_id)
+    if result["success"]:
+        return jsonify(result), 200
+    return jsonify(result), (404 if result["message"] == JOB_NOT_FOUND else 403)
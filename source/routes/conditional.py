@@ -0,0 +1,25 @@
+# routes/conditional.py
+# Conditional GETs for the polled read endpoints, shared by the Flask and
+# Quart blueprints. ETags come from version counters read before the body is
+# built, so a matching If-None-Match is answered without building it.
+from routes.json_provider import dumps_bytes
+
+def catalog_etag(kind: str, version: int, cursor: int = None, count: int = None) -> str:
+    if cursor is None:
+        return f"{kind}:{version}"
+    return f"{kind}:{version}:{cursor}:{count}"
+
+def not_modified(request, response_class, etag: str):
+    """A 304 for `etag` when If-None-Match names it (or is *), else None."""
+    if etag and request.if_none_match.contains_weak(etag):
+        response = response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def json_response(response_class, payload: dict, etag: str = None):
+    """`payload` serialized in insertion order, tagged with `etag`."""
+    response = response_class(dumps_bytes(payload), mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
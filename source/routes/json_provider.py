@@ -0,0 +1,51 @@
+# routes/json_provider.py
+import json
+import logging
+from flask.json.provider import DefaultJSONProvider
+from config.config import JSON_ENCODER
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+if JSON_ENCODER == "orjson" and orjson is None:
+    logger.warning("JSON_ENCODER=orjson but orjson is not installed, using json")
+FAST = JSON_ENCODER == "orjson" and orjson is not None
+
+# Datetimes and dataclasses go through the provider's default() so both
+# encoders render them the same way
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                   | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+def dumps_bytes(obj, sort_keys: bool = False, default=DefaultJSONProvider.default) -> bytes:
+    """Compact UTF-8 JSON, keys in insertion order unless `sort_keys`."""
+    if FAST:
+        return orjson.dumps(obj, default=default,
+                            option=_ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+    return json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys, default=default).encode()
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() through dumps_bytes(): orjson builds the body in one pass with
+    no str round trip. Output matches DefaultJSONProvider except that
+    non-ASCII text is sent as UTF-8 instead of \\u escapes. Indented (debug)
+    output and dumps() calls with json.dumps options use the stdlib.
+    Works for Flask and Quart apps alike.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if FAST and not kwargs:
+            return self._dumps_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not FAST or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj) -> bytes:
+        return dumps_bytes(obj, sort_keys=self.sort_keys, default=self.default)
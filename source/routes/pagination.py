@@ -0,0 +1,28 @@
+# routes/pagination.py
+from flask import Response
+from routes.json_provider import dumps_bytes
+from config.config import LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
+
+def get_page_args(args):
+    """
+    Parse ?cursor=&count=&format= from request `args` for list endpoints.
+    cursor is None when the client did not ask for a page.
+    """
+    cursor = args.get('cursor')
+    try:
+        cursor = int(cursor) if cursor is not None else None
+    except ValueError:
+        cursor = 0
+    try:
+        count = int(args.get('count', LIST_PAGE_SIZE))
+    except ValueError:
+        count = LIST_PAGE_SIZE
+    count = max(1, min(count, LIST_MAX_PAGE_SIZE))
+    return cursor, count, args.get('format', 'json')
+
+def ndjson_response(rows) -> Response:
+    """Stream an iterable of dicts as newline-delimited JSON."""
+    def generate():
+        for row in rows:
+            yield dumps_bytes(row) + b"\n"
+    return Response(generate(), mimetype='application/x-ndjson')
@@ -1,15 +1,27 @@
 # routes/songRoutes.py
 from flask import Blueprint, jsonify, request, Response
-import json
-from collections import OrderedDict
-from controller.leaderboard_controller import LeaderboardController
-from controller.song_controller import SongController
+import queue
+import threading
+from controller.leaderboard_controller import LeaderboardController, WINDOW_CHOICES
+from controller.song_controller import SongController, validate_bulk_songs
 from models.user import Role, User
 from auth.auth import is_admin
+from stream.leaderboard_watcher import format_sse
+from routes.pagination import get_page_args, ndjson_response
+from routes.conditional import catalog_etag, not_modified, json_response
+from config.config import (
+    STREAM_HEARTBEAT_SECONDS,
+    STREAM_MAX_TOP_N,
+    STREAM_MAX_PER_WORKER,
+    ADMISSION_RETRY_AFTER_SECONDS,
+)
+from jobs.purge import JOB_NOT_FOUND, SONGS
+from lazy import lazy
 
 song_routes = Blueprint('song_routes', __name__)
-leaderboard_ctrl = LeaderboardController()
-song_ctrl = SongController()
+leaderboard_ctrl = lazy(LeaderboardController)
+song_ctrl = lazy(SongController)
+stream_slots = threading.BoundedSemaphore(STREAM_MAX_PER_WORKER) if STREAM_MAX_PER_WORKER > 0 else None
 
 # Mock authentication (headers)
 def get_current_user():
@@ -35,7 +47,22 @@ def create_song():
     if not title or not artist:
         return jsonify({"success": False, "message": "Title and artist required."}), 400
 
-    result = song_ctrl.create_song(user, title, artist)
+    result = song_ctrl().create_song(user, title, artist)
+    status_code = 201 if result.get("success") else 403
+    return jsonify(result), status_code
+
+@song_routes.route('/create_bulk', methods=['POST'])
+def create_songs_bulk():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+
+    data = request.json or {}
+    entries, error = validate_bulk_songs(data.get('songs'))
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+
+    result = song_ctrl().create_songs(user, entries)
     status_code = 201 if result.get("success") else 403
     return jsonify(result), status_code
 
@@ -45,22 +72,109 @@ def get_top_songs():
         top_n = int(request.args.get('top_n', 10))
     except ValueError:
         top_n = 10
-    result = leaderboard_ctrl.top_songs(top_n)
-    return jsonify(result)
+    window = request.args.get('window', 'all')
+    if window not in WINDOW_CHOICES:
+        return jsonify({"success": False, "message": "Invalid window."}), 400
+    # A poll that already has the current top-N never loads it
+    response = not_modified(request, Response, leaderboard_ctrl().top_songs_etag(top_n, window))
+    if response:
+        return response
+    etag, result = leaderboard_ctrl().tagged_top_songs(top_n, window)
+    response = jsonify(result)
+    if etag:
+        response.set_etag(etag)
+    return response, 200 if result["success"] else 400
+
+@song_routes.route('/top/stream', methods=['GET'])
+def stream_top_songs():
+    try:
+        top_n = int(request.args.get('top_n', 10))
+    except ValueError:
+        top_n = 10
+    top_n = max(1, min(top_n, STREAM_MAX_TOP_N))
+    if stream_slots and not stream_slots.acquire(blocking=False):
+        response = jsonify({"success": False, "message": "Too many open streams, poll /song/top instead."})
+        response.headers["Retry-After"] = str(ADMISSION_RETRY_AFTER_SECONDS)
+        return response, 503
+
+    def events():
+        # Subscribing inside the generator ties the subscription to the open response
+        sub_id, pending, snapshot = leaderboard_ctrl().watcher.subscribe(top_n)
+        try:
+            yield format_sse(*snapshot)
+            while True:
+                try:
+                    event = pending.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(*event)
+        finally:
+            leaderboard_ctrl().watcher.unsubscribe(sub_id)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    response = Response(events(), mimetype='text/event-stream', headers=headers)
+    # The server closes the response even when the generator never started
+    if stream_slots:
+        response.call_on_close(stream_slots.release)
+    return response
+
+@song_routes.route('/top/cache', methods=['GET'])
+def get_top_cache_stats():
+    return jsonify(leaderboard_ctrl().top_cache_stats())
 
 @song_routes.route('/songs', methods=['GET'])
 def list_songs():
-    result = song_ctrl.list_songs()
-    total_songs = len(result)
+    cursor, count, fmt = get_page_args(request.args)
+    if fmt == 'ndjson':
+        rows = ({"song_id": s.song_id, "title": s.title, "artist": s.artist}
+                for s in song_ctrl().iter_songs(count))
+        return ndjson_response(rows)
+    etag = catalog_etag(SONGS, song_ctrl().catalog_version(), cursor, count)
+    response = not_modified(request, Response, etag)
+    if response:
+        return response
+    if cursor is not None:
+        next_cursor, songs = song_ctrl().scan_songs(cursor, count)
+        response = jsonify({
+            "success": True,
+            "cursor": next_cursor,
+            "song_ids": [s.song_id for s in songs],
+            "songs": [{"song_id": s.song_id, "title": s.title, "artist": s.artist} for s in songs],
+        })
+        response.set_etag(etag)
+        return response
+
+    result = song_ctrl().list_songs()
     song_ids = [song.song_id for song in result]
-    ordered_payload = dict()
-    ordered_payload["total_songs"] = total_songs
-    ordered_payload["song_ids"] = song_ids
-    return Response(json.dumps(ordered_payload), mimetype='application/json')
+    return json_response(Response, {"total_songs": len(result), "song_ids": song_ids}, etag)
 
 @song_routes.route('/rank/<song_id>', methods=['GET'])
 def get_song_rank(song_id):
-    result = leaderboard_ctrl.song_rank(song_id)
+    window = request.args.get('window', 'all')
+    if window.isdigit():
+        # window=k: the k songs ranked above and below this one
+        result = leaderboard_ctrl().songs_around(song_id, int(window))
+        return jsonify(result)
+    if window not in WINDOW_CHOICES:
+        return jsonify({"success": False, "message": "Invalid window."}), 400
+    result = leaderboard_ctrl().song_rank(song_id, window)
+    return jsonify(result)
+
+@song_routes.route('/ranks', methods=['GET'])
+def get_song_ranks():
+    song_ids = [song_id for ids in request.args.getlist('ids') for song_id in ids.split(',') if song_id]
+    if not song_ids:
+        return jsonify({"success": False, "message": "ids required."}), 400
+    window = request.args.get('window', 'all')
+    if window not in WINDOW_CHOICES:
+        return jsonify({"success": False, "message": "Invalid window."}), 400
+    result = leaderboard_ctrl().song_ranks(song_ids, window)
+    return jsonify(result), 200 if result["success"] else 400
+
+@song_routes.route('/lag', methods=['GET'])
+def get_write_behind_lag():
+    result = leaderboard_ctrl().write_behind_lag()
     return jsonify(result)
 
 @song_routes.route('/update/<song_id>', methods=['PUT'])
@@ -72,7 +186,7 @@ def update_song(song_id):
     data = request.json
     title = data.get('title')
     artist = data.get('artist')
-    result = song_ctrl.update_song(user, song_id, title, artist)
+    result = song_ctrl().update_song(user, song_id, title, artist)
     return jsonify(result), (200 if result["success"] else 403)
 
 @song_routes.route('/delete/<song_id>', methods=['DELETE'])
@@ -81,7 +195,7 @@ def delete_song(song_id):
     if not user:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    result = song_ctrl.delete_song(user, song_id)
+    result = song_ctrl().delete_song(user, song_id)
     return jsonify(result), (200 if result["success"] else 403)
 
 @song_routes.route('/delete_all', methods=['DELETE'])
@@ -90,6 +204,17 @@ def delete_all_songs():
     if not user:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    result = song_ctrl.delete_all_songs(user)
-    return jsonify(result), (200 if result["success"] else 403)
+    result = song_ctrl().delete_all_songs(user)
+    return jsonify(result), (202 if result["success"] else 403)
+
+@song_routes.route('/jobs/<job_id>', methods=['GET'])
+def get_purge_job(job_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = song_ctrl().purge_status(user, job_id)
+    if result["success"]:
+        return jsonify(result), 200
+    return jsonify(result), (404 if result["message"] == JOB_NOT_FOUND else 403)
 
@@ -1,12 +1,18 @@
 # routes/userRoutes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from models.user import User, Role
-from controller.leaderboard_controller import LeaderboardController
-from auth.registration import UserRegistration
+from controller.leaderboard_controller import LeaderboardController, CANNOT_VOTE
+from auth.registration import UserRegistration, validate_bulk_users
+from admission.admission import AdmissionControl
+from routes.pagination import get_page_args, ndjson_response
+from routes.conditional import catalog_etag, not_modified
+from jobs.purge import JOB_NOT_FOUND, USERS
+from lazy import lazy
 
 user_routes = Blueprint('user_routes', __name__)
-leaderboard_ctrl = LeaderboardController()
-user_reg = UserRegistration()
+leaderboard_ctrl = lazy(LeaderboardController)
+user_reg = lazy(UserRegistration)
+admission = lazy(AdmissionControl)
 
 def is_admin(user: User) -> bool:
     return user.role == Role.ADMIN
@@ -23,6 +29,10 @@ def get_current_user():
         return None
     return User(user_id=user_id, username="mockuser", role=role)
 
+def shed(rejection):
+    status, retry_after, result = rejection
+    return jsonify(result), status, {"Retry-After": str(retry_after)}
+
 @user_routes.route('/register', methods=['POST'])
 def register():
     data = request.json
@@ -33,7 +43,7 @@ def register():
     except ValueError:
         return jsonify({"success": False, "message": "Invalid role."}), 400
 
-    user = user_reg.register_user(username, role)
+    user = user_reg().register_user(username, role)
     return jsonify({
         "success": True,
         "user_id": user.user_id,
@@ -41,20 +51,55 @@ def register():
         "role": user.role.value
     }), 201
 
+@user_routes.route('/register_bulk', methods=['POST'])
+def register_bulk():
+    data = request.json or {}
+    entries, error = validate_bulk_users(data.get('users'))
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+
+    users = user_reg().register_users(entries)
+    return jsonify({
+        "success": True,
+        "created": len(users),
+        "users": [{"user_id": u.user_id, "username": u.username, "role": u.role.value} for u in users]
+    }), 201
+
 @user_routes.route('/users', methods=['GET'])
 def get_all_users():
-    users = user_reg.get_all_non_admin_users()
+    cursor, count, fmt = get_page_args(request.args)
+    if fmt == 'ndjson':
+        rows = ({"user_id": u.user_id, "username": u.username} for u in user_reg().iter_users(count=count))
+        return ndjson_response(rows)
+    etag = catalog_etag(USERS, user_reg().catalog_version(), cursor, count)
+    response = not_modified(request, Response, etag)
+    if response:
+        return response
+    if cursor is not None:
+        next_cursor, users = user_reg().scan_users(cursor, count)
+        response = jsonify({
+            "success": True,
+            "cursor": next_cursor,
+            "user_ids": [u.user_id for u in users],
+            "users": [{"user_id": u.user_id, "username": u.username} for u in users],
+        })
+        response.set_etag(etag)
+        return response
+
+    users = user_reg().get_all_non_admin_users()
     # users_data = [{"user_id": u.user_id, "username": u.username} for u in users]
     # return jsonify({"success": True, "users": users_data})
     user_ids = [u.user_id for u in users]
-    return jsonify({
+    response = jsonify({
         "success": True,
         "user_ids": user_ids
     })
+    response.set_etag(etag)
+    return response
 
 @user_routes.route('/admins', methods=['GET'])
 def get_all_admins():
-    admins = user_reg.get_all_admin_users()
+    admins = user_reg().get_all_admin_users()
     admins_data = [{"user_id": a.user_id, "username": a.username} for a in admins]
     return jsonify({"success": True, "admins": admins_data})
 
@@ -63,17 +108,54 @@ def vote(song_id):
     user = get_current_user()
     if not user:
         return jsonify({"success": False, "message": "Unauthorized."}), 401
-    result = leaderboard_ctrl.vote(user, song_id)
+    with admission().admit(user.user_id) as rejection:
+        if rejection:
+            return shed(rejection)
+        result = leaderboard_ctrl().vote(user, song_id)
     return jsonify(result)
 
+@user_routes.route('/votes', methods=['POST'])
+def bulk_vote():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list):
+        return jsonify({"success": False, "message": "operations list required."}), 400
+
+    with admission().admit(user.user_id, bulk_ops=len(operations)) as rejection:
+        if rejection:
+            return shed(rejection)
+        result = leaderboard_ctrl().bulk_vote(user, operations)
+    if result["success"]:
+        return jsonify(result), 200
+    return jsonify(result), (403 if result["message"] == CANNOT_VOTE else 400)
+
+@user_routes.route('/votes', methods=['GET'])
+def list_votes():
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized."}), 401
+    result = leaderboard_ctrl().user_votes(user, request.args.get('user_id'))
+    return jsonify(result), (200 if result["success"] else 403)
+
 @user_routes.route('/unvote/<song_id>', methods=['POST'])
 def unvote(song_id):
     user = get_current_user()
     if not user:
         return jsonify({"success": False, "message": "Unauthorized."}), 401
-    result = leaderboard_ctrl.unvote(user, song_id)
+    with admission().admit(user.user_id) as rejection:
+        if rejection:
+            return shed(rejection)
+        result = leaderboard_ctrl().unvote(user, song_id)
     return jsonify(result)
 
+@user_routes.route('/admission', methods=['GET'])
+def get_admission_stats():
+    return jsonify({"success": True, **admission().stats()})
+
 @user_routes.route('/update/<target_user_id>', methods=['PUT'])
 def update_user(target_user_id):
     admin_user = get_current_user()
@@ -83,7 +165,7 @@ def update_user(target_user_id):
     data = request.json
     username = data.get("username")
     role = data.get("role")
-    result = user_reg.update_user(admin_user, target_user_id, username, role)
+    result = user_reg().update_user(admin_user, target_user_id, username, role)
     return jsonify(result), (200 if result["success"] else 403)
 
 @user_routes.route('/delete/<target_user_id>', methods=['DELETE'])
@@ -92,7 +174,7 @@ def delete_user(target_user_id):
     if not admin_user:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    result = user_reg.delete_user(admin_user, target_user_id)
+    result = user_reg().delete_user(admin_user, target_user_id)
     return jsonify(result), (200 if result["success"] else 403)
 
 
@@ -102,7 +184,18 @@ def delete_all_users_route():
     if not user:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    result = user_reg.delete_all_users(user)  # call service method
-    status_code = 200 if result["success"] else 403
+    result = user_reg().delete_all_users(user)  # starts a background purge
+    status_code = 202 if result["success"] else 403
     return jsonify(result), status_code
 
+@user_routes.route('/jobs/<job_id>', methods=['GET'])
+def get_purge_job(job_id):
+    user = get_current_user()
+    if not user:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    result = user_reg().purge_status(user, job_id)
+    if result["success"]:
+        return jsonify(result), 200
+    return jsonify(result), (404 if result["message"] == JOB_NOT_FOUND else 403)
+
@@ -0,0 +1,146 @@
+# storage/backend.py
+import threading
+from models.user import Role, User
+from config.config import STORAGE_BACKEND
+
+REDIS = "redis"
+MEMORY = "memory"
+
+class StorageBackend:
+    """
+    Users, songs, votes and the leaderboard as the controllers use them.
+    Permission checks and response dicts stay in the controllers; a backend
+    only stores, ranks and reports what happened. Vote methods return the
+    Leaderboard.VOTE_* / UNVOTE_* status codes.
+
+    Two implementations: RedisBackend (storage/redis_backend.py), the
+    Leaderboard with shards, time windows, write-behind and caches, and
+    MemoryBackend (storage/memory_backend.py), a single-process engine.
+    tests/test_storage_conformance.py runs the same checks against either.
+    """
+
+    # TimeWindows when windowed leaderboards are served, else None
+    windows = None
+    # Process-wide MetadataCache when enabled, else None
+    metadata_cache = None
+
+    # Users
+    def add_users(self, users: list[User]):
+        raise NotImplementedError
+
+    def get_user(self, user_id: str) -> User | None:
+        raise NotImplementedError
+
+    def user_exists(self, user_id: str) -> bool:
+        raise NotImplementedError
+
+    def update_user(self, user_id: str, username: str, role: Role) -> bool:
+        """False if the user does not exist."""
+        raise NotImplementedError
+
+    def delete_user(self, user_id: str) -> bool:
+        """False if the user does not exist."""
+        raise NotImplementedError
+
+    def scan_users(self, role: Role, cursor: int, count: int) -> tuple[int, list[User]]:
+        """One page of users with `role`; a next cursor of 0 means done."""
+        raise NotImplementedError
+
+    # Songs
+    def add_songs(self, songs: list[dict]):
+        """Store {"song_id", "title", "artist"} dicts."""
+        raise NotImplementedError
+
+    def get_songs_metadata(self, song_ids: list) -> dict:
+        """{song_id: {"title", "artist"} or None}"""
+        raise NotImplementedError
+
+    def update_song(self, song_id: str, title: str, artist: str) -> bool:
+        """False if the song does not exist."""
+        raise NotImplementedError
+
+    def delete_song(self, song_id: str) -> bool:
+        """Remove the song and its score. False if it does not exist."""
+        raise NotImplementedError
+
+    def scan_songs(self, cursor: int, count: int) -> tuple[int, list]:
+        """One page of Song objects; a next cursor of 0 means done."""
+        raise NotImplementedError
+
+    # Leaderboard
+    def vote_song(self, user_id: str, song_id: str) -> int:
+        raise NotImplementedError
+
+    def unvote_song(self, user_id: str, song_id: str) -> int:
+        raise NotImplementedError
+
+    def bulk_vote(self, operations: list) -> list[int]:
+        """One status per (action, user_id, song_id), action "vote" or "unvote"."""
+        raise NotImplementedError
+
+    def get_user_votes(self, user_id: str) -> list:
+        """Song IDs the user has voted for, among existing songs; [] for unknown users."""
+        raise NotImplementedError
+
+    def get_top_songs(self, top_n: int = 10, window: str = None) -> list:
+        """[{song_id, score, title, artist}], highest score first, ties by song_id descending."""
+        raise NotImplementedError
+
+    def get_song_rank(self, song_id: str, window: str = None) -> int | None:
+        """1-based rank, None if the song has no score."""
+        raise NotImplementedError
+
+    def get_song_ranks(self, song_ids: list, window: str = None) -> list:
+        """[{song_id, rank, score}] in the order of `song_ids`."""
+        raise NotImplementedError
+
+    def get_songs_around(self, song_id: str, k: int) -> tuple[int, list] | None:
+        """(rank, [{rank, song_id, score, title, artist}]) for the k songs either side."""
+        raise NotImplementedError
+
+    def get_song_score(self, song_id: str) -> int:
+        raise NotImplementedError
+
+    def get_version(self) -> int:
+        """Counter bumped by every score or song metadata change."""
+        raise NotImplementedError
+
+    def window_key(self, window: str = None) -> str:
+        """Cache tag that changes when `window` rolls over."""
+        raise NotImplementedError
+
+    def get_catalog_version(self, kind: str) -> int:
+        """Counter bumped by every change to the song or user listing (jobs.purge.SONGS / USERS)."""
+        raise NotImplementedError
+
+    def write_behind_lag(self) -> dict:
+        return {"enabled": False}
+
+    # Purges (delete_all)
+    def start_purge(self, kind: str) -> tuple[str, bool]:
+        """(job_id, started) for jobs.purge.SONGS or USERS; a running purge's id if one is running."""
+        raise NotImplementedError
+
+    def get_purge(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+def create_storage(name: str = STORAGE_BACKEND) -> StorageBackend:
+    # Only the selected backend's module is imported
+    if name == MEMORY:
+        from storage.memory_backend import MemoryBackend
+        return MemoryBackend()
+    if name == REDIS:
+        from storage.redis_backend import RedisBackend
+        return RedisBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name!r}")
+
+_shared_storage = None
+_shared_lock = threading.Lock()
+
+def shared_storage() -> StorageBackend:
+    # The memory engine only works if every controller in the process shares it
+    global _shared_storage
+    with _shared_lock:
+        if _shared_storage is None:
+            _shared_storage = create_storage()
+        return _shared_storage
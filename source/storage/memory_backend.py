@@ -0,0 +1,267 @@
+# storage/memory_backend.py
+import itertools
+import threading
+import time
+import uuid
+from leaderboard import Leaderboard, format_top_songs, rank_songs
+from models.song import Song
+from models.user import Role, User
+from jobs.purge import SONGS, USERS
+from storage.backend import StorageBackend
+from storage.skiplist import RankedSkipList
+
+LEADERBOARD_TAG = "memory:leaderboard"
+
+class MemoryBackend(StorageBackend):
+    """
+    StorageBackend held in this process: dicts for users, songs and votes,
+    and RankedSkipLists for the leaderboard and the scan indexes. Votes,
+    ranks and score lookups are O(log n), top-k and around-k O(log n + k).
+    One lock serializes every call the way Redis runs one command at a time,
+    so each method is atomic. Data lives as long as the process: it serves
+    tests, benchmarks and single-process deployments (prefork workers would
+    each get their own copy). No time windows, shards or write-behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}  # user_id -> (username, role)
+        self._songs = {}  # song_id -> (title, artist)
+        self._votes = {}  # user_id -> set of song_ids
+        self._leaderboard = RankedSkipList()
+        # Scan indexes scored by insertion sequence: a cursor is the last
+        # sequence returned, so pages stay stable while members come and go
+        self._user_index = {role: RankedSkipList() for role in Role}
+        self._song_index = RankedSkipList()
+        self._sequence = itertools.count(1)
+        # Versions start from the clock: they end up in client ETags, and a
+        # restarted process must not hand out a tag for different data
+        start = time.time_ns() // 1000
+        self._version = start
+        self._catalog_versions = {SONGS: start, USERS: start}
+        self._jobs = {}
+
+    # Users
+    def add_users(self, users: list[User]):
+        with self._lock:
+            for user in users:
+                self._users[user.user_id] = (user.username, user.role)
+                self._user_index[user.role].add(user.user_id, next(self._sequence))
+            self._catalog_versions[USERS] += 1
+
+    def get_user(self, user_id: str) -> User | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        return User(user_id=user_id, username=entry[0], role=entry[1])
+
+    def user_exists(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def update_user(self, user_id: str, username: str, role: Role) -> bool:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return False
+            if entry[1] != role:
+                self._user_index[entry[1]].remove(user_id)
+                self._user_index[role].add(user_id, next(self._sequence))
+            self._users[user_id] = (username, role)
+            self._catalog_versions[USERS] += 1
+            return True
+
+    def delete_user(self, user_id: str) -> bool:
+        with self._lock:
+            entry = self._users.pop(user_id, None)
+            if entry is None:
+                return False
+            # Like the Redis backend, the user's votes and the scores they added stay
+            self._user_index[entry[1]].remove(user_id)
+            self._catalog_versions[USERS] += 1
+            return True
+
+    def scan_users(self, role: Role, cursor: int, count: int) -> tuple[int, list[User]]:
+        with self._lock:
+            cursor, user_ids = _scan(self._user_index[role], cursor, count)
+            return cursor, [User(user_id=user_id, username=self._users[user_id][0], role=role)
+                            for user_id in user_ids]
+
+    # Songs
+    def add_songs(self, songs: list[dict]):
+        with self._lock:
+            for song in songs:
+                self._songs[song["song_id"]] = (song["title"], song["artist"])
+                self._song_index.add(song["song_id"], next(self._sequence))
+            self._catalog_versions[SONGS] += 1
+
+    def get_songs_metadata(self, song_ids: list) -> dict:
+        with self._lock:
+            return {song_id: self._metadata(song_id) for song_id in song_ids}
+
+    def _metadata(self, song_id: str) -> dict | None:
+        entry = self._songs.get(song_id)
+        return {"title": entry[0], "artist": entry[1]} if entry else None
+
+    def update_song(self, song_id: str, title: str, artist: str) -> bool:
+        with self._lock:
+            if song_id not in self._songs:
+                return False
+            self._songs[song_id] = (title, artist)
+            self._version += 1  # cached top-N results embed metadata
+            self._catalog_versions[SONGS] += 1
+            return True
+
+    def delete_song(self, song_id: str) -> bool:
+        with self._lock:
+            if self._songs.pop(song_id, None) is None:
+                return False
+            self._song_index.remove(song_id)
+            self._leaderboard.remove(song_id)
+            self._version += 1
+            self._catalog_versions[SONGS] += 1
+            return True
+
+    def scan_songs(self, cursor: int, count: int) -> tuple[int, list]:
+        with self._lock:
+            cursor, song_ids = _scan(self._song_index, cursor, count)
+            return cursor, [Song(song_id=song_id, title=self._songs[song_id][0], artist=self._songs[song_id][1])
+                            for song_id in song_ids]
+
+    # Leaderboard
+    def vote_song(self, user_id: str, song_id: str) -> int:
+        with self._lock:
+            return self._vote(user_id, song_id)
+
+    def unvote_song(self, user_id: str, song_id: str) -> int:
+        with self._lock:
+            return self._unvote(user_id, song_id)
+
+    def bulk_vote(self, operations: list) -> list[int]:
+        with self._lock:
+            return [self._vote(user_id, song_id) if action == "vote" else self._unvote(user_id, song_id)
+                    for action, user_id, song_id in operations]
+
+    def _vote(self, user_id: str, song_id: str) -> int:
+        # Same rules as VOTE_SCRIPT: known user, known song, one vote per song
+        if user_id not in self._users:
+            return Leaderboard.VOTE_UNKNOWN_USER
+        if song_id not in self._songs:
+            return Leaderboard.VOTE_UNKNOWN_SONG
+        votes = self._votes.setdefault(user_id, set())
+        if song_id in votes:
+            return Leaderboard.VOTE_DUPLICATE
+        votes.add(song_id)
+        self._leaderboard.incr(song_id, 1.0)
+        self._version += 1
+        return Leaderboard.VOTE_OK
+
+    def _unvote(self, user_id: str, song_id: str) -> int:
+        votes = self._votes.get(user_id)
+        if not votes or song_id not in votes or song_id not in self._songs:
+            return Leaderboard.UNVOTE_NOT_VOTED
+        votes.discard(song_id)
+        if self._leaderboard.incr(song_id, -1.0) <= 0:
+            self._leaderboard.remove(song_id)
+        self._version += 1
+        return Leaderboard.UNVOTE_OK
+
+    def get_user_votes(self, user_id: str) -> list:
+        with self._lock:
+            if user_id not in self._users:
+                return []
+            return [song_id for song_id in self._votes.get(user_id, ()) if song_id in self._songs]
+
+    def get_top_songs(self, top_n: int = 10, window: str = None) -> list:
+        with self._lock:
+            top_songs = self._leaderboard.rev_range(0, top_n)
+            return format_top_songs(top_songs, {song_id: self._metadata(song_id) for song_id, _ in top_songs})
+
+    def get_song_rank(self, song_id: str, window: str = None) -> int | None:
+        with self._lock:
+            rank = self._leaderboard.rev_rank(song_id)
+        return rank + 1 if rank is not None else None
+
+    def get_song_ranks(self, song_ids: list, window: str = None) -> list:
+        with self._lock:
+            entries = []
+            for song_id in song_ids:
+                rank = self._leaderboard.rev_rank(song_id)
+                if rank is None:
+                    entries.append({"song_id": song_id, "rank": None, "score": 0})
+                else:
+                    entries.append({"song_id": song_id, "rank": rank + 1, "score": self._leaderboard.score(song_id)})
+            return entries
+
+    def get_songs_around(self, song_id: str, k: int) -> tuple[int, list] | None:
+        with self._lock:
+            rank = self._leaderboard.rev_rank(song_id)
+            if rank is None:
+                return None
+            first = max(0, rank - k)
+            members = self._leaderboard.rev_range(first, rank - first + k + 1)
+            metadata = {member: self._metadata(member) for member, _ in members}
+        return rank + 1, rank_songs(first + 1, members, metadata)
+
+    def get_song_score(self, song_id: str) -> int:
+        score = self._leaderboard.score(song_id)
+        return int(score) if score is not None else 0
+
+    def get_version(self) -> int:
+        return self._version
+
+    def window_key(self, window: str = None) -> str:
+        return LEADERBOARD_TAG
+
+    def get_catalog_version(self, kind: str) -> int:
+        return self._catalog_versions[kind]
+
+    # Purges run inline: everything is already in memory
+    def start_purge(self, kind: str) -> tuple[str, bool]:
+        job_id = str(uuid.uuid4())
+        started_at = time.time()
+        with self._lock:
+            processed = self._purge_songs() if kind == SONGS else self._purge_users()
+            self._catalog_versions[kind] += 1
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "done",
+                "processed": processed,
+                "total": processed,
+                "started_at": started_at,
+                "finished_at": time.time(),
+            }
+        return job_id, True
+
+    def get_purge(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _purge_songs(self) -> int:
+        processed = len(self._songs)
+        for song_id in self._songs:
+            self._leaderboard.remove(song_id)
+        self._songs.clear()
+        self._song_index = RankedSkipList()
+        self._version += 1
+        return processed
+
+    def _purge_users(self) -> int:
+        # Admins are never touched
+        index = self._user_index[Role.USER]
+        user_ids = [user_id for user_id, _ in index.range(0, len(index))]
+        for user_id in user_ids:
+            self._users.pop(user_id, None)
+            self._votes.pop(user_id, None)
+        self._user_index[Role.USER] = RankedSkipList()
+        return len(user_ids)
+
+def _scan(index: RankedSkipList, cursor: int, count: int) -> tuple[int, list]:
+    """(next cursor, members) after `cursor`; 0 when nothing is left."""
+    page = index.range_after(cursor, count + 1)
+    if len(page) <= count:
+        return 0, [member for member, _ in page]
+    page = page[:count]
+    return int(page[-1][1]), [member for member, _ in page]
@@ -0,0 +1,337 @@
+# storage/redis_backend.py
+from leaderboard import Leaderboard
+from models.song import Song
+from models.user import Role, User
+from jobs.purge import shared_purge_jobs, SONGS, USERS
+from cache.metadata_cache import publish_invalidation, INVALIDATE_ALL
+from cache.catalog_version import catalog_version_key, get_catalog_version
+from storage.backend import StorageBackend
+from redis_client.redis_client import raw_client
+from config.config import LIST_PAGE_SIZE, BULK_CREATE_BATCH_SIZE
+
+# Updates the user hash and moves the user between role index sets atomically.
+# KEYS: user hash, users catalogue version, users:role:<ROLE> for every role
+# ARGV: username, role, new role key, user_id
+UPDATE_USER_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'username', ARGV[1], 'role', ARGV[2])
+redis.call('INCR', KEYS[2])
+for i = 3, #KEYS do
+    if KEYS[i] == ARGV[3] then
+        redis.call('SADD', KEYS[i], ARGV[4])
+    else
+        redis.call('SREM', KEYS[i], ARGV[4])
+    end
+end
+return 1
+"""
+
+# Dense per-user integers, the bit offsets in the song voters bitmaps.
+# Handed out by INCRBY; a full user purge reclaims them (see jobs/purge.py).
+USER_ORDINAL_KEY = "users:ordinal"
+# Per-song integers, the members of the user votes sets. Never reused, so a
+# deleted song's ordinal left in a votes set maps to nothing.
+SONG_ORDINAL_KEY = "songs:ordinal"
+# Per-user vote sets from before the voters bitmaps, see migrate_vote_bitmaps
+LEGACY_VOTES_KEY_PATTERN = "user:{user_id}:voted_songs"
+
+def role_key(role: Role) -> str:
+    return f"users:role:{role.value}"
+
+def update_user_keys(user_id: str) -> list:
+    return [f"user:{user_id}", catalog_version_key(USERS)] + [role_key(r) for r in Role]
+
+# Pipeline builders shared with the redis.asyncio controllers.
+# `last_ordinal` is the INCRBY USER_ORDINAL_KEY reply for len(users).
+def queue_add_users(pipe, users: list[User], last_ordinal: int):
+    by_role = {}
+    for ordinal, user in enumerate(users, start=last_ordinal - len(users) + 1):
+        pipe.hset(f"user:{user.user_id}", mapping={
+            "username": user.username,
+            "role": user.role.value,
+            "ordinal": ordinal,
+        })
+        by_role.setdefault(user.role, []).append(user.user_id)
+    pipe.sadd("users:set", *(user.user_id for user in users))
+    for role, user_ids in by_role.items():
+        pipe.sadd(role_key(role), *user_ids)
+    pipe.incr(catalog_version_key(USERS))
+
+# `last_ordinal` is the INCRBY SONG_ORDINAL_KEY reply for len(songs).
+def queue_add_songs(pipe, songs: list[dict], last_ordinal: int):
+    ordinals = {}
+    for ordinal, song in enumerate(songs, start=last_ordinal - len(songs) + 1):
+        pipe.hset(f"song:{song['song_id']}:metadata", mapping={
+            "title": song["title"],
+            "artist": song["artist"],
+            "ordinal": ordinal,
+        })
+        ordinals[ordinal] = song["song_id"]
+    pipe.hset(Leaderboard.SONG_ORDINALS_KEY, mapping=ordinals)
+    pipe.sadd("songs:set", *(song["song_id"] for song in songs))
+    pipe.incr(catalog_version_key(SONGS))
+
+def set_bits(bitmap: bytes):
+    """Offsets of the bits set in a Redis bitmap; offset 0 is the high bit of the first byte."""
+    for index, byte in enumerate(bitmap):
+        if byte:
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    yield index * 8 + bit
+
+def scan_batches(client, key: str, count: int):
+    """SSCAN pages of `key`, empty pages skipped."""
+    cursor = 0
+    while True:
+        cursor, members = client.sscan(key, cursor=cursor, count=count)
+        if members:
+            yield members
+        if cursor == 0:
+            break
+
+class RedisBackend(Leaderboard, StorageBackend):
+    """
+    StorageBackend on Redis. The leaderboard half is Leaderboard itself;
+    users and songs are hashes indexed by users:set, users:role:<ROLE> and
+    songs:set, with writes batched BULK_CREATE_BATCH_SIZE per MULTI/EXEC.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.redis.delete("leaderboard")
+        self._update_user_script = self.redis.register_script(UPDATE_USER_SCRIPT)
+
+    # Users
+    def add_users(self, users: list[User]):
+        for start in range(0, len(users), BULK_CREATE_BATCH_SIZE):
+            batch = users[start:start + BULK_CREATE_BATCH_SIZE]
+            last_ordinal = self.redis.incrby(USER_ORDINAL_KEY, len(batch))
+            pipe = self.redis.pipeline()
+            queue_add_users(pipe, batch, last_ordinal)
+            pipe.execute()
+
+    def get_user(self, user_id: str) -> User | None:
+        data = self.redis.hgetall(f"user:{user_id}")
+        if not data:
+            return None
+        return User(user_id=user_id, username=data.get("username"), role=Role(data.get("role")))
+
+    def user_exists(self, user_id: str) -> bool:
+        return self.redis.exists(f"user:{user_id}") == 1
+
+    def update_user(self, user_id: str, username: str, role: Role) -> bool:
+        args = [username, role.value, role_key(role), user_id]
+        return bool(self._update_user_script(keys=update_user_keys(user_id), args=args))
+
+    def delete_user(self, user_id: str) -> bool:
+        key = f"user:{user_id}"
+        if not self.redis.exists(key):
+            return False
+
+        pipe = self.redis.pipeline()
+        pipe.delete(key, self.USER_VOTES_KEY_PATTERN.format(user_id=user_id))
+        pipe.srem("users:set", user_id)
+        for role in Role:
+            pipe.srem(role_key(role), user_id)
+        pipe.incr(catalog_version_key(USERS))
+        pipe.execute()
+        return True
+
+    def scan_users(self, role: Role, cursor: int, count: int) -> tuple[int, list[User]]:
+        """SSCAN of the role index with the user hashes fetched in a single pipeline."""
+        reader = self._reader()
+        cursor, user_ids = reader.sscan(role_key(role), cursor=cursor, count=count)
+        pipe = reader.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hgetall(f"user:{user_id}")
+
+        users = []
+        for user_id, data in zip(user_ids, pipe.execute()):
+            if data:
+                users.append(User(user_id=user_id,
+                                username=data.get("username", ""),
+                                role=Role(data.get("role"))))
+        return int(cursor), users
+
+    def migrate_role_indexes(self, count: int = LIST_PAGE_SIZE) -> dict:
+        """
+        One-time backfill of users:role:* from the user hashes in users:set.
+        Idempotent, so it is safe to rerun or to run while the app is serving.
+        """
+        indexed = {role: 0 for role in Role}
+        skipped = 0
+        for user_ids in scan_batches(self.redis, "users:set", count):
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hget(f"user:{user_id}", "role")
+            roles = pipe.execute()
+
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id, role_str in zip(user_ids, roles):
+                try:
+                    role = Role(role_str)
+                except ValueError:
+                    skipped += 1
+                    continue
+                pipe.sadd(role_key(role), user_id)
+                indexed[role] += 1
+            pipe.execute()
+        self.redis.incr(catalog_version_key(USERS))
+        return {"indexed": {role.value: n for role, n in indexed.items()}, "skipped": skipped}
+
+    def migrate_vote_bitmaps(self, count: int = LIST_PAGE_SIZE) -> dict:
+        """
+        One-time move from the per-user voted_songs sets to the song voters
+        bitmaps: users without an ordinal get one, each vote becomes a bit and
+        the set is dropped. Songs without an ordinal get one too, then every
+        bitmap is read back into the user votes sets. Idempotent, but run it
+        with the app stopped: votes landing mid-move could be lost. Holds one
+        ordinal -> user_id entry per user in memory.
+        """
+        assigned = moved = 0
+        voters = {}  # user ordinal -> user_id
+        for user_ids in scan_batches(self.redis, "users:set", count):
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hmget(f"user:{user_id}", "ordinal", "role")
+            ordinals = {}
+            missing = []
+            for user_id, (ordinal, role) in zip(user_ids, pipe.execute()):
+                if ordinal is not None:
+                    ordinals[user_id] = int(ordinal)
+                elif role is not None:  # no hash, nothing to migrate
+                    missing.append(user_id)
+            if missing:
+                last_ordinal = self.redis.incrby(USER_ORDINAL_KEY, len(missing))
+                pipe = self.redis.pipeline(transaction=False)
+                for ordinal, user_id in enumerate(missing, start=last_ordinal - len(missing) + 1):
+                    pipe.hset(f"user:{user_id}", "ordinal", ordinal)
+                    ordinals[user_id] = ordinal
+                pipe.execute()
+                assigned += len(missing)
+            voters.update((ordinal, user_id) for user_id, ordinal in ordinals.items())
+
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in ordinals:
+                pipe.smembers(LEGACY_VOTES_KEY_PATTERN.format(user_id=user_id))
+            vote_sets = pipe.execute()
+            pipe = self.redis.pipeline()
+            for (user_id, ordinal), song_ids in zip(ordinals.items(), vote_sets):
+                if not song_ids:
+                    continue
+                for song_id in song_ids:
+                    pipe.setbit(self.SONG_VOTERS_KEY_PATTERN.format(song_id=song_id), ordinal, 1)
+                pipe.unlink(LEGACY_VOTES_KEY_PATTERN.format(user_id=user_id))
+                moved += len(song_ids)
+            pipe.execute()
+        songs, indexed = self._index_votes(voters, count)
+        return {"assigned": assigned, "votes": moved, "songs": songs, "indexed": indexed}
+
+    def _index_votes(self, voters: dict, count: int) -> tuple[int, int]:
+        """Give songs without one an ordinal and add each voters bit to its user's votes set."""
+        raw = raw_client()
+        assigned = indexed = 0
+        for song_ids in scan_batches(self.redis, "songs:set", count):
+            pipe = self.redis.pipeline(transaction=False)
+            for song_id in song_ids:
+                pipe.hmget(self.SONG_METADATA_KEY_PATTERN.format(song_id=song_id), "title", "ordinal")
+            ordinals = {}
+            missing = []
+            for song_id, (title, ordinal) in zip(song_ids, pipe.execute()):
+                if ordinal is not None:
+                    ordinals[song_id] = int(ordinal)
+                elif title is not None:
+                    missing.append(song_id)
+            pipe = self.redis.pipeline()
+            if missing:
+                last_ordinal = self.redis.incrby(SONG_ORDINAL_KEY, len(missing))
+                for ordinal, song_id in enumerate(missing, start=last_ordinal - len(missing) + 1):
+                    pipe.hset(self.SONG_METADATA_KEY_PATTERN.format(song_id=song_id), "ordinal", ordinal)
+                    ordinals[song_id] = ordinal
+                assigned += len(missing)
+            if ordinals:
+                pipe.hset(self.SONG_ORDINALS_KEY, mapping={ordinal: song_id for song_id, ordinal in ordinals.items()})
+            pipe.execute()
+
+            pipe = raw.pipeline(transaction=False)
+            for song_id in ordinals:
+                pipe.get(self.SONG_VOTERS_KEY_PATTERN.format(song_id=song_id))
+            bitmaps = pipe.execute()
+            pipe = self.redis.pipeline(transaction=False)
+            for song_ordinal, bitmap in zip(ordinals.values(), bitmaps):
+                for ordinal in set_bits(bitmap or b""):
+                    if ordinal in voters:
+                        pipe.sadd(self.USER_VOTES_KEY_PATTERN.format(user_id=voters[ordinal]), song_ordinal)
+                        indexed += 1
+            pipe.execute()
+        return assigned, indexed
+
+    # Songs
+    def add_songs(self, songs: list[dict]):
+        for start in range(0, len(songs), BULK_CREATE_BATCH_SIZE):
+            batch = songs[start:start + BULK_CREATE_BATCH_SIZE]
+            last_ordinal = self.redis.incrby(SONG_ORDINAL_KEY, len(batch))
+            pipe = self.redis.pipeline()
+            queue_add_songs(pipe, batch, last_ordinal)
+            pipe.execute()
+
+    def update_song(self, song_id: str, title: str, artist: str) -> bool:
+        key = f"song:{song_id}:metadata"
+        if not self.redis.exists(key):
+            return False
+
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={"title": title, "artist": artist})
+        pipe.incr(self.VERSION_KEY)  # cached top-N results embed metadata
+        pipe.incr(catalog_version_key(SONGS))
+        pipe.execute()
+        self._invalidate_metadata(song_id)
+        return True
+
+    def delete_song(self, song_id: str) -> bool:
+        key = f"song:{song_id}:metadata"
+        title, ordinal = self.redis.hmget(key, "title", "ordinal")
+        if title is None:
+            return False
+
+        pipe = self.redis.pipeline()
+        pipe.unlink(key, f"song:{song_id}")
+        if ordinal is not None:  # not yet migrated otherwise
+            pipe.hdel(self.SONG_ORDINALS_KEY, ordinal)
+        pipe.srem("songs:set", song_id)
+        pipe.incr(catalog_version_key(SONGS))
+        pipe.execute()
+        # Drops it from its shard and the time buckets, and bumps the version
+        self.remove_songs([song_id])
+        self._invalidate_metadata(song_id)
+        return True
+
+    def scan_songs(self, cursor: int, count: int) -> tuple[int, list]:
+        """SSCAN of songs:set with metadata fetched in a single pipeline (or from the metadata cache)."""
+        cursor, song_ids = self._reader().sscan("songs:set", cursor=cursor, count=count)
+        metadata = self.get_songs_metadata(song_ids)
+        songs = []
+        for sid in song_ids:
+            data = metadata.get(sid)
+            if data:
+                songs.append(Song(song_id=sid, title=data.get("title"), artist=data.get("artist")))
+        return int(cursor), songs
+
+    def get_catalog_version(self, kind: str) -> int:
+        return get_catalog_version(self._reader(), kind)
+
+    def _invalidate_metadata(self, song_id: str = INVALIDATE_ALL):
+        # Call after the write: drop our own copy right away, other workers
+        # hear about it on the channel
+        publish_invalidation(self.redis, song_id)
+        if self.metadata_cache:
+            self.metadata_cache.invalidate(song_id)
+
+    # Purges
+    def start_purge(self, kind: str) -> tuple[str, bool]:
+        return shared_purge_jobs().start(kind)
+
+    def get_purge(self, job_id: str) -> dict | None:
+        return shared_purge_jobs().get(job_id)
@@ -0,0 +1,197 @@
+# storage/skiplist.py
+import random
+
+MAX_LEVEL = 32
+P = 0.25  # same level distribution as Redis' zskiplist
+
+class _Node:
+    __slots__ = ("member", "score", "forward", "span", "backward")
+
+    def __init__(self, level: int, member, score: float):
+        self.member = member
+        self.score = score
+        self.forward = [None] * level
+        self.span = [0] * level  # nodes skipped by forward[i], itself included
+        self.backward = None
+
+def _before(node: _Node, score: float, member) -> bool:
+    """True when `node` sorts before (score, member)."""
+    return node.score < score or (node.score == score and node.member < member)
+
+class RankedSkipList:
+    """
+    Members ordered by (score, member) ascending, the order of a Redis sorted
+    set. An indexed skip list: every link carries the number of nodes it
+    skips, so insert, remove, rank and lookup by rank are O(log n), and a
+    range of k members from any rank is O(log n + k). Scores are also kept
+    in a dict for O(1) lookups. Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self):
+        self._head = _Node(MAX_LEVEL, None, 0.0)
+        self._tail = None
+        self._level = 1
+        self._length = 0
+        self._scores = {}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, member) -> bool:
+        return member in self._scores
+
+    def score(self, member) -> float | None:
+        return self._scores.get(member)
+
+    def add(self, member, score: float):
+        """Insert `member`, or move it to `score`."""
+        old = self._scores.get(member)
+        if old is None:
+            self._insert(member, score)
+        elif old != score:
+            self._move(member, old, score)
+        self._scores[member] = score
+
+    def incr(self, member, delta: float) -> float:
+        score = self._scores.get(member, 0.0) + delta
+        self.add(member, score)
+        return score
+
+    def remove(self, member) -> bool:
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        update, _ = self._find(score, member)
+        self._unlink(update[0].forward[0], update)
+        return True
+
+    def rank(self, member) -> int | None:
+        """0-based position in ascending order, None if absent."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        rank, x = 0, self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] is not None and _before(x.forward[i], score, member):
+                rank += x.span[i]
+                x = x.forward[i]
+        return rank
+
+    def rev_rank(self, member) -> int | None:
+        """0-based position in descending order (ZREVRANK)."""
+        rank = self.rank(member)
+        return None if rank is None else self._length - 1 - rank
+
+    def range(self, start: int, count: int) -> list:
+        """Up to `count` (member, score) pairs from ascending position `start`."""
+        x = self._node_at(start)
+        items = []
+        while x is not None and len(items) < count:
+            items.append((x.member, x.score))
+            x = x.forward[0]
+        return items
+
+    def rev_range(self, start: int, count: int) -> list:
+        """Up to `count` (member, score) pairs from descending position `start` (ZREVRANGE)."""
+        # Top N walks back from the tail without a search
+        x = self._tail if start == 0 else self._node_at(self._length - 1 - start)
+        items = []
+        while x is not None and len(items) < count:
+            items.append((x.member, x.score))
+            x = x.backward
+        return items
+
+    def range_after(self, score: float, count: int) -> list:
+        """Up to `count` (member, score) pairs with a score above `score`, ascending."""
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] is not None and x.forward[i].score <= score:
+                x = x.forward[i]
+        x = x.forward[0]
+        items = []
+        while x is not None and len(items) < count:
+            items.append((x.member, x.score))
+            x = x.forward[0]
+        return items
+
+    def _node_at(self, index: int) -> _Node | None:
+        if index < 0 or index >= self._length:
+            return None
+        target, traversed, x = index + 1, 0, self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] is not None and traversed + x.span[i] <= target:
+                traversed += x.span[i]
+                x = x.forward[i]
+            if traversed == target:
+                return x
+        return None
+
+    def _find(self, score: float, member) -> tuple[list, list]:
+        """Per level, the last node before (score, member) and its 1-based position."""
+        update = [self._head] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while x.forward[i] is not None and _before(x.forward[i], score, member):
+                rank[i] += x.span[i]
+                x = x.forward[i]
+            update[i] = x
+        return update, rank
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < MAX_LEVEL and random.random() < P:
+            level += 1
+        return level
+
+    def _insert(self, member, score: float):
+        update, rank = self._find(score, member)
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+        x = _Node(level, member, score)
+        for i in range(level):
+            x.forward[i] = update[i].forward[i]
+            update[i].forward[i] = x
+            x.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        x.backward = None if update[0] is self._head else update[0]
+        if x.forward[0] is not None:
+            x.forward[0].backward = x
+        else:
+            self._tail = x
+        self._length += 1
+
+    def _unlink(self, x: _Node, update: list):
+        for i in range(self._level):
+            if update[i].forward[i] is x:
+                update[i].span[i] += x.span[i] - 1
+                update[i].forward[i] = x.forward[i]
+            else:
+                update[i].span[i] -= 1
+        if x.forward[0] is not None:
+            x.forward[0].backward = x.backward
+        else:
+            self._tail = x.backward
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+
+    def _move(self, member, old: float, score: float):
+        update, _ = self._find(old, member)
+        x = update[0].forward[0]
+        # Most votes don't change the order: update the score in place
+        if (x.backward is None or _before(x.backward, score, member)) and (
+            x.forward[0] is None or not _before(x.forward[0], score, member)
+        ):
+            x.score = score
+            return
+        self._unlink(x, update)
+        self._insert(member, score)
@@ -0,0 +1,389 @@
+# storage/snapshot.py
+import array
+import mmap
+import os
+import struct
+import sys
+import time
+from models.user import Role
+from cache.metadata_cache import publish_invalidation
+from cache.catalog_version import catalog_version_key
+from jobs import purge
+from redis_client.redis_client import raw_client
+from storage.redis_backend import USER_ORDINAL_KEY, SONG_ORDINAL_KEY, role_key, scan_batches
+from config.config import SNAPSHOT_BATCH_SIZE, SNAPSHOT_BLOCK_MAX_BYTES
+
+# File layout, little-endian. Every section is 8-byte aligned, so numeric
+# columns can be cast straight out of a memory map:
+#   header   magic, format version, leaderboard version, user and song ordinal counters, created_at
+#   blocks   kind, row count, body length, then each column prefixed by its length
+#   index    (kind, row count, offset) per block
+#   trailer  index offset, magic
+MAGIC = b"LBSNAP\x00\x01"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sQqqqd")
+BLOCK_HEADER = struct.Struct("<BxxxIQ")
+INDEX_ENTRY = struct.Struct("<BxxxIQ")
+TRAILER = struct.Struct("<Q8s")
+COLUMN_LENGTH = struct.Struct("<Q")
+
+# Variable-length columns are a uint64 offsets array (rows + 1 entries)
+# followed by the concatenated values
+STR, BYTES, F64, I64 = "str", "bytes", "f64", "i64"
+NUMERIC_TYPECODES = {F64: "d", I64: "q"}
+
+SCORES, SONGS, USERS, VOTERS, VOTES = 1, 2, 3, 4, 5
+SCHEMAS = {
+    SCORES: (STR, F64),  # song_id, score
+    SONGS: (STR, STR, STR, I64),  # song_id, title, artist, ordinal (0 = none)
+    USERS: (STR, STR, STR, I64),  # user_id, username, role, ordinal (0 = none)
+    VOTERS: (STR, BYTES),  # song_id, voters bitmap
+    VOTES: (STR, BYTES),  # user_id, song ordinals voted for as little-endian int64s
+}
+KIND_NAMES = {SCORES: "scores", SONGS: "songs", USERS: "users", VOTERS: "voters", VOTES: "votes"}
+# Blocks of these kinds are also cut by size
+BLOB_KINDS = (VOTERS, VOTES)
+
+BITMAP_FETCH_SIZE = 100  # voter bitmaps per GET pipeline on export
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+def _pad(length: int) -> bytes:
+    return b"\x00" * (-length % 8)
+
+def pack_ordinals(ordinals) -> bytes:
+    data = array.array("q", ordinals)
+    if not LITTLE_ENDIAN:
+        data.byteswap()
+    return data.tobytes()
+
+def unpack_ordinals(blob: bytes) -> list:
+    data = array.array("q", blob)
+    if not LITTLE_ENDIAN:
+        data.byteswap()
+    return data.tolist()
+
+def _encode_column(column_type: str, values: list) -> bytes:
+    if column_type in NUMERIC_TYPECODES:
+        data = array.array(NUMERIC_TYPECODES[column_type], values)
+        if not LITTLE_ENDIAN:
+            data.byteswap()
+        return data.tobytes()
+    blobs = [value.encode() for value in values] if column_type == STR else values
+    offsets = array.array("Q", [0])
+    total = 0
+    for blob in blobs:
+        total += len(blob)
+        offsets.append(total)
+    if not LITTLE_ENDIAN:
+        offsets.byteswap()
+    return offsets.tobytes() + b"".join(blobs)
+
+class SnapshotWriter:
+    """Appends blocks to a snapshot file; only the blocks being filled are held in memory."""
+
+    def __init__(self, path: str, version: int, user_ordinal: int, song_ordinal: int):
+        self.path = path
+        self.counts = dict.fromkeys(KIND_NAMES.values(), 0)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, version, user_ordinal, song_ordinal, time.time()))
+        self._index = []
+        self._pending = {}  # kind -> ([values per column], byte size)
+
+    def add(self, kind: int, *row):
+        columns, size = self._pending.get(kind) or ([[] for _ in SCHEMAS[kind]], 0)
+        for column, value in zip(columns, row):
+            column.append(value)
+        if kind in BLOB_KINDS:
+            size += len(row[1])
+        self._pending[kind] = (columns, size)
+        if len(columns[0]) >= SNAPSHOT_BATCH_SIZE or size >= SNAPSHOT_BLOCK_MAX_BYTES:
+            self.flush(kind)
+
+    def flush(self, kind: int):
+        pending = self._pending.pop(kind, None)
+        if not pending:
+            return
+        columns, _ = pending
+        body = bytearray()
+        for column_type, values in zip(SCHEMAS[kind], columns):
+            data = _encode_column(column_type, values)
+            body += COLUMN_LENGTH.pack(len(data)) + data + _pad(len(data))
+        rows = len(columns[0])
+        self._index.append((kind, rows, self._file.tell()))
+        self._file.write(BLOCK_HEADER.pack(kind, rows, len(body)))
+        self._file.write(body)
+        self.counts[KIND_NAMES[kind]] += rows
+
+    def close(self):
+        for kind in list(self._pending):
+            self.flush(kind)
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(TRAILER.pack(index_offset, MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Never leave a truncated file that looks like a snapshot
+            self._file.close()
+            os.remove(self.path)
+
+class VarColumn:
+    """Strings or bytes read in place: values are sliced out of the map on access."""
+
+    def __init__(self, offsets, data: memoryview, decode: bool):
+        self._offsets = offsets
+        self._data = data
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int):
+        value = self._data[self._offsets[i]:self._offsets[i + 1]]
+        return str(value, "utf-8") if self._decode else bytes(value)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class SnapshotReader:
+    """
+    Memory-mapped snapshot. Blocks are decoded lazily: numeric columns are
+    views over the map and strings are read on access, so scanning a file
+    of any size takes constant memory. Use as a context manager.
+    A block's columns are released when the next block is read and on close.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._views = []  # handed out for the current block
+        if len(self._map) < HEADER.size + TRAILER.size:
+            self.close()
+            raise ValueError(f"{path} is not a complete leaderboard snapshot")
+        magic, format_version = struct.unpack_from("<8sQ", self._map, 0)
+        index_offset, trailer_magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        if magic != MAGIC or trailer_magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a complete leaderboard snapshot")
+        if format_version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} has snapshot format {format_version}, this version reads {FORMAT_VERSION}")
+        _, _, self.version, self.user_ordinal, self.song_ordinal, self.created_at = HEADER.unpack_from(self._map, 0)
+        entries = (len(self._map) - TRAILER.size - index_offset) // INDEX_ENTRY.size
+        self.index = [INDEX_ENTRY.unpack_from(self._map, index_offset + i * INDEX_ENTRY.size) for i in range(entries)]
+
+    def counts(self) -> dict:
+        counts = dict.fromkeys(KIND_NAMES.values(), 0)
+        for kind, rows, _ in self.index:
+            counts[KIND_NAMES[kind]] += rows
+        return counts
+
+    def blocks(self, *kinds):
+        """
+        Yield (kind, columns) per block, in file order, optionally only the
+        given kinds. Columns follow SCHEMAS.
+        """
+        for kind, rows, offset in self.index:
+            if kinds and kind not in kinds:
+                continue
+            self._release_views()
+            columns = []
+            position = offset + BLOCK_HEADER.size
+            for column_type in SCHEMAS[kind]:
+                (length,) = COLUMN_LENGTH.unpack_from(self._map, position)
+                start = position + COLUMN_LENGTH.size
+                if column_type in NUMERIC_TYPECODES:
+                    columns.append(self._numeric(start, length, NUMERIC_TYPECODES[column_type]))
+                else:
+                    offsets_length = (rows + 1) * 8
+                    offsets = self._numeric(start, offsets_length, "Q")
+                    data = self._slice(start + offsets_length, length - offsets_length)
+                    columns.append(VarColumn(offsets, data, decode=column_type == STR))
+                position = start + length + len(_pad(length))
+            yield kind, columns
+
+    def rows(self, kind: int):
+        """Yield every row of `kind` as a tuple."""
+        for _, columns in self.blocks(kind):
+            yield from zip(*columns)
+
+    def _slice(self, start: int, length: int) -> memoryview:
+        view = self._view[start:start + length]
+        self._views.append(view)
+        return view
+
+    def _numeric(self, start: int, length: int, typecode: str):
+        view = self._slice(start, length)
+        if not LITTLE_ENDIAN:
+            data = array.array(typecode, view.tobytes())
+            data.byteswap()
+            return data
+        view = view.cast(typecode)  # zero-copy
+        self._views.append(view)
+        return view
+
+    def _release_views(self):
+        # The map can only be closed once no view into it is left
+        for view in self._views:
+            view.release()
+        self._views = []
+
+    def close(self):
+        self._release_views()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def export_snapshot(backend, path: str) -> dict:
+    """
+    Stream the leaderboard scores, song metadata, users, voter bitmaps and
+    user votes sets of a RedisBackend into `path` with ZSCAN/SSCAN, a block
+    at a time. Not a
+    point-in-time copy: writes landing during the export may or may not be
+    in it, and SCAN may return a member twice (restore is idempotent). Time
+    window buckets and unflushed write-behind deltas are not included.
+    Returns the row count per kind.
+    """
+    redis = backend.redis
+    raw = raw_client()
+    version = int(redis.get(backend.VERSION_KEY) or 0)
+    user_ordinal = int(redis.get(USER_ORDINAL_KEY) or 0)
+    song_ordinal = int(redis.get(SONG_ORDINAL_KEY) or 0)
+    with SnapshotWriter(path, version, user_ordinal, song_ordinal) as writer:
+        for instance, keys in backend.shards.by_instance().items():
+            client = backend.shard_clients[instance]
+            for key in keys:
+                for song_id, score in client.zscan_iter(key, count=SNAPSHOT_BATCH_SIZE):
+                    writer.add(SCORES, song_id, score)
+
+        for song_ids in scan_batches(redis, "songs:set", SNAPSHOT_BATCH_SIZE):
+            pipe = redis.pipeline(transaction=False)
+            for song_id in song_ids:
+                pipe.hmget(f"song:{song_id}:metadata", "title", "artist", "ordinal")
+            for song_id, (title, artist, ordinal) in zip(song_ids, pipe.execute()):
+                if title is not None:
+                    writer.add(SONGS, song_id, title, artist or "", int(ordinal or 0))
+            for start in range(0, len(song_ids), BITMAP_FETCH_SIZE):
+                chunk = song_ids[start:start + BITMAP_FETCH_SIZE]
+                pipe = raw.pipeline(transaction=False)
+                for song_id in chunk:
+                    pipe.get(backend.SONG_VOTERS_KEY_PATTERN.format(song_id=song_id))
+                for song_id, bitmap in zip(chunk, pipe.execute()):
+                    if bitmap:
+                        writer.add(VOTERS, song_id, bitmap)
+
+        for user_ids in scan_batches(redis, "users:set", SNAPSHOT_BATCH_SIZE):
+            pipe = redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hmget(f"user:{user_id}", "username", "role", "ordinal")
+                pipe.smembers(backend.USER_VOTES_KEY_PATTERN.format(user_id=user_id))
+            replies = pipe.execute()
+            for user_id, (username, role, ordinal), votes in zip(user_ids, replies[::2], replies[1::2]):
+                if role is None:
+                    continue
+                writer.add(USERS, user_id, username or "", role, int(ordinal or 0))
+                if votes:
+                    writer.add(VOTES, user_id, pack_ordinals(sorted(int(ordinal) for ordinal in votes)))
+    return writer.counts
+
+def restore_snapshot(backend, path: str) -> dict:
+    """
+    Bulk-load a snapshot into a RedisBackend, one pipeline per block. Users
+    and songs keep their snapshot ordinals, the bit offsets and members of
+    the restored voters bitmaps and votes sets, so the target must not have
+    handed out any ordinal yet: raises ValueError unless it is empty. Scores
+    go to the shards the target is configured with. Returns the row count
+    per kind.
+    """
+    redis = backend.redis
+    raw = raw_client()
+    _check_empty(redis)
+    with SnapshotReader(path) as snapshot:
+        for kind, columns in snapshot.blocks():
+            if kind == SCORES:
+                _restore_scores(backend, columns)
+            elif kind == SONGS:
+                _restore_songs(backend, columns)
+            elif kind == USERS:
+                _restore_users(backend, columns)
+            elif kind == VOTERS:
+                pipe = raw.pipeline(transaction=False)
+                for song_id, bitmap in zip(*columns):
+                    pipe.set(backend.SONG_VOTERS_KEY_PATTERN.format(song_id=song_id), bitmap)
+                pipe.execute()
+            elif kind == VOTES:
+                pipe = redis.pipeline(transaction=False)
+                for user_id, blob in zip(*columns):
+                    pipe.sadd(backend.USER_VOTES_KEY_PATTERN.format(user_id=user_id), *unpack_ordinals(blob))
+                pipe.execute()
+
+        # New users and songs must not reuse a restored ordinal, and caches must see a new version
+        for key, ordinal in ((USER_ORDINAL_KEY, snapshot.user_ordinal), (SONG_ORDINAL_KEY, snapshot.song_ordinal)):
+            redis.set(key, ordinal)
+        redis.set(backend.VERSION_KEY, max(int(redis.get(backend.VERSION_KEY) or 0), snapshot.version) + 1)
+        publish_invalidation(redis)
+        return snapshot.counts()
+
+def _check_empty(redis):
+    pipe = redis.pipeline(transaction=False)
+    pipe.exists("users:set", "songs:set", USER_ORDINAL_KEY, SONG_ORDINAL_KEY)
+    if pipe.execute()[0]:
+        # A surviving admin or a user registered since would share an ordinal
+        # with a restored user, and so their votes
+        raise ValueError("Restore needs an empty database: users, songs or ordinals are already there.")
+
+def _restore_scores(backend, columns: list):
+    song_ids, scores = columns
+    by_song = dict(zip(song_ids, scores))
+    for instance, shard_groups in backend.shards.group_songs(list(by_song)).items():
+        pipe = backend.shard_clients[instance].pipeline(transaction=False)
+        for key, ids in shard_groups.items():
+            pipe.zadd(key, {song_id: by_song[song_id] for song_id in ids})
+        pipe.execute()
+
+def _restore_songs(backend, columns: list):
+    song_ids = list(columns[0])
+    ordinals = {}
+    pipe = backend.redis.pipeline(transaction=False)
+    for song_id, title, artist, ordinal in zip(song_ids, *columns[1:]):
+        fields = {"title": title, "artist": artist}
+        if ordinal:
+            fields["ordinal"] = ordinal
+            ordinals[ordinal] = song_id
+        pipe.hset(backend.SONG_METADATA_KEY_PATTERN.format(song_id=song_id), mapping=fields)
+    if ordinals:
+        pipe.hset(backend.SONG_ORDINALS_KEY, mapping=ordinals)
+    pipe.sadd("songs:set", *song_ids)
+    pipe.incr(catalog_version_key(purge.SONGS))
+    pipe.execute()
+
+def _restore_users(backend, columns: list):
+    user_ids = list(columns[0])
+    by_role = {}
+    pipe = backend.redis.pipeline(transaction=False)
+    for user_id, username, role, ordinal in zip(user_ids, *columns[1:]):
+        fields = {"username": username, "role": role}
+        if ordinal:
+            fields["ordinal"] = ordinal
+        pipe.hset(f"user:{user_id}", mapping=fields)
+        by_role.setdefault(Role(role), []).append(user_id)
+    pipe.sadd("users:set", *user_ids)
+    for role, ids in by_role.items():
+        pipe.sadd(role_key(role), *ids)
+    pipe.incr(catalog_version_key(purge.USERS))  # the listing kind, not the block kind
+    pipe.execute()
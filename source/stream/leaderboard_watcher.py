@@ -0,0 +1,177 @@
+# stream/leaderboard_watcher.py
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from itertools import count
+
+logger = logging.getLogger(__name__)
+
+def diff_top_songs(old: list, new: list) -> dict:
+    """
+    Rank/score changes between two top-N lists. `changes` holds every song
+    that is new or whose rank, score or metadata moved; `removed` lists the
+    songs that dropped out. Songs absent from both keep their rank.
+    """
+    previous = {song["song_id"]: (rank, song) for rank, song in enumerate(old, start=1)}
+    changes = []
+    for rank, song in enumerate(new, start=1):
+        if previous.get(song["song_id"]) != (rank, song):
+            changes.append({"rank": rank, **song})
+    current = {song["song_id"] for song in new}
+    removed = [song_id for song_id in previous if song_id not in current]
+    return {"changes": changes, "removed": removed}
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class LeaderboardWatcher:
+    """
+    One watcher thread per process polls the leaderboard version counter and,
+    when it moves, rebuilds the largest subscribed top-N once and pushes
+    diffs to every subscriber queue. Clients never poll Redis themselves.
+    """
+
+    def __init__(self, leaderboard, poll_interval_ms: int, queue_size: int = 64):
+        self.leaderboard = leaderboard
+        self.poll_interval = poll_interval_ms / 1000.0
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._ids = count()
+        self._subscribers = {}  # sub_id -> (top_n, queue)
+        self._lists = {}  # top_n -> last list pushed to subscribers of that size
+        self._version = None
+        self._thread = None
+
+    def subscribe(self, top_n: int):
+        """Register a subscriber; returns (sub_id, queue, snapshot event)."""
+        with self._lock:
+            if self._version is None:
+                self._version = self.leaderboard.get_version()
+            if top_n not in self._lists:
+                self._lists[top_n] = self.leaderboard.get_top_songs(top_n)
+            sub_id = next(self._ids)
+            events = queue.Queue(maxsize=self.queue_size)
+            self._subscribers[sub_id] = (top_n, events)
+            snapshot = ("snapshot", {"version": self._version, "data": self._lists[top_n]})
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="leaderboard-watcher", daemon=True)
+                self._thread.start()
+        return sub_id, events, snapshot
+
+    def unsubscribe(self, sub_id: int):
+        with self._lock:
+            top_n, _ = self._subscribers.pop(sub_id, (None, None))
+            if top_n is not None and all(n != top_n for n, _ in self._subscribers.values()):
+                self._lists.pop(top_n, None)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def poll(self):
+        version = self.leaderboard.get_version()
+        with self._lock:
+            if version == self._version or not self._subscribers:
+                self._version = version
+                return
+            largest = self.leaderboard.get_top_songs(max(n for n, _ in self._subscribers.values()))
+            self._publish(version, largest)
+
+    def _publish(self, version: int, largest: list):
+        self._version = version
+        diffs = {}
+        for top_n in {n for n, _ in self._subscribers.values()}:
+            new = largest[:top_n]
+            diff = diff_top_songs(self._lists.get(top_n, []), new)
+            self._lists[top_n] = new
+            if diff["changes"] or diff["removed"]:
+                diffs[top_n] = ("diff", {"version": version, **diff})
+
+        for top_n, events in self._subscribers.values():
+            if top_n not in diffs:
+                continue
+            try:
+                events.put_nowait(diffs[top_n])
+            except (queue.Full, asyncio.QueueFull):
+                # Slow consumer: drop its backlog and resync with a snapshot
+                self._drain(events)
+                events.put_nowait(("snapshot", {"version": version, "data": self._lists[top_n]}))
+
+    def _drain(self, events):
+        try:
+            while True:
+                events.get_nowait()
+        except (queue.Empty, asyncio.QueueEmpty):
+            pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Stop with the last subscriber; the next one restarts us
+                    self._thread = None
+                    return
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Leaderboard watcher poll failed")
+            time.sleep(self.poll_interval)
+
+class AsyncLeaderboardWatcher(LeaderboardWatcher):
+    """LeaderboardWatcher driven by an asyncio task and an AsyncLeaderboard."""
+
+    def __init__(self, leaderboard, poll_interval_ms: int, queue_size: int = 64):
+        super().__init__(leaderboard, poll_interval_ms, queue_size)
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def subscribe(self, top_n: int):
+        async with self._lock:
+            if self._version is None:
+                self._version = await self.leaderboard.get_version()
+            if top_n not in self._lists:
+                self._lists[top_n] = await self.leaderboard.get_top_songs(top_n)
+            sub_id = next(self._ids)
+            events = asyncio.Queue(maxsize=self.queue_size)
+            self._subscribers[sub_id] = (top_n, events)
+            snapshot = ("snapshot", {"version": self._version, "data": self._lists[top_n]})
+            if self._task is None:
+                self._task = asyncio.create_task(self._run())
+        return sub_id, events, snapshot
+
+    def unsubscribe(self, sub_id: int):
+        # Only touched from the event loop, no lock needed
+        top_n, _ = self._subscribers.pop(sub_id, (None, None))
+        if top_n is not None and all(n != top_n for n, _ in self._subscribers.values()):
+            self._lists.pop(top_n, None)
+
+    async def poll(self):
+        version = await self.leaderboard.get_version()
+        async with self._lock:
+            if version == self._version or not self._subscribers:
+                self._version = version
+                return
+            largest = await self.leaderboard.get_top_songs(max(n for n, _ in self._subscribers.values()))
+            self._publish(version, largest)
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Leaderboard watcher poll failed")
+            await asyncio.sleep(self.poll_interval)
+        self._task = None
+
+_shared_watcher = None
+_shared_lock = threading.Lock()
+
+def shared_watcher(leaderboard, poll_interval_ms: int) -> LeaderboardWatcher:
+    global _shared_watcher
+    with _shared_lock:
+        if _shared_watcher is None:
+            _shared_watcher = LeaderboardWatcher(leaderboard, poll_interval_ms)
+        return _shared_watcher
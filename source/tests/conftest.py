@@ -0,0 +1,29 @@
+# tests/conftest.py
+# Every Redis pool the app builds is swapped for one on an in-process
+# fakeredis server before any app module creates a client.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Reads see every write at once
+os.environ.setdefault("TOP_CACHE_STALENESS_MS", "0")
+# A bulk budget small enough to run out of
+os.environ.setdefault("BULK_VOTE_MAX_OPS", "500")
+os.environ.setdefault("BULK_VOTE_RATE_PER_SECOND", "50")
+
+import fakeredis
+import fakeredis.aioredis
+import redis
+import redis.asyncio
+
+SERVER = fakeredis.FakeServer()
+
+def _fake_pool(*args, decode_responses: bool = False, **options):
+    return fakeredis.FakeRedis(server=SERVER, decode_responses=decode_responses).connection_pool
+
+def _fake_async_pool(*args, decode_responses: bool = False, **options):
+    return fakeredis.aioredis.FakeRedis(server=SERVER, decode_responses=decode_responses).connection_pool
+
+redis.BlockingConnectionPool = _fake_pool
+redis.asyncio.BlockingConnectionPool = _fake_async_pool
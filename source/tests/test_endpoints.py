@@ -0,0 +1,242 @@
+# tests/test_endpoints.py
+# The /user and /song API through both apps' test clients, on fakeredis.
+import asyncio
+import threading
+import uuid
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from redis.exceptions import ConnectionError
+from app import create_app
+from async_app import create_app as create_async_app
+from leaderboard_shards import LeaderboardShards
+from routes import asyncUserRoutes, songRoutes
+
+class Reply:
+    def __init__(self, status: int, json, headers):
+        self.status = status
+        self.json = json
+        self.headers = headers
+
+class FlaskClient:
+    def __init__(self):
+        self.client = create_app().test_client()
+
+    def request(self, method: str, path: str, **kwargs) -> Reply:
+        response = self.client.open(path, method=method, **kwargs)
+        return Reply(response.status_code, response.get_json(silent=True), response.headers)
+
+class QuartClient:
+    # One loop for every request, since the async Redis pool is bound to it
+    def __init__(self, loop):
+        self.loop = loop
+        self.client = create_async_app().test_client()
+
+    def request(self, method: str, path: str, **kwargs) -> Reply:
+        async def send():
+            response = await self.client.open(path, method=method, **kwargs)
+            body = await response.get_data(as_text=True)
+            return Reply(response.status_code, await response.get_json() if body else None, response.headers)
+        return self.loop.run_until_complete(send())
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module", params=["flask", "quart"])
+def client(request, loop):
+    return FlaskClient() if request.param == "flask" else QuartClient(loop)
+
+def register(client, role: str = "USER") -> dict:
+    reply = client.request("POST", "/user/register", json={"username": f"u-{uuid.uuid4()}", "role": role})
+    assert reply.status == 201
+    return {"X-User-Id": reply.json["user_id"], "X-User-Role": role}
+
+@pytest.fixture
+def admin(client):
+    return register(client, "ADMIN")
+
+@pytest.fixture
+def user(client):
+    return register(client)
+
+@pytest.fixture
+def song_ids(client, admin):
+    reply = client.request("POST", "/song/create_bulk", headers=admin,
+                           json={"songs": [{"title": f"t{i}", "artist": "x"} for i in range(3)]})
+    assert reply.status == 201
+    return [song["song_id"] for song in reply.json["songs"]]
+
+def test_register(client):
+    reply = client.request("POST", "/user/register", json={"username": "alice"})
+    assert reply.status == 201
+    assert (reply.json["success"], reply.json["username"], reply.json["role"]) == (True, "alice", "USER")
+    assert client.request("POST", "/user/register", json={"username": "x", "role": "ROOT"}).status == 400
+
+def test_register_bulk(client):
+    reply = client.request("POST", "/user/register_bulk", json={"users": [{"username": "a"}, {"username": "b"}]})
+    assert reply.status == 201
+    assert reply.json["created"] == 2
+    assert client.request("POST", "/user/register_bulk", json={"users": "nope"}).status == 400
+
+def test_create_song(client, admin, user):
+    reply = client.request("POST", "/song/create", headers=admin, json={"title": "t", "artist": "a"})
+    assert reply.status == 201 and reply.json["success"]
+    assert client.request("POST", "/song/create", headers=user, json={"title": "t", "artist": "a"}).status == 403
+    assert client.request("POST", "/song/create", headers=admin, json={"title": "t"}).status == 400
+    assert client.request("POST", "/song/create", json={"title": "t", "artist": "a"}).status == 401
+
+def test_vote_and_unvote(client, user, song_ids):
+    song_id = song_ids[0]
+    assert client.request("POST", f"/user/vote/{song_id}", headers=user).json["success"] is True
+    duplicate = client.request("POST", f"/user/vote/{song_id}", headers=user).json
+    assert duplicate == {"success": False, "message": "Already voted for this song."}
+    assert client.request("GET", f"/song/rank/{song_id}").json["success"] is True
+    assert client.request("GET", "/user/votes", headers=user).json["song_ids"] == [song_id]
+
+    assert client.request("POST", f"/user/unvote/{song_id}", headers=user).json["success"] is True
+    assert client.request("POST", f"/user/unvote/{song_id}", headers=user).json["success"] is False
+    assert client.request("GET", "/user/votes", headers=user).json["song_ids"] == []
+    assert client.request("POST", f"/user/vote/{song_id}").status == 401
+
+def test_unknown_user_cannot_vote(client, song_ids):
+    reply = client.request("POST", f"/user/vote/{song_ids[0]}",
+                           headers={"X-User-Id": str(uuid.uuid4()), "X-User-Role": "USER"})
+    assert reply.json["success"] is False
+
+def test_ranks(client, song_ids):
+    voters = [register(client) for _ in range(2)]
+    for headers in voters:
+        client.request("POST", f"/user/vote/{song_ids[0]}", headers=headers)
+    client.request("POST", f"/user/vote/{song_ids[1]}", headers=voters[0])
+
+    reply = client.request("GET", f"/song/ranks?ids={song_ids[0]},{song_ids[1]},{song_ids[2]}")
+    assert reply.status == 200
+    ranks = {entry["song_id"]: entry for entry in reply.json["data"]}
+    assert (ranks[song_ids[0]]["score"], ranks[song_ids[1]]["score"]) == (2.0, 1.0)
+    assert ranks[song_ids[0]]["rank"] < ranks[song_ids[1]]["rank"]
+    assert ranks[song_ids[2]]["rank"] is None
+    assert client.request("GET", "/song/ranks").status == 400
+    assert client.request("GET", f"/song/rank/{song_ids[0]}?window=year").status == 400
+
+def test_top_etag(client, user, song_ids):
+    client.request("POST", f"/user/vote/{song_ids[0]}", headers=user)
+    first = client.request("GET", "/song/top?top_n=5")
+    assert first.status == 200 and first.json["success"]
+    etag = first.headers["ETag"]
+    assert client.request("GET", "/song/top?top_n=5", headers={"If-None-Match": etag}).status == 304
+
+    client.request("POST", f"/user/vote/{song_ids[1]}", headers=user)
+    assert client.request("GET", "/song/top?top_n=5", headers={"If-None-Match": etag}).status == 200
+    assert client.request("GET", "/song/top?window=year").status == 400
+
+def test_songs_pages(client, song_ids):
+    seen, cursor = [], 0
+    while True:
+        reply = client.request("GET", f"/song/songs?cursor={cursor}&count=2")
+        assert reply.status == 200 and reply.json["success"] is True
+        seen.extend(reply.json["song_ids"])
+        cursor = reply.json["cursor"]
+        if cursor == 0:
+            break
+    assert set(song_ids) <= set(seen)
+
+def test_bulk_votes(client, user, admin, song_ids):
+    user_id = user["X-User-Id"]
+    operations = [
+        {"action": "vote", "song_id": song_ids[0], "user_id": user_id},
+        {"action": "vote", "song_id": song_ids[0], "user_id": user_id},
+        {"action": "unvote", "song_id": song_ids[1], "user_id": user_id},
+        {"action": "vote", "song_id": ["not", "an", "id"], "user_id": user_id},
+        {"action": "vote", "song_id": song_ids[2], "user_id": admin["X-User-Id"]},
+    ]
+    reply = client.request("POST", "/user/votes", headers=user, json={"operations": operations})
+    assert reply.status == 200
+    assert [result["success"] for result in reply.json["results"]] == [True, False, False, False, False]
+    assert reply.json["succeeded"] == 1
+
+    reply = client.request("POST", "/user/votes", headers=admin, json={"operations": [
+        {"action": "vote", "song_id": song_ids[1], "user_id": user_id}]})
+    assert reply.json["succeeded"] == 1
+    assert sorted(client.request("GET", "/user/votes", headers=user).json["song_ids"]) == sorted(song_ids[:2])
+    assert client.request("POST", "/user/votes", headers=user, json={"operations": "nope"}).status == 400
+
+def test_bulk_votes_rate_limited(client, user, song_ids):
+    # BULK_VOTE_MAX_OPS is 500 and BULK_VOTE_RATE_PER_SECOND 50 here (conftest)
+    operations = [{"action": ("vote", "unvote")[i % 2], "song_id": song_ids[0], "user_id": user["X-User-Id"]}
+                  for i in range(500)]
+    assert client.request("POST", "/user/votes", headers=user, json={"operations": operations * 2}).status == 400
+    assert client.request("POST", "/user/votes", headers=user, json={"operations": operations}).status == 200
+    # The bulk budget is spent, single votes have their own
+    reply = client.request("POST", "/user/votes", headers=user, json={"operations": operations[:100]})
+    assert reply.status == 429
+    assert int(reply.headers["Retry-After"]) >= 1
+    assert client.request("POST", f"/user/vote/{song_ids[1]}", headers=user).json["success"] is True
+
+def test_list_other_users_votes(client, user, admin):
+    other = register(client)
+    path = f"/user/votes?user_id={other['X-User-Id']}"
+    assert client.request("GET", path, headers=user).status == 403
+    reply = client.request("GET", path, headers=admin)
+    assert reply.status == 200 and reply.json["song_ids"] == []
+
+def test_update_and_delete_song(client, admin, user, song_ids):
+    song_id = song_ids[0]
+    reply = client.request("PUT", f"/song/update/{song_id}", headers=admin, json={"title": "new", "artist": "y"})
+    assert reply.status == 200 and reply.json["success"]
+    assert client.request("PUT", f"/song/update/{song_id}", headers=user, json={"title": "n", "artist": "y"}).status == 403
+    assert client.request("DELETE", f"/song/delete/{song_id}", headers=user).status == 403
+    assert client.request("DELETE", f"/song/delete/{song_id}", headers=admin).json["success"] is True
+    assert client.request("GET", f"/song/rank/{song_id}").json["success"] is False
+
+def test_stream_slots(monkeypatch):
+    client = create_app().test_client()
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(songRoutes, "stream_slots", slots)
+    slots.acquire()
+    response = client.get("/song/top/stream")
+    assert response.status_code == 503 and int(response.headers["Retry-After"]) >= 1
+    slots.release()
+    # STREAM_MAX_PER_WORKER=0 serves every stream
+    monkeypatch.setattr(songRoutes, "stream_slots", None)
+    response = client.get("/song/top/stream", buffered=False)
+    assert response.status_code == 200
+    response.close()
+
+class LostReplyRedis:
+    """Async client whose first pipeline commits and then loses its reply."""
+    def __init__(self, client):
+        self.client = client
+        self.lost = False
+
+    def pipeline(self, *args, **kwargs):
+        pipe = self.client.pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def execute_once(*args, **kwargs):
+            replies = await execute(*args, **kwargs)
+            if not self.lost:
+                self.lost = True
+                raise ConnectionError("reply lost")
+            return replies
+        pipe.execute = execute_once
+        return pipe
+
+def test_async_remote_shard_retry(loop, monkeypatch):
+    client = QuartClient(loop)
+    user = register(client)
+    admin = register(client, "ADMIN")
+    leaderboard = asyncUserRoutes.leaderboard_ctrl().leaderboard
+    shard_server = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    shards = LeaderboardShards(leaderboard.LEADERBOARD_KEY, 2, 2)
+    monkeypatch.setattr(leaderboard, "shards", shards)
+    monkeypatch.setattr(leaderboard, "async_shard_clients", [leaderboard.redis, LostReplyRedis(shard_server)])
+    reply = client.request("POST", "/song/create_bulk", headers=admin,
+                           json={"songs": [{"title": f"r{i}", "artist": "x"} for i in range(8)]})
+    song_id = next(song["song_id"] for song in reply.json["songs"] if not shards.is_local(song["song_id"]))
+    assert client.request("POST", f"/user/vote/{song_id}", headers=user).json["success"] is True
+    # The retry after the lost reply must not count the vote twice
+    score = loop.run_until_complete(shard_server.zscore(shards.key_for(song_id), song_id))
+    assert score == 1
@@ -0,0 +1,214 @@
+# tests/test_storage_conformance.py
+# The same checks against both storage backends; RedisBackend runs on fakeredis.
+import time
+import uuid
+import pytest
+from storage.backend import create_storage, MEMORY, REDIS
+from leaderboard import Leaderboard
+from jobs.purge import SONGS, USERS
+from models.user import Role, User
+
+def purge(storage, kind: str) -> dict:
+    job_id, _ = storage.start_purge(kind)
+    while True:
+        job = storage.get_purge(job_id)
+        if job and job["status"] != "running":
+            return job
+        time.sleep(0.01)
+
+def scan_all(scan) -> list:
+    cursor, members = 0, []
+    while True:
+        cursor, page = scan(cursor)
+        members.extend(page)
+        if cursor == 0:
+            return members
+
+def new_user(name: str, role: Role = Role.USER) -> User:
+    return User(user_id=str(uuid.uuid4()), username=name, role=role)
+
+@pytest.fixture(params=[MEMORY, REDIS])
+def storage(request):
+    storage = create_storage(request.param)
+    purge(storage, SONGS)
+    purge(storage, USERS)
+    return storage
+
+@pytest.fixture
+def users(storage):
+    users = [new_user(f"u{i}") for i in range(5)]
+    storage.add_users(users)
+    return [user.user_id for user in users]
+
+@pytest.fixture
+def songs(storage):
+    song_ids = [f"conformance-song-{i}" for i in range(6)]
+    storage.add_songs([{"song_id": song_id, "title": f"t{i}", "artist": "x"} for i, song_id in enumerate(song_ids)])
+    return song_ids
+
+@pytest.fixture
+def voted(storage, users, songs):
+    """s0 has 3 votes, s1 2, s2 and s3 1 each; u0 voted for s0-s3."""
+    u0, u1, u2, _, _ = users
+    s0, s1, s2, s3, _, _ = songs
+    for user_id, song_id in ((u0, s0), (u1, s0), (u2, s0), (u0, s1), (u1, s1), (u0, s2), (u0, s3)):
+        assert storage.vote_song(user_id, song_id) == Leaderboard.VOTE_OK
+    return users, songs
+
+def test_users(storage, users):
+    u0, _, _, _, u4 = users
+    admin = new_user("a0", Role.ADMIN)
+    storage.add_users([admin])
+    catalog = storage.get_catalog_version(USERS)
+
+    found = storage.get_user(u0)
+    assert (found.user_id, found.username, found.role) == (u0, "u0", Role.USER)
+    assert storage.get_user("missing") is None
+    assert (storage.user_exists(u0), storage.user_exists("missing")) == (True, False)
+    assert storage.update_user(u4, "promoted", Role.ADMIN) is True
+    assert storage.update_user("missing", "x", Role.USER) is False
+    assert storage.get_user(u4).username == "promoted"
+    assert storage.get_catalog_version(USERS) > catalog
+
+    extra = [new_user(f"extra{i}") for i in range(25)]
+    storage.add_users(extra)
+    scanned = [user.user_id for user in scan_all(lambda cursor: storage.scan_users(Role.USER, cursor, 7))]
+    assert set(scanned) == {*users[:4], *(user.user_id for user in extra)}
+    admins = {user.user_id for user in scan_all(lambda cursor: storage.scan_users(Role.ADMIN, cursor, 7))}
+    assert {admin.user_id, u4} <= admins
+
+def test_songs(storage):
+    catalog = storage.get_catalog_version(SONGS)
+    song_ids = [f"conformance-song-{i}" for i in range(6)]
+    storage.add_songs([{"song_id": song_id, "title": f"t{i}", "artist": "x"} for i, song_id in enumerate(song_ids)])
+    assert storage.get_songs_metadata([song_ids[0], "missing"]) == {
+        song_ids[0]: {"title": "t0", "artist": "x"}, "missing": None}
+    assert {song.song_id for song in scan_all(lambda cursor: storage.scan_songs(cursor, 4))} == set(song_ids)
+    assert storage.get_catalog_version(SONGS) > catalog
+
+def test_vote(storage, users, songs):
+    u0 = users[0]
+    s0 = songs[0]
+    version = storage.get_version()
+    assert storage.vote_song(u0, s0) == Leaderboard.VOTE_OK
+    assert storage.get_version() > version
+    version = storage.get_version()
+    assert storage.vote_song(u0, s0) == Leaderboard.VOTE_DUPLICATE
+    assert storage.get_version() == version
+    assert storage.vote_song("missing", s0) == Leaderboard.VOTE_UNKNOWN_USER
+    assert storage.vote_song(u0, "missing") == Leaderboard.VOTE_UNKNOWN_SONG
+    assert storage.unvote_song(u0, "missing") == Leaderboard.UNVOTE_NOT_VOTED
+    assert storage.get_song_rank("missing") is None
+
+def test_user_votes(storage, voted):
+    (u0, _, _, u3, _), songs = voted
+    catalog = storage.get_catalog_version(SONGS)
+    assert sorted(storage.get_user_votes(u0)) == sorted(songs[:4])
+    assert storage.get_user_votes(u3) == []
+    assert storage.get_user_votes("missing") == []
+    assert storage.get_catalog_version(SONGS) == catalog
+    assert storage.unvote_song(u0, songs[1]) == Leaderboard.UNVOTE_OK
+    assert sorted(storage.get_user_votes(u0)) == sorted([songs[0], *songs[2:4]])
+    assert storage.delete_user(u0) is True
+    assert storage.get_user_votes(u0) == []
+
+def test_ranks(storage, voted):
+    _, (s0, s1, s2, s3, s4, _) = voted
+    # Ties rank by song_id descending, like ZREVRANGE
+    top = [(song["song_id"], song["score"], song["title"]) for song in storage.get_top_songs(10)]
+    assert top == [(s0, 3.0, "t0"), (s1, 2.0, "t1"), (s3, 1.0, "t3"), (s2, 1.0, "t2")]
+    assert len(storage.get_top_songs(2)) == 2
+    assert [storage.get_song_rank(song_id) for song_id in (s0, s1, s3, s2, s4)] == [1, 2, 3, 4, None]
+    assert storage.get_song_ranks([s2, s4, s0]) == [
+        {"song_id": s2, "rank": 4, "score": 1.0},
+        {"song_id": s4, "rank": None, "score": 0},
+        {"song_id": s0, "rank": 1, "score": 3.0},
+    ]
+    assert (storage.get_song_score(s0), storage.get_song_score(s4)) == (3, 0)
+
+def test_songs_around(storage, voted):
+    _, (s0, s1, _, s3, s4, _) = voted
+    rank, songs = storage.get_songs_around(s1, 1)
+    assert (rank, [(song["rank"], song["song_id"]) for song in songs]) == (2, [(1, s0), (2, s1), (3, s3)])
+    rank, songs = storage.get_songs_around(s0, 2)
+    assert (rank, [(song["rank"], song["song_id"]) for song in songs]) == (1, [(1, s0), (2, s1), (3, s3)])
+    assert storage.get_songs_around(s4, 1) is None
+
+def test_unvote(storage, voted):
+    (u0, _, _, _, u4), (s0, _, _, s3, _, _) = voted
+    assert storage.unvote_song(u0, s3) == Leaderboard.UNVOTE_OK
+    assert storage.get_song_rank(s3) is None
+    assert storage.unvote_song(u0, s3) == Leaderboard.UNVOTE_NOT_VOTED
+    assert storage.unvote_song(u4, s0) == Leaderboard.UNVOTE_NOT_VOTED
+
+def test_bulk_vote(storage, users, songs):
+    u3, u4, s5 = users[3], users[4], songs[5]
+    assert storage.bulk_vote([
+        ("vote", u3, s5), ("vote", u3, s5), ("unvote", u3, s5), ("vote", "missing", s5), ("unvote", u4, s5),
+        ("vote", u4, "missing"),
+    ]) == [1, 0, 1, -1, 0, -2]
+
+def test_update_and_delete_song(storage, voted):
+    (_, u1, _, _, _), (s0, s1, s2, s3, _, _) = voted
+    catalog = storage.get_catalog_version(SONGS)
+    version = storage.get_version()
+    assert storage.update_song(s1, "new", "y") is True
+    assert storage.get_version() > version
+    assert storage.get_catalog_version(SONGS) > catalog
+    assert storage.update_song("missing", "x", "y") is False
+    assert storage.get_top_songs(2)[1]["title"] == "new"
+
+    catalog = storage.get_catalog_version(SONGS)
+    assert storage.delete_song(s1) is True
+    assert storage.delete_song(s1) is False
+    assert storage.get_catalog_version(SONGS) > catalog
+    assert storage.get_song_rank(s1) is None
+    assert sorted(storage.get_user_votes(u1)) == [s0]
+    assert [song["song_id"] for song in storage.get_top_songs(10)] == [s0, s3, s2]
+
+def test_delete_user(storage, users):
+    u3 = users[3]
+    catalog = storage.get_catalog_version(USERS)
+    assert storage.delete_user(u3) is True
+    assert storage.delete_user(u3) is False
+    assert storage.get_catalog_version(USERS) > catalog
+    assert (storage.user_exists(u3), storage.get_user(u3)) == (False, None)
+
+def test_purges(storage, voted):
+    admin = new_user("a0", Role.ADMIN)
+    storage.add_users([admin])
+    catalog = storage.get_catalog_version(SONGS)
+    assert purge(storage, SONGS)["status"] == "done"
+    assert storage.get_catalog_version(SONGS) > catalog
+    assert scan_all(lambda cursor: storage.scan_songs(cursor, 100)) == []
+    assert storage.get_top_songs(10) == []
+    assert purge(storage, USERS)["status"] == "done"
+    assert scan_all(lambda cursor: storage.scan_users(Role.USER, cursor, 100)) == []
+    assert storage.user_exists(admin.user_id) is True
+    assert storage.get_purge("missing") is None
+
+def test_votes_after_user_purge(storage, voted):
+    # Users registered after a full purge start from a clean slate
+    _, (s0, _, _, _, _, _) = voted
+    purge(storage, USERS)
+    user = new_user("fresh")
+    storage.add_users([user])
+    assert storage.vote_song(user.user_id, s0) == Leaderboard.VOTE_OK
+    assert storage.get_user_votes(user.user_id) == [s0]
+
+def test_ordinal_reuse_after_deleted_song(storage, users, songs):
+    # Votes for a song deleted or never created leave nothing behind for
+    # the next owner of a purged user's ordinal
+    u0, s0 = users[0], songs[0]
+    storage.add_songs([{"song_id": "conformance-ghost", "title": "g", "artist": "x"}])
+    assert storage.vote_song(u0, "conformance-ghost") == Leaderboard.VOTE_OK
+    assert storage.delete_song("conformance-ghost") is True
+    assert storage.vote_song(u0, "conformance-ghost") == Leaderboard.VOTE_UNKNOWN_SONG
+    assert storage.vote_song(u0, s0) == Leaderboard.VOTE_OK
+    purge(storage, USERS)
+    storage.add_songs([{"song_id": "conformance-ghost", "title": "g", "artist": "x"}])
+    fresh = [new_user(f"fresh{i}") for i in range(len(users))]
+    storage.add_users(fresh)
+    for user in fresh:
+        assert storage.vote_song(user.user_id, "conformance-ghost") == Leaderboard.VOTE_OK
+        assert storage.vote_song(user.user_id, s0) == Leaderboard.VOTE_OK
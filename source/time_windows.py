@@ -0,0 +1,66 @@
+# time_windows.py
+from datetime import datetime, timedelta, timezone
+
+ALL_TIME = "all"
+WINDOWS = ("hour", "day", "week")
+
+HOUR_BUCKET_TTL_SECONDS = 2 * 3600  # only the current hour is read
+DAY_BUCKET_TTL_SECONDS = 8 * 86400  # read by the week rollup for 7 days
+CLOSED_ROLLUP_TTL_SECONDS = 2 * 86400  # rebuilt once per day
+WEEK_DAYS = 7
+
+class TimeWindows:
+    """
+    Key layout of the windowed leaderboards. Every score change is also
+    applied to the current hour and day buckets (UTC), which expire on their
+    own. "week" is served from a rollup: the six closed days are unioned once
+    per day, then that result is unioned with today's bucket on a short TTL.
+    """
+
+    def __init__(self, leaderboard_key: str):
+        self.leaderboard_key = leaderboard_key
+
+    def _now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def hour_key(self, now: datetime) -> str:
+        return f"{self.leaderboard_key}:hour:{now:%Y%m%d%H}"
+
+    def day_key(self, day: datetime) -> str:
+        return f"{self.leaderboard_key}:day:{day:%Y%m%d}"
+
+    def write_keys(self, now: datetime = None) -> tuple[list, list]:
+        """(bucket keys, TTL per key) that the current score changes go to."""
+        now = now or self._now()
+        return [self.hour_key(now), self.day_key(now)], [HOUR_BUCKET_TTL_SECONDS, DAY_BUCKET_TTL_SECONDS]
+
+    def read_key(self, window: str, now: datetime = None) -> str:
+        """Sorted set holding `window` right now; changes when the bucket rolls over."""
+        now = now or self._now()
+        if window == "hour":
+            return self.hour_key(now)
+        if window == "day":
+            return self.day_key(now)
+        if window == "week":
+            return f"{self.leaderboard_key}:week:{now:%Y%m%d}"
+        return self.leaderboard_key
+
+    def live_keys(self, now: datetime = None) -> list:
+        """Every bucket and rollup key that may still exist, e.g. to drop a deleted song."""
+        now = now or self._now()
+        keys = [self.hour_key(now - timedelta(hours=i)) for i in range(HOUR_BUCKET_TTL_SECONDS // 3600 + 1)]
+        keys += [self.day_key(now - timedelta(days=i)) for i in range(DAY_BUCKET_TTL_SECONDS // 86400 + 1)]
+        for day in (now, now - timedelta(days=1)):
+            keys += self.week_rollup_keys(day)[:2]
+        return keys
+
+    def week_rollup_keys(self, now: datetime = None) -> list:
+        """KEYS for WEEK_ROLLUP_SCRIPT: view, closed days rollup, today, closed days."""
+        now = now or self._now()
+        closed_days = [self.day_key(now - timedelta(days=i)) for i in range(1, WEEK_DAYS)]
+        return [
+            self.read_key("week", now),
+            f"{self.leaderboard_key}:week:closed:{now:%Y%m%d}",
+            self.day_key(now),
+            *closed_days,
+        ]
@@ -0,0 +1,144 @@
+# vote_buffer.py
+import atexit
+import logging
+import threading
+import time
+import uuid
+from redis_client.redis_client import retry_redis_call
+from leaderboard_shards import SCORE_DELTAS_SCRIPT, apply_score_deltas
+
+logger = logging.getLogger(__name__)
+
+class VoteBuffer:
+    """
+    Write-behind buffer for leaderboard scores. Deltas are summed per song
+    in-process and flushed as one ZINCRBY per song, either every
+    `flush_interval_ms` or as soon as `flush_max_votes` votes are pending.
+    Songs go to their leaderboard shard; with `windows` set, deltas also go
+    to the time buckets current at flush time. A flush that fails is kept
+    as is, with its apply id and the instances that committed, and retried
+    before anything newer; new votes keep summing in the buffer meanwhile.
+    """
+
+    def __init__(self, shards, clients: list, version_key: str, flush_interval_ms: int, flush_max_votes: int,
+                 windows=None):
+        self.shards = shards
+        self.clients = clients
+        self.version_key = version_key
+        self.windows = windows
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_max_votes = flush_max_votes
+        self._flush_script = clients[0].register_script(SCORE_DELTAS_SCRIPT)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._deltas = {}
+        self._pending_votes = 0
+        self._oldest_pending = None
+        self._unapplied = None  # the failed flush: {"apply_id", "calls", "applied", "votes", "since"}
+        self._last_flush = time.monotonic()
+        self._flushed_votes = 0
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="vote-buffer-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, song_id: str, delta: int):
+        with self._lock:
+            self._deltas[song_id] = self._deltas.get(song_id, 0) + delta
+            self._pending_votes += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            full = self._pending_votes >= self.flush_max_votes
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            flushed = 0
+            if self._unapplied:
+                flushed += self._apply(self._unapplied)
+
+            with self._lock:
+                deltas, pending, oldest = self._deltas, self._pending_votes, self._oldest_pending
+                self._deltas, self._pending_votes, self._oldest_pending = {}, 0, None
+
+            bucket_keys, ttls = self.windows.write_keys() if self.windows else ([], [])
+            calls = self.shards.plan_deltas(deltas, bucket_keys, ttls)
+            if calls:
+                # Re-applying a batch whose EXEC may have run is safe only
+                # with the same apply id, so a failed batch is never merged back
+                self._unapplied = {
+                    "apply_id": str(uuid.uuid4()),
+                    "calls": calls,
+                    "applied": set(),
+                    "votes": pending,
+                    "since": oldest or time.monotonic(),
+                }
+                flushed += self._apply(self._unapplied)
+            else:
+                # Votes that cancelled out leave nothing to write
+                self._last_flush = time.monotonic()
+                self._flushed_votes += pending
+                flushed += pending
+            return flushed
+
+    def _apply(self, batch: dict) -> int:
+        retry_redis_call(apply_score_deltas, self.clients, self._flush_script, batch["calls"], self.version_key,
+                         batch["apply_id"], batch["applied"])
+        self._unapplied = None
+        self._last_flush = time.monotonic()
+        self._flushed_votes += batch["votes"]
+        return batch["votes"]
+
+    def lag(self) -> dict:
+        """How far the leaderboard is behind the accepted votes."""
+        now = time.monotonic()
+        unapplied = self._unapplied
+        with self._lock:
+            oldest = self._oldest_pending
+            pending_votes = self._pending_votes
+            if unapplied:
+                oldest = unapplied["since"]
+                pending_votes += unapplied["votes"]
+            return {
+                "pending_votes": pending_votes,
+                "pending_songs": len(self._deltas),
+                "unapplied_flush": unapplied is not None,
+                "oldest_pending_ms": round((now - oldest) * 1000, 3) if oldest is not None else 0,
+                "since_last_flush_ms": round((now - self._last_flush) * 1000, 3),
+                "flushed_votes": self._flushed_votes,
+            }
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Vote buffer flush failed; retrying on next interval")
+
+_shared_buffer = None
+_shared_lock = threading.Lock()
+
+def shared_vote_buffer(shards, clients: list, version_key: str,
+                       flush_interval_ms: int, flush_max_votes: int, windows=None) -> VoteBuffer:
+    # One buffer (and flusher thread) per process, however many Leaderboards exist
+    global _shared_buffer
+    with _shared_lock:
+        if _shared_buffer is None:
+            _shared_buffer = VoteBuffer(shards, clients, version_key, flush_interval_ms, flush_max_votes, windows)
+        return _shared_buffer